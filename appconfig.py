@@ -0,0 +1,175 @@
+"""
+iRacing Launcher - Registre des apps
+Liste des apps gardée en mémoire, chaque app ayant un identifiant stable ("id",
+UUID) : index id -> app et nom -> id, opérations unitaires (ajout, modification,
+suppression, réordonnancement) sans relire ni reconstruire la liste.
+La persistance passe par le JsonStore de launcher_apps.json (écriture différée).
+Les anciennes configs sans "id" sont migrées au premier chargement.
+"""
+import copy
+import logging
+import threading
+import uuid
+
+log = logging.getLogger(__name__)
+
+
+def new_app_id():
+    return uuid.uuid4().hex
+
+
+class AppRegistry:
+    """
+    Apps adressées par ID. Les méthodes renvoient des copies : l'appelant ne
+    modifie jamais l'état interne sans passer par update().
+    Un fichier modifié à la main pendant que le launcher tourne est relu.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._lock = threading.RLock()
+        self._apps = None      # liste ordonnée (chargée au premier accès)
+        self._by_id = {}
+        self._by_name = {}
+
+    # ----- chargement / index -----
+    def _ensure(self):
+        """Charge au premier accès, puis relit seulement si le fichier a changé sur le disque"""
+        if self._apps is None:
+            self._load(self.store.load())
+        else:
+            data = self.store.load_if_changed()
+            if data is not None:
+                self._load(data)
+
+    def _load(self, data):
+        apps = [app for app in (data if isinstance(data, list) else []) if isinstance(app, dict)]
+        migrated = False
+        seen = set()
+        for app in apps:
+            # Migration (ancienne config sans id) et ids dupliqués par copier-coller
+            if not app.get("id") or app["id"] in seen:
+                app["id"] = new_app_id()
+                migrated = True
+            seen.add(app["id"])
+        self._apps = apps
+        self._reindex()
+        if migrated:
+            log.info(f"Config des apps : {len(apps)} app(s), identifiants ajoutés")
+            self._save()
+
+    def _reindex(self):
+        self._by_id = {app["id"]: app for app in self._apps}
+        self._by_name = {}
+        for app in self._apps:
+            # Noms en double : le premier dans la liste gagne
+            self._by_name.setdefault(app.get("name"), app["id"])
+
+    def _save(self):
+        self.store.save(self._apps)
+
+    # ----- lecture -----
+    def all(self):
+        with self._lock:
+            self._ensure()
+            return copy.deepcopy(self._apps)
+
+    def ids(self):
+        with self._lock:
+            self._ensure()
+            return [app["id"] for app in self._apps]
+
+    def get(self, app_id):
+        """Copie de l'app, None si l'id est inconnu"""
+        with self._lock:
+            self._ensure()
+            app = self._by_id.get(app_id)
+            return copy.deepcopy(app) if app is not None else None
+
+    def resolve(self, ref):
+        """ID d'une app désignée par son id ou par son nom (None si inconnue)"""
+        with self._lock:
+            self._ensure()
+            if ref in self._by_id:
+                return ref
+            return self._by_name.get(ref)
+
+    def select(self, ids):
+        """Copies des apps dont l'id est dans `ids`, dans l'ordre de la liste"""
+        wanted = set(ids)
+        with self._lock:
+            self._ensure()
+            return [copy.deepcopy(app) for app in self._apps if app["id"] in wanted]
+
+    # ----- modifications -----
+    def add(self, app):
+        """Ajoute une app en fin de liste. Retourne sa copie (avec son id)."""
+        app = copy.deepcopy(app)
+        with self._lock:
+            self._ensure()
+            if not app.get("id") or app["id"] in self._by_id:
+                app["id"] = new_app_id()
+            self._apps.append(app)
+            self._by_id[app["id"]] = app
+            self._by_name.setdefault(app.get("name"), app["id"])
+            self._save()
+            return copy.deepcopy(app)
+
+    def update(self, app_id, changes, remove=()):
+        """
+        Modifie les champs d'une app (l'id ne change pas) et retire les clés `remove`.
+        Retourne sa copie, None si inconnue.
+        """
+        with self._lock:
+            self._ensure()
+            app = self._by_id.get(app_id)
+            if app is None:
+                return None
+            changes = {k: v for k, v in changes.items() if k != "id"}
+            app.update(copy.deepcopy(changes))
+            for key in remove:
+                if key != "id":
+                    app.pop(key, None)
+            if "name" in changes:
+                self._reindex()
+            self._save()
+            return copy.deepcopy(app)
+
+    def remove(self, app_id):
+        with self._lock:
+            self._ensure()
+            app = self._by_id.get(app_id)
+            if app is None:
+                return False
+            self._apps.remove(app)
+            self._reindex()
+            self._save()
+            return True
+
+    def reorder(self, ids):
+        """
+        Nouvel ordre de la liste en une opération. Les ids inconnus sont ignorés,
+        les apps absentes de `ids` gardent leur ordre relatif, à la fin.
+        """
+        with self._lock:
+            self._ensure()
+            ordered = []
+            placed = set()
+            for app_id in ids:
+                app = self._by_id.get(app_id)
+                if app is not None and app_id not in placed:
+                    ordered.append(app)
+                    placed.add(app_id)
+            ordered += [app for app in self._apps if app["id"] not in placed]
+            if [a["id"] for a in ordered] == [a["id"] for a in self._apps]:
+                return False
+            self._apps = ordered
+            self._reindex()
+            self._save()
+            return True
+
+    def replace(self, apps):
+        """Remplace toute la liste (import, ancienne API save_apps) ; les ids fournis sont gardés"""
+        with self._lock:
+            self._load(copy.deepcopy(list(apps)))
+            self._save()
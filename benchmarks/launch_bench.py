@@ -0,0 +1,242 @@
+"""
+iRacing Launcher - Benchmark lancement / statut / arrêt / redémarrage (Linux)
+Crée N fausses apps (scripts Python : délai de démarrage, port de disponibilité
+optionnel, comportement à l'arrêt configurable) et M processus de fond pour
+grossir la table des processus, puis appelle directement les méthodes de
+main.Api (sans webview) et écrit les percentiles de latence en JSON.
+
+    python benchmarks/launch_bench.py --apps 10 --background 300 --rounds 10
+    python benchmarks/launch_bench.py --shutdown mixed --output bench_1.3.json
+
+Comparer deux versions : lancer le même benchmark sur chaque version et
+comparer les p50 / p90 / p99 des fichiers JSON.
+"""
+import argparse
+import contextlib
+import json
+import math
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SHUTDOWN_MODES = ("graceful", "slow", "ignore")
+
+# Fausse app : exécutable sans argument (le registre lance le chemin seul)
+FAKE_APP = """#!{python}
+import signal, socket, sys, time
+
+STARTUP_DELAY = {startup_delay!r}
+SHUTDOWN = {shutdown!r}
+SHUTDOWN_DELAY = {shutdown_delay!r}
+PORT = {port!r}
+
+def on_term(*_):
+    if SHUTDOWN == "ignore":
+        return  # tuée après le délai de grâce
+    if SHUTDOWN == "slow":
+        time.sleep(SHUTDOWN_DELAY)
+    sys.exit(0)
+
+signal.signal(signal.SIGTERM, on_term)
+time.sleep(STARTUP_DELAY)
+if PORT:
+    server = socket.socket()
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind(("127.0.0.1", PORT))
+    server.listen(8)
+while True:
+    time.sleep(3600)
+"""
+
+
+def percentiles(samples):
+    """{n, min, p50, p90, p99, max, mean} en ms (rang le plus proche)"""
+    if not samples:
+        return {"n": 0}
+    values = sorted(samples)
+    n = len(values)
+
+    def rank(p):
+        return values[min(n - 1, max(0, math.ceil(p / 100 * n) - 1))]
+
+    return {
+        "n": n,
+        "min": round(values[0], 2),
+        "p50": round(rank(50), 2),
+        "p90": round(rank(90), 2),
+        "p99": round(rank(99), 2),
+        "max": round(values[-1], 2),
+        "mean": round(sum(values) / n, 2),
+    }
+
+
+def _ms(seconds):
+    return seconds * 1000
+
+
+def make_fake_apps(workdir, count, startup_delay, shutdown, shutdown_delay, stop_grace, ready_port):
+    """Écrit les scripts des fausses apps et retourne leurs entrées launcher_apps.json"""
+    apps = []
+    for i in range(count):
+        mode = SHUTDOWN_MODES[i % len(SHUTDOWN_MODES)] if shutdown == "mixed" else shutdown
+        port = ready_port + i if ready_port else 0
+        path = os.path.join(workdir, f"bench_app_{i:02d}.py")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(FAKE_APP.format(python=sys.executable, startup_delay=startup_delay,
+                                    shutdown=mode, shutdown_delay=shutdown_delay, port=port))
+        os.chmod(path, 0o755)
+        app = {"name": f"Bench {i:02d}", "path": path, "checked": True, "stop_grace": stop_grace}
+        if port:
+            app["ready_port"] = port
+        apps.append(app)
+    # App jamais lancée : chaque statut doit la chercher dans l'index des processus
+    path = os.path.join(workdir, "bench_idle.py")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(FAKE_APP.format(python=sys.executable, startup_delay=0, shutdown="graceful",
+                                shutdown_delay=0, port=0))
+    os.chmod(path, 0o755)
+    apps.append({"name": "Bench idle", "path": path, "checked": False})
+    return apps
+
+
+def start_background(count):
+    """M processus inactifs : la table des processus ressemble à celle d'un PC chargé"""
+    sleep = shutil.which("sleep")
+    return [subprocess.Popen([sleep, "3600"]) for _ in range(count)]
+
+
+def stop_background(procs):
+    for proc in procs:
+        proc.kill()
+    for proc in procs:
+        proc.wait()
+
+
+def timed(action):
+    t0 = time.perf_counter()
+    result = action()
+    return _ms(time.perf_counter() - t0), result
+
+
+def run(args):
+    from main import Api, app_registry, CURRENT_VERSION
+
+    api = Api(watch=args.watch)
+    ids = app_registry.ids()
+    launched = [app["id"] for app in app_registry.all() if app.get("checked")]
+    results = {name: [] for name in ("launch", "launch_app", "ready_app", "status", "status_cold",
+                                     "state_poll", "stop", "stop_app", "restart")}
+    errors = []
+
+    for _ in range(args.rounds):
+        # Lancement groupé : latence du lot et temps de disponibilité par app
+        elapsed, report = timed(api.start_selected)
+        results["launch"].append(elapsed)
+        for timing in report["timings"]:
+            if timing.get("total_ms") is not None:
+                results["launch_app"].append(timing["total_ms"])
+            if timing.get("ready_ms") is not None:
+                results["ready_app"].append(timing["ready_ms"])
+        errors += report["errors"]
+
+        # Statuts : PIDs du registre + index des processus réutilisé (TTL), puis index
+        # invalidé (scan complet de la table, pour l'app qui ne tourne pas)
+        version = api.get_state()["version"]
+        for _ in range(args.polls):
+            results["status"].append(timed(lambda: api.get_statuses(ids))[0])
+            api._snapshot.invalidate()
+            results["status_cold"].append(timed(lambda: api.get_statuses(ids))[0])
+            results["state_poll"].append(timed(lambda: api.get_state(version))[0])
+
+        # Redémarrage d'une app (arrêt + relance + disponibilité)
+        app_id = launched[len(results["restart"]) % len(launched)]
+        elapsed, reports = timed(lambda: api.restart_selected([app_id]))
+        results["restart"].append(elapsed)
+        errors += [f"{r['name']}: {r['error']}" for r in reports if not r.get("ok")]
+
+        elapsed, report = timed(api.stop_selected)
+        results["stop"].append(elapsed)
+        results["stop_app"] += [r["elapsed_ms"] for r in report["results"] if r["found"]]
+        errors += report["errors"]
+
+    return {
+        "version": CURRENT_VERSION,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "config": {
+            "apps": args.apps, "background": args.background, "rounds": args.rounds,
+            "polls": args.polls, "startup_delay": args.startup_delay, "shutdown": args.shutdown,
+            "shutdown_delay": args.shutdown_delay, "stop_grace": args.stop_grace,
+            "ready_port": args.ready_port, "watch": args.watch,
+        },
+        "latency_ms": {name: percentiles(samples) for name, samples in results.items()},
+        "errors": errors,
+    }
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Benchmark start / status / stop / restart de main.Api")
+    parser.add_argument("--apps", type=int, default=10, help="nombre de fausses apps (N)")
+    parser.add_argument("--background", type=int, default=200, help="processus de fond (M)")
+    parser.add_argument("--rounds", type=int, default=10, help="cycles lancement / statut / redémarrage / arrêt")
+    parser.add_argument("--polls", type=int, default=20, help="mesures de statut par cycle")
+    parser.add_argument("--startup-delay", type=float, default=0.05, help="délai de démarrage des apps (s)")
+    parser.add_argument("--shutdown", choices=SHUTDOWN_MODES + ("mixed",), default="graceful",
+                        help="réaction des apps au terminate (mixed = les trois)")
+    parser.add_argument("--shutdown-delay", type=float, default=0.2, help="durée d'arrêt en mode slow (s)")
+    parser.add_argument("--stop-grace", type=float, default=1.0, help="stop_grace des apps (s)")
+    parser.add_argument("--ready-port", type=int, default=0,
+                        help="premier port de disponibilité (0 = pas de sonde de port)")
+    parser.add_argument("--watch", action="store_true", help="démarre aussi watcher / télémétrie / superviseur")
+    parser.add_argument("--output", help="fichier JSON (défaut : sortie standard)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    if not sys.platform.startswith("linux"):
+        print("Benchmark prévu pour Linux (fausses apps = scripts exécutables)", file=sys.stderr)
+        return 2
+    output = os.path.abspath(args.output) if args.output else None
+
+    # Config du launcher isolée dans un dossier temporaire (main lit ses fichiers dans le dossier courant)
+    workdir = tempfile.mkdtemp(prefix="launcher_bench_")
+    background = []
+    cwd = os.getcwd()
+    try:
+        os.chdir(workdir)
+        apps = make_fake_apps(workdir, args.apps, args.startup_delay, args.shutdown,
+                              args.shutdown_delay, args.stop_grace, args.ready_port)
+        with open("launcher_apps.json", "w", encoding="utf-8") as f:
+            json.dump(apps, f, indent=4)
+        background = start_background(args.background)
+
+        sys.path.insert(0, REPO_DIR)
+        # Messages de diagnostic du launcher sur stderr : stdout ne contient que le JSON
+        with contextlib.redirect_stdout(sys.stderr):
+            result = run(args)
+    finally:
+        os.chdir(cwd)
+        stop_background(background)
+        # Fausses apps encore en vie (erreur en cours de benchmark)
+        subprocess.run(["pkill", "-KILL", "-f", os.path.join(workdir, "bench_app_")], check=False)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    text = json.dumps(result, indent=2)
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(text)
+    return 1 if result["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,7 +4,7 @@ echo iRacing Launcher v1.2 - Build Script
 echo ========================================
 echo.
 
-echo [1/4] Compilation de l'updater...
+echo [1/5] Compilation de l'updater...
 pyinstaller updater.spec
 if %errorlevel% neq 0 (
     echo ERREUR: Compilation de l'updater echouee
@@ -13,7 +13,7 @@ if %errorlevel% neq 0 (
 )
 echo.
 
-echo [2/4] Compilation du launcher...
+echo [2/5] Compilation du launcher...
 pyinstaller iRacing_Launcher.spec
 if %errorlevel% neq 0 (
     echo ERREUR: Compilation du launcher echouee
@@ -22,11 +22,20 @@ if %errorlevel% neq 0 (
 )
 echo.
 
-echo [3/4] Copie de l'updater dans dist...
+echo [3/5] Compilation de la ligne de commande (exe console)...
+pyinstaller iRacing_Launcher_cli.spec
+if %errorlevel% neq 0 (
+    echo ERREUR: Compilation de la ligne de commande echouee
+    pause
+    exit /b 1
+)
+echo.
+
+echo [4/5] Copie de l'updater dans dist...
 copy dist\updater.exe dist\ >nul 2>&1
 echo.
 
-echo [4/4] Verification...
+echo [5/5] Verification...
 if not exist "dist\iRacing_Launcher.exe" (
     echo ERREUR: iRacing_Launcher.exe introuvable
     pause
@@ -37,6 +46,11 @@ if not exist "dist\updater.exe" (
     pause
     exit /b 1
 )
+if not exist "dist\iRacing_Launcher_cli.exe" (
+    echo ERREUR: iRacing_Launcher_cli.exe introuvable
+    pause
+    exit /b 1
+)
 
 echo.
 echo ========================================
@@ -46,9 +60,13 @@ echo.
 echo Fichiers generes dans dist\ :
 dir dist\*.exe
 echo.
+echo SHA-256 (champ "sha256" de version.json) :
+certutil -hashfile dist\iRacing_Launcher.exe SHA256
+echo.
 echo VERIFICATION :
 echo - iRacing_Launcher.exe : OK
 echo - updater.exe : OK
+echo - iRacing_Launcher_cli.exe : OK
 echo.
 echo Pour tester : cd dist ^&^& iRacing_Launcher.exe
 echo.
@@ -0,0 +1,140 @@
+"""
+iRacing Launcher - Ligne de commande
+    python cli.py status  [--profile NOM] [app ...]
+    python cli.py start   [--profile NOM] [app ...]
+    python cli.py stop    [--profile NOM] [app ...]
+    python cli.py restart [--profile NOM] [app ...]
+    python cli.py spans   [--min-ms N] [--limit N] [préfixe]
+(ou iRacing_Launcher_cli.exe <commande> ..., exe console : voir iRacing_Launcher_cli.spec)
+
+Sans nom d'app ni profil : apps cochées (toutes pour status).
+spans : derniers appels chronométrés du launcher en cours (diagnostic des lenteurs).
+Si le launcher tourne déjà, la commande lui est transmise par IPC ; sinon elle
+est exécutée directement, sans charger webview / tkinter / pystray.
+Résultat en JSON sur la sortie standard, code de sortie 0 si tout a réussi.
+"""
+import argparse
+import contextlib
+import json
+import os
+import sys
+
+COMMANDS = ("start", "stop", "status", "restart", "spans")
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+EXIT_UNREACHABLE = 3
+
+
+def _select(names, profile):
+    """(ids, erreurs) : ids des apps nommées, ou None pour laisser l'API choisir (cochées / profil)"""
+    from main import app_registry, load_settings
+
+    if profile is not None:
+        if profile not in load_settings().get("profiles", {}):
+            return None, [f"Profil inconnu : {profile}"]
+        return None, []
+    if not names:
+        return None, []
+
+    # Apps désignées par nom (ou id) : lancées même si elles ne sont pas cochées
+    ids = [app_registry.resolve(name) for name in names]
+    errors = [f"App inconnue : {name}" for name, app_id in zip(names, ids) if app_id is None]
+    return [app_id for app_id in ids if app_id is not None], errors
+
+
+def execute(api, command, names=None, profile=None, limit=50, min_ms=0):
+    """Exécute une commande avec une instance de main.Api. Retourne {command, ok, errors, result}."""
+    if command not in COMMANDS:
+        return {"command": command, "ok": False, "errors": [f"Commande inconnue : {command}"], "result": None}
+    if command == "spans":
+        # Noms = préfixe du span (ex: "api.start_selected", "update.")
+        result = api.get_spans(limit, min_ms, names[0] if names else None)
+        return {"command": command, "ok": True, "errors": [], "result": result}
+
+    ids, errors = _select(names or [], profile)
+    if errors and ids is None:
+        return {"command": command, "ok": False, "errors": errors, "result": None}
+
+    if command == "status":
+        result = api.get_status(ids, profile)
+        ok = True
+    elif command == "start":
+        result = api.start_selected(ids, profile)
+        errors += result.get("errors", [])
+        ok = result.get("ok", False)
+    elif command == "stop":
+        result = api.stop_selected(ids, profile)
+        errors += result.get("errors", [])
+        ok = not result.get("errors")
+    else:
+        result = api.restart_selected(ids, profile)
+        errors += [f"{r.get('name')}: {r.get('error')}" for r in result if not r.get("ok")]
+        ok = all(r.get("ok") for r in result)
+
+    return {"command": command, "ok": ok and not errors, "errors": errors, "result": result}
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog="iRacing_Launcher", description="iRacing Launcher en ligne de commande")
+    parser.add_argument("command", choices=COMMANDS)
+    parser.add_argument("apps", nargs="*",
+                        help="noms ou ids des apps (par défaut : apps cochées) ; préfixe de span pour spans")
+    parser.add_argument("--profile", help="profil défini dans launcher_settings.json")
+    parser.add_argument("--config-dir", help="dossier de launcher_apps.json (défaut : dossier de l'exe)")
+    parser.add_argument("--timeout", type=float, default=120,
+                        help="attente max (s) de la réponse du launcher déjà ouvert")
+    parser.add_argument("--limit", type=int, default=50, help="spans : nombre max de spans")
+    parser.add_argument("--min-ms", type=float, default=0, help="spans : durée minimale (ms)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    try:
+        args = parse_args(sys.argv[1:] if argv is None else argv)
+    except SystemExit as e:
+        return EXIT_USAGE if e.code else EXIT_OK
+
+    # Fichiers de config relatifs : même dossier que le launcher lancé par double-clic
+    config_dir = args.config_dir or (os.path.dirname(sys.executable) if getattr(sys, 'frozen', False) else None)
+    if config_dir:
+        os.chdir(config_dir)
+
+    from instance import SingleInstance, send_command
+    request = {"command": args.command, "names": args.apps, "profile": args.profile,
+               "limit": args.limit, "min_ms": args.min_ms}
+
+    instance = SingleInstance()
+    if not instance.acquire():
+        # Le launcher tourne : c'est lui qui exécute (registre des processus, UI à jour)
+        reply = send_command("cli", request, timeout=args.timeout)
+        if reply is None:
+            print(json.dumps({"command": args.command, "ok": False,
+                              "errors": ["Launcher en cours injoignable"], "result": None}))
+            return EXIT_UNREACHABLE
+        output = reply.get("result") if reply.get("ok") else {
+            "command": args.command, "ok": False, "errors": [reply.get("error")], "result": None}
+    else:
+        # Pas de launcher ouvert : exécution locale, le verrou empêche la GUI de démarrer entre-temps
+        try:
+            from logs import LOG_FILE, setup_logging
+            from main import Api
+            from store import flush_all
+
+            # Même journal que la GUI (elle ne peut pas démarrer tant que le verrou est pris)
+            setup_logging(LOG_FILE)
+
+            # Messages de diagnostic sur stderr : stdout ne contient que le JSON
+            with contextlib.redirect_stdout(sys.stderr):
+                output = execute(Api(watch=False), **request)
+                flush_all()
+        finally:
+            instance.release()
+
+    print(json.dumps(output, indent=2, ensure_ascii=False))
+    return EXIT_OK if output.get("ok") else EXIT_FAILED
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,242 @@
+"""
+iRacing Launcher - Mises à jour différentielles
+Un delta décrit le nouvel exe à partir de l'ancien : blocs recopiés depuis
+l'ancien fichier (COPY) et octets nouveaux (INSERT). Dans un exe PyInstaller
+onefile, les modules inchangés restent identiques octet pour octet (seulement
+décalés), donc une release qui ne touche qu'à ui/ ou main.py tient en
+quelques centaines de Ko au lieu de ~30 Mo.
+
+Format : MAGIC | taille du nouveau fichier | sha256 ancien | sha256 nouveau,
+suivi du flux d'opérations compressé zlib :
+    b"C" offset(8) longueur(4)   recopie depuis l'ancien fichier
+    b"I" longueur(4) octets      insertion
+    b"E"                         fin
+
+Génération au build (outil en ligne de commande) :
+    python delta.py make ancien.exe nouveau.exe sortie.delta
+"""
+import hashlib
+import json
+import os
+import struct
+import sys
+import zlib
+
+MAGIC = b"IRLDELT1"
+HEADER = struct.Struct(">Q32s32s")
+COPY = struct.Struct(">QI")
+INSERT = struct.Struct(">I")
+DEFAULT_BLOCK_SIZE = 2048
+_ADLER_MOD = 65521
+_READ_SIZE = 1024 * 1024
+
+
+class DeltaError(Exception):
+    """Delta invalide ou qui ne s'applique pas à ce fichier"""
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_READ_SIZE), b""):
+            digest.update(chunk)
+    return digest.digest()
+
+
+# ===== GÉNÉRATION (au build) =====
+def _ops(old, new, block_size):
+    """
+    Opérations ("C", offset, longueur) / ("I", octets) qui reconstruisent `new`.
+    Algorithme de type rsync : index des blocs alignés de l'ancien fichier par
+    checksum adler32, puis recherche glissante (checksum roulant) dans le nouveau.
+    """
+    size = block_size
+    index = {}
+    for offset in range(0, len(old) - size + 1, size):
+        index.setdefault(zlib.adler32(old[offset:offset + size]), []).append(offset)
+
+    n = len(new)
+    pos = 0
+    literal_start = 0
+    copy = None  # copie en cours [offset, longueur], fusionnée tant qu'elle est contiguë
+    weak = zlib.adler32(new[0:size]) if n >= size else None
+
+    while weak is not None:
+        match = None
+        for offset in index.get(weak, ()):
+            if old[offset:offset + size] == new[pos:pos + size]:
+                match = offset
+                break
+
+        if match is not None:
+            if literal_start < pos:
+                if copy:
+                    yield ("C", copy[0], copy[1])
+                    copy = None
+                yield ("I", new[literal_start:pos])
+            if copy and copy[0] + copy[1] == match:
+                copy[1] += size
+            else:
+                if copy:
+                    yield ("C", copy[0], copy[1])
+                copy = [match, size]
+            pos += size
+            # Blocs suivants identiques dans l'ancien fichier : on prolonge sans recalculer
+            while (pos + size <= n and copy[0] + copy[1] + size <= len(old)
+                   and old[copy[0] + copy[1]:copy[0] + copy[1] + size] == new[pos:pos + size]):
+                copy[1] += size
+                pos += size
+            literal_start = pos
+            weak = zlib.adler32(new[pos:pos + size]) if pos + size <= n else None
+            continue
+
+        if pos + size >= n:
+            break
+        # Checksum roulant : retire new[pos], ajoute new[pos + size]
+        out_byte = new[pos]
+        a = ((weak & 0xFFFF) - out_byte + new[pos + size]) % _ADLER_MOD
+        b = ((weak >> 16) - size * out_byte + a - 1) % _ADLER_MOD
+        weak = (b << 16) | a
+        pos += 1
+
+    if copy:
+        yield ("C", copy[0], copy[1])
+    if literal_start < n:
+        yield ("I", new[literal_start:])
+
+
+def make_delta(old_path, new_path, delta_path, block_size=DEFAULT_BLOCK_SIZE):
+    """Écrit le delta old -> new. Retourne un résumé (tailles, octets recopiés)."""
+    with open(old_path, "rb") as f:
+        old = f.read()
+    with open(new_path, "rb") as f:
+        new = f.read()
+
+    compressor = zlib.compressobj(9)
+    chunks = []
+    copied = inserted = 0
+    for op in _ops(old, new, block_size):
+        if op[0] == "C":
+            copied += op[2]
+            chunks.append(compressor.compress(b"C" + COPY.pack(op[1], op[2])))
+        else:
+            inserted += len(op[1])
+            chunks.append(compressor.compress(b"I" + INSERT.pack(len(op[1]))))
+            chunks.append(compressor.compress(op[1]))
+    chunks.append(compressor.compress(b"E"))
+    chunks.append(compressor.flush())
+
+    header = MAGIC + HEADER.pack(len(new), hashlib.sha256(old).digest(), hashlib.sha256(new).digest())
+    with open(delta_path, "wb") as f:
+        f.write(header)
+        for chunk in chunks:
+            f.write(chunk)
+
+    return {
+        "new_size": len(new),
+        "delta_size": os.path.getsize(delta_path),
+        "copied": copied,
+        "inserted": inserted,
+        "sha256": hashlib.sha256(new).hexdigest(),
+    }
+
+
+# ===== APPLICATION (au moment de la mise à jour) =====
+def apply_delta(old_path, delta_path, out_path):
+    """
+    Reconstruit le nouveau fichier dans `out_path` (via out_path + ".part").
+    Vérifie le hash de l'ancien fichier avant et celui du résultat après ;
+    lève DeltaError si le delta ne correspond pas.
+    """
+    with open(delta_path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise DeltaError("Fichier delta invalide")
+        try:
+            new_size, old_sha, new_sha = HEADER.unpack(f.read(HEADER.size))
+            ops = zlib.decompress(f.read())
+        except (struct.error, zlib.error) as e:
+            raise DeltaError(f"Fichier delta corrompu : {e}") from e
+
+    if _sha256(old_path) != old_sha:
+        raise DeltaError("Le delta ne correspond pas à la version installée")
+
+    part = out_path + ".part"
+    digest = hashlib.sha256()
+    written = 0
+    pos = 0
+    try:
+        with open(old_path, "rb") as old, open(part, "wb") as out:
+            while True:
+                op = ops[pos:pos + 1]
+                pos += 1
+                if op == b"C":
+                    offset, length = COPY.unpack_from(ops, pos)
+                    pos += COPY.size
+                    old.seek(offset)
+                    while length:
+                        data = old.read(min(length, _READ_SIZE))
+                        if not data:
+                            raise DeltaError("Copie hors de l'ancien fichier")
+                        out.write(data)
+                        digest.update(data)
+                        written += len(data)
+                        length -= len(data)
+                elif op == b"I":
+                    (length,) = INSERT.unpack_from(ops, pos)
+                    pos += INSERT.size
+                    data = ops[pos:pos + length]
+                    pos += length
+                    out.write(data)
+                    digest.update(data)
+                    written += len(data)
+                elif op == b"E":
+                    break
+                else:
+                    raise DeltaError("Opération inconnue dans le delta")
+    except (struct.error, OSError) as e:
+        _remove(part)
+        raise DeltaError(f"Application du delta impossible : {e}") from e
+    except DeltaError:
+        _remove(part)
+        raise
+
+    if written != new_size or digest.digest() != new_sha:
+        _remove(part)
+        raise DeltaError("Le fichier reconstruit ne correspond pas à la nouvelle version")
+    os.replace(part, out_path)
+    return out_path
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def main(argv):
+    if len(argv) != 5 or argv[1] not in ("make", "apply"):
+        print("Usage: python delta.py make <ancien.exe> <nouveau.exe> <sortie.delta>")
+        print("       python delta.py apply <ancien.exe> <fichier.delta> <sortie.exe>")
+        return 1
+
+    if argv[1] == "apply":
+        apply_delta(argv[2], argv[3], argv[4])
+        print(f"Fichier reconstruit : {argv[4]}")
+        return 0
+
+    info = make_delta(argv[2], argv[3], argv[4])
+    ratio = info["delta_size"] * 100 / max(info["new_size"], 1)
+    print(f"Delta : {info['delta_size']} octets ({ratio:.1f}% du nouvel exe)")
+    print(f"  recopiés : {info['copied']} octets, nouveaux : {info['inserted']} octets")
+    print("Entrée pour \"deltas\" dans version.json (clé = version de départ) :")
+    print(json.dumps({
+        "url": "<URL de " + os.path.basename(argv[4]) + ">",
+        "sha256": _sha256(argv[4]).hex(),
+        "size": info["delta_size"],
+    }, indent=4))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,417 @@
+"""
+iRacing Launcher - Moteur de lancement / arrêt
+Lancement parallèle des apps (pool de threads), délais et dépendances par app,
+attente de disponibilité (processus, port TCP, titre de fenêtre) et timings.
+Arrêt groupé : un scan, terminate de tous les PIDs, attente sur ce seul lot, kill.
+"""
+import logging
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import psutil
+
+from processes import wait_exit
+
+log = logging.getLogger(__name__)
+
+# Attente max (secondes) de la disponibilité d'une app
+DEFAULT_READY_TIMEOUT = 15.0
+READY_POLL_INTERVAL = 0.1
+DEFAULT_LAUNCH_WORKERS = 8
+
+# Délai de grâce (secondes) entre terminate et kill
+DEFAULT_STOP_GRACE = 3.0
+
+# Nom du nœud qui regroupe toutes les apps administrateur (une seule élévation)
+ELEVATED_GROUP = "__elevated__"
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 1)
+
+
+def _port_open(port):
+    try:
+        with socket.create_connection(("127.0.0.1", int(port)), timeout=0.2):
+            return True
+    except OSError:
+        return False
+
+
+def _window_title_open(pids, title):
+    """Vrai si un processus de `pids` possède une fenêtre visible dont le titre contient `title`"""
+    try:
+        import win32gui
+        import win32process
+    except ImportError:
+        return True  # Sonde indisponible (hors Windows) : on se contente du processus
+
+    title = title.lower()
+    found = []
+
+    def callback(hwnd, _):
+        if win32gui.IsWindowVisible(hwnd) and title in win32gui.GetWindowText(hwnd).lower():
+            _, pid = win32process.GetWindowThreadProcessId(hwnd)
+            if pid in pids:
+                found.append(hwnd)
+
+    win32gui.EnumWindows(callback, None)
+    return bool(found)
+
+
+class LaunchScheduler:
+    """
+    Lance un lot d'apps en parallèle.
+    Champs optionnels par app (launcher_apps.json) :
+      start_delay    : délai (s) avant le lancement, après les dépendances
+      depends_on     : noms des apps à attendre (ex: SimHub après l'UI iRacing)
+      ready_port     : port TCP local qui doit accepter une connexion
+      ready_window   : texte contenu dans le titre d'une fenêtre de l'app
+      ready_timeout  : attente max de la disponibilité (s)
+    Les apps administrateur sont lancées ensemble par une seule élévation.
+    on_spawn(app, [TrackedProcess]) est appelé juste après chaque lancement
+    (priorité / affinité), avant l'attente de disponibilité.
+    """
+
+    def __init__(self, registry, max_workers=DEFAULT_LAUNCH_WORKERS, on_spawn=None):
+        self.registry = registry
+        self.max_workers = max_workers
+        self.on_spawn = on_spawn
+
+    def launch(self, apps):
+        """
+        Lance les apps et attend leur disponibilité.
+        Retourne {"ok", "errors", "timings": [...], "elapsed_ms"}.
+        """
+        t0 = time.perf_counter()
+        if not apps:
+            return {"ok": True, "errors": [], "timings": [], "elapsed_ms": 0.0}
+
+        names = [app.get("name") or app.get("path", "") for app in apps]
+        by_name = {name: i for i, name in enumerate(names)}
+        elevated = [i for i, app in enumerate(apps) if app.get("admin_required")]
+
+        def node(i):
+            return ELEVATED_GROUP if apps[i].get("admin_required") else i
+
+        # Graphe de dépendances (les apps hors du lot sont ignorées)
+        deps = {node(i): set() for i in range(len(apps))}
+        for i, app in enumerate(apps):
+            for dep in app.get("depends_on") or []:
+                j = by_name.get(dep)
+                if j is not None and node(j) != node(i):
+                    deps[node(i)].add(node(j))
+        order = self._topological_order(deps)
+
+        done = {n: threading.Event() for n in deps}
+        timings = [{"name": names[i], "ok": False, "error": None} for i in range(len(apps))]
+
+        def wait_deps(n):
+            for dep in deps[n]:
+                done[dep].wait()
+
+        def run_app(i):
+            try:
+                wait_deps(i)
+                delay = float(apps[i].get("start_delay") or 0)
+                if delay:
+                    time.sleep(delay)
+                # Temps écoulé avant le lancement (dépendances + délai)
+                timings[i]["wait_ms"] = _ms(time.perf_counter() - t0)
+
+                t_spawn = time.perf_counter()
+                tracked = self.registry.spawn(apps[i]["path"])
+                timings[i]["spawn_ms"] = _ms(time.perf_counter() - t_spawn)
+                self._spawned(apps[i], tracked)
+                self._wait_ready([i], [tracked], apps, timings)
+            except Exception as e:
+                timings[i]["error"] = str(e)
+            finally:
+                timings[i]["total_ms"] = _ms(time.perf_counter() - t0)
+                done[i].set()
+
+        def run_elevated(_group):
+            try:
+                wait_deps(ELEVATED_GROUP)
+                wait_ms = _ms(time.perf_counter() - t0)
+                # Ordre interne au lot : par instant de lancement, délais via Start-Sleep
+                schedule = self._elevated_schedule(elevated, apps, by_name)
+                batch = [i for i, _ in schedule]
+                t_spawn = time.perf_counter()
+                tracked = self.registry.spawn_elevated(
+                    [(apps[i]["path"], sleep) for i, sleep in schedule]
+                )
+                spawn_ms = _ms(time.perf_counter() - t_spawn)
+                for i, t in zip(batch, tracked):
+                    timings[i]["wait_ms"] = wait_ms
+                    timings[i]["spawn_ms"] = spawn_ms
+                    self._spawned(apps[i], t)
+                self._wait_ready(batch, tracked, apps, timings)
+            except Exception as e:
+                for i in elevated:
+                    timings[i]["error"] = str(e)
+            finally:
+                for i in elevated:
+                    timings[i]["total_ms"] = _ms(time.perf_counter() - t0)
+                done[ELEVATED_GROUP].set()
+
+        # Soumission dans l'ordre topologique : une tâche n'attend que des tâches
+        # déjà démarrées, donc pas d'interblocage même avec peu de workers
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="launch") as pool:
+            for n in order:
+                pool.submit(run_elevated if n == ELEVATED_GROUP else run_app, n)
+
+        errors = [f"{t['name']}: {t['error']}" for t in timings if t["error"]]
+        report = {
+            "ok": not errors,
+            "errors": errors,
+            "timings": timings,
+            "elapsed_ms": _ms(time.perf_counter() - t0),
+        }
+        for t in timings:
+            log.info(f"[launch] {t['name']}: spawn {t.get('spawn_ms')} ms, "
+                     f"ready {t.get('ready_ms')} ms, total {t.get('total_ms')} ms"
+                     + (f" - {t['error']}" if t["error"] else ""))
+        return report
+
+    def _spawned(self, app, tracked):
+        if tracked is not None and self.on_spawn is not None:
+            try:
+                self.on_spawn(app, [tracked])
+            except Exception as e:
+                log.exception(f"[launch] {app.get('name', '?')}: {e}")
+
+    def _wait_ready(self, indexes, tracked, apps, timings):
+        """Attend que chaque app soit disponible (processus + sondes optionnelles)"""
+        t_ready = time.perf_counter()
+        pending = {}
+        for i, t in zip(indexes, tracked):
+            if t is None:
+                timings[i]["error"] = "Lancement refusé ou impossible"
+                continue
+            deadline = t_ready + float(apps[i].get("ready_timeout") or DEFAULT_READY_TIMEOUT)
+            pending[i] = (t, deadline)
+
+        while pending:
+            now = time.perf_counter()
+            for i, (t, deadline) in list(pending.items()):
+                app = apps[i]
+                if not t.is_alive():
+                    code = t.popen.returncode if t.popen is not None else None
+                    if code:
+                        timings[i]["error"] = f"Processus terminé avant d'être prêt (code {code})"
+                    else:
+                        # Lanceur intermédiaire qui a passé la main : considéré comme prêt
+                        timings[i]["ok"] = True
+                        timings[i]["ready_ms"] = _ms(time.perf_counter() - t_ready)
+                elif app.get("ready_port") and not _port_open(app["ready_port"]):
+                    if now < deadline:
+                        continue
+                    timings[i]["error"] = f"Port {app['ready_port']} indisponible"
+                elif app.get("ready_window") and not _window_title_open({t.pid}, app["ready_window"]):
+                    if now < deadline:
+                        continue
+                    timings[i]["error"] = f"Fenêtre '{app['ready_window']}' introuvable"
+                else:
+                    timings[i]["ok"] = True
+                    timings[i]["ready_ms"] = _ms(time.perf_counter() - t_ready)
+                del pending[i]
+            if pending:
+                time.sleep(READY_POLL_INTERVAL)
+
+    @staticmethod
+    def _topological_order(deps):
+        """Ordre de lancement ; en cas de cycle, les dépendances restantes sont ignorées"""
+        remaining = {n: set(d) for n, d in deps.items()}
+        order = []
+        while remaining:
+            free = [n for n, d in remaining.items() if not d]
+            if not free:
+                log.warning(f"[launch] Dépendance circulaire ignorée : {list(remaining)}")
+                free = list(remaining)
+                for n in free:
+                    deps[n] = set()
+            for n in free:
+                order.append(n)
+                del remaining[n]
+            for d in remaining.values():
+                d.difference_update(free)
+        return order
+
+    @staticmethod
+    def _elevated_order(elevated, apps, by_name):
+        """Ordre des apps administrateur entre elles (dépendances internes au lot)"""
+        inner = set(elevated)
+        deps = {}
+        for i in elevated:
+            deps[i] = {by_name[d] for d in apps[i].get("depends_on") or []
+                       if by_name.get(d) in inner and by_name[d] != i}
+        return LaunchScheduler._topological_order(deps)
+
+    @staticmethod
+    def _elevated_schedule(elevated, apps, by_name):
+        """
+        [(index, attente depuis le lancement précédent)] pour le script élevé.
+        Chaque app part à (lancement de ses dépendances du lot) + start_delay :
+        le délai d'une app ne retarde pas les apps qui n'en dépendent pas.
+        """
+        order = LaunchScheduler._elevated_order(elevated, apps, by_name)
+        inner = set(elevated)
+        offsets = {}
+        for i in order:  # dépendances avant les apps qui les attendent
+            after = [offsets[by_name[d]] for d in apps[i].get("depends_on") or []
+                     if by_name.get(d) in inner and by_name[d] in offsets]
+            offsets[i] = max(after, default=0.0) + float(apps[i].get("start_delay") or 0)
+        # Tri stable : à instant égal, l'ordre des dépendances est conservé
+        order.sort(key=lambda i: offsets[i])
+        schedule = []
+        previous = 0.0
+        for i in order:
+            schedule.append((i, offsets[i] - previous))
+            previous = offsets[i]
+        return schedule
+
+
+class StopEngine:
+    """
+    Arrête un lot d'apps en une passe :
+    1. collecte des PIDs de toutes les apps (registre, au plus un scan)
+    2. terminate de tous les processus d'un coup
+    3. attente uniquement sur ces processus
+    4. kill des survivants une fois le délai de grâce de leur app écoulé
+    Champ optionnel par app : stop_grace (s).
+    """
+
+    def __init__(self, registry):
+        self.registry = registry
+
+    def stop(self, apps):
+        """Retourne {"killed", "errors", "results": [...], "elapsed_ms"}"""
+        t0 = time.perf_counter()
+        found = self.registry.find_all([app.get("path", "") for app in apps])
+
+        results = []
+        deadlines = {}  # psutil.Process -> (index résultat, échéance du kill)
+        for app in apps:
+            result = {"name": app.get("name", "Unknown"), "found": 0, "terminated": 0,
+                      "killed": 0, "remaining": 0, "error": None}
+            grace = float(app.get("stop_grace", DEFAULT_STOP_GRACE))
+            for tracked in found.get(app.get("path", ""), ()):
+                result["found"] += 1
+                try:
+                    tracked.proc.terminate()
+                    deadlines[tracked.proc] = (len(results), t0 + grace)
+                except psutil.NoSuchProcess:
+                    continue
+                except psutil.AccessDenied as e:
+                    result["error"] = f"Accès refusé (PID {e.pid})"
+            results.append(result)
+
+        def on_exit(proc):
+            # Temps d'arrêt de l'app = sortie de son dernier processus
+            results[deadlines[proc][0]]["elapsed_ms"] = _ms(time.perf_counter() - t0)
+
+        alive = list(deadlines)
+        while alive:
+            # Attente jusqu'à la prochaine échéance de kill, sur ce lot uniquement
+            next_deadline = min(deadlines[p][1] for p in alive)
+            _, alive = wait_exit(
+                alive, timeout=max(0.0, next_deadline - time.perf_counter()), callback=on_exit
+            )
+
+            now = time.perf_counter()
+            overdue = [p for p in alive if deadlines[p][1] <= now]
+            if not overdue:
+                continue
+            for proc in overdue:
+                try:
+                    proc.kill()
+                    results[deadlines[proc][0]]["killed"] += 1
+                except (psutil.NoSuchProcess, psutil.AccessDenied):
+                    pass
+            _, still = wait_exit(overdue, timeout=1, callback=on_exit)
+            for proc in still:
+                results[deadlines[proc][0]]["remaining"] += 1
+            alive = [p for p in alive if p not in overdue]
+
+        for idx, _ in deadlines.values():
+            results[idx]["terminated"] += 1
+
+        self.registry.snapshot.invalidate()
+        for result in results:
+            result.setdefault("elapsed_ms", 0.0)
+            log.info(f"[stop] {result['name']}: {result['terminated']} arrêté(s), "
+                     f"{result['killed']} tué(s), {result['remaining']} restant(s) "
+                     f"en {result['elapsed_ms']} ms")
+
+        errors = [f"{r['name']}: {r['error']}" for r in results if r["error"]]
+        errors += [f"{r['name']}: {r['remaining']} processus toujours actif(s)"
+                   for r in results if r["remaining"]]
+        return {
+            "killed": sum(r["terminated"] for r in results),
+            "errors": errors,
+            "results": results,
+            "elapsed_ms": _ms(time.perf_counter() - t0),
+        }
+
+
+class RestartPipeline:
+    """
+    Redémarrage d'une app hors du thread du bridge :
+    arrêt (attente sur les PIDs terminés + kill) puis relance dès leur sortie.
+    Rapporte les latences d'arrêt, de relance et de disponibilité.
+    """
+
+    def __init__(self, stopper, launcher):
+        self.stopper = stopper
+        self.launcher = launcher
+        self._lock = threading.Lock()
+        self._running = set()
+
+    def start(self, app, on_done):
+        """Lance le redémarrage en arrière-plan. Retourne False si déjà en cours pour cette app."""
+        key = app.get("path", "")
+        with self._lock:
+            if key in self._running:
+                return False
+            self._running.add(key)
+
+        def worker():
+            try:
+                report = self.run(app)
+            except Exception as e:
+                report = {"ok": False, "error": str(e)}
+            finally:
+                with self._lock:
+                    self._running.discard(key)
+            on_done(app, report)
+
+        threading.Thread(target=worker, name="restart", daemon=True).start()
+        return True
+
+    def run(self, app):
+        t0 = time.perf_counter()
+        stop = self.stopper.stop([app])
+        stop_result = stop["results"][0]
+        if stop_result["remaining"]:
+            return {"ok": False, "error": stop["errors"][0], "stop_ms": stop["elapsed_ms"]}
+
+        # Relance immédiate : pas de start_delay ni de dépendances pour un redémarrage
+        relaunch = dict(app, start_delay=0, depends_on=[])
+        launch = self.launcher.launch([relaunch])
+        timing = launch["timings"][0]
+
+        report = {
+            "ok": launch["ok"],
+            "error": timing["error"],
+            "was_running": stop_result["terminated"] > 0,
+            "stop_ms": stop["elapsed_ms"],
+            "relaunch_ms": timing.get("spawn_ms"),
+            "ready_ms": timing.get("ready_ms"),
+            "total_ms": _ms(time.perf_counter() - t0),
+        }
+        log.info(f"[restart] {app.get('name', '?')}: arrêt {report['stop_ms']} ms, "
+                 f"relance {report['relaunch_ms']} ms, prêt {report['ready_ms']} ms")
+        return report
@@ -0,0 +1,41 @@
+# -*- mode: python ; coding: utf-8 -*-
+# Ligne de commande (start / stop / status / restart / spans) : exe console,
+# sinon la sortie JSON est perdue (un exe fenêtré n'a pas de sys.stdout)
+
+
+a = Analysis(
+    ['cli.py'],
+    pathex=[],
+    binaries=[],
+    datas=[],
+    hiddenimports=['psutil'],
+    hookspath=[],
+    hooksconfig={},
+    runtime_hooks=[],
+    excludes=['webview', 'pystray', 'PIL', 'tkinter'],
+    noarchive=False,
+    optimize=0,
+)
+pyz = PYZ(a.pure)
+
+exe = EXE(
+    pyz,
+    a.scripts,
+    a.binaries,
+    a.datas,
+    [],
+    name='iRacing_Launcher_cli',
+    debug=False,
+    bootloader_ignore_signals=False,
+    strip=False,
+    upx=True,
+    upx_exclude=[],
+    runtime_tmpdir=None,
+    console=True,
+    disable_windowed_traceback=False,
+    argv_emulation=False,
+    target_arch=None,
+    codesign_identity=None,
+    entitlements_file=None,
+    icon=['icone.ico'],
+)
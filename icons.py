@@ -0,0 +1,155 @@
+"""
+iRacing Launcher - Cache d'icônes
+Les icônes extraites des .exe sont stockées en PNG dans un dossier de cache,
+indexées par (chemin, taille du fichier, mtime). La config ne garde que la
+référence (icon_ref) ; l'UI récupère les icônes à la demande.
+"""
+import base64
+import hashlib
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+log = logging.getLogger(__name__)
+
+ICON_CACHE_DIR = "icon_cache"
+ICON_SIZE = 32
+DEFAULT_ICON_WORKERS = 4
+
+
+def win32_extractor(exe_path, size=ICON_SIZE):
+    """Extrait la grande icône d'un .exe via GDI. Retourne une image PIL RGBA ou None."""
+    import win32gui, win32ui
+    from PIL import Image
+
+    large, small = win32gui.ExtractIconEx(exe_path, 0)
+    for handle in small:
+        win32gui.DestroyIcon(handle)
+    if not large:
+        return None
+
+    hdc = win32ui.CreateDCFromHandle(win32gui.GetDC(0))
+    hbmp = win32ui.CreateBitmap()
+    hbmp.CreateCompatibleBitmap(hdc, size, size)
+    hdc2 = hdc.CreateCompatibleDC()
+    hdc2.SelectObject(hbmp)
+    hdc2.DrawIcon((0, 0), large[0])
+    for handle in large:
+        win32gui.DestroyIcon(handle)
+
+    bmpstr = hbmp.GetBitmapBits(True)
+    return Image.frombuffer('RGBA', (size, size), bmpstr, 'raw', 'BGRA', 0, 1)
+
+
+def default_extractor():
+    """Extracteur Win32 si pywin32 est disponible, sinon aucun (pas d'icônes)"""
+    try:
+        import win32gui  # noqa: F401
+        return win32_extractor
+    except ImportError:
+        return None
+
+
+class IconCache:
+    """
+    Cache disque des icônes.
+    extractor(exe_path, size) -> image PIL (ou None) : remplaçable, par ex. par un
+    extracteur factice pour tester le cache et l'encodage hors Windows.
+    """
+
+    def __init__(self, cache_dir=ICON_CACHE_DIR, extractor=None, size=ICON_SIZE,
+                 max_workers=DEFAULT_ICON_WORKERS):
+        self.cache_dir = cache_dir
+        self.extractor = extractor if extractor is not None else default_extractor()
+        self.size = size
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        self._data_urls = {}  # ref -> data URL déjà encodée
+
+    def key(self, exe_path):
+        """Référence de l'icône : dépend du chemin, de la taille et du mtime de l'exe"""
+        st = os.stat(exe_path)
+        raw = f"{os.path.normcase(os.path.abspath(exe_path))}|{st.st_size}|{st.st_mtime_ns}"
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:20]
+
+    def ref(self, exe_path):
+        """Retourne la référence de l'icône (extraite si absente du cache) ou None"""
+        if not exe_path or not os.path.exists(exe_path):
+            return None
+        try:
+            ref = self.key(exe_path)
+            if os.path.exists(self._file(ref)):
+                return ref
+            if self.extractor is None:
+                return None
+            img = self.extractor(exe_path, self.size)
+            if img is None:
+                return None
+            buffered = BytesIO()
+            img.save(buffered, format="PNG")
+            self._write(ref, buffered.getvalue())
+            return ref
+        except Exception as e:
+            log.warning(f"Erreur icône : {e}")
+            return None
+
+    def refs(self, exe_paths):
+        """{chemin: ref} pour plusieurs exe, extraction en parallèle sur un pool"""
+        paths = list(dict.fromkeys(p for p in exe_paths if p))
+        if len(paths) <= 1:
+            return {p: self.ref(p) for p in paths}
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="icon") as pool:
+            return dict(zip(paths, pool.map(self.ref, paths)))
+
+    def data_url(self, ref):
+        """Data URL PNG pour une référence (None si absente du cache)"""
+        if not ref:
+            return None
+        with self._lock:
+            if ref in self._data_urls:
+                return self._data_urls[ref]
+        try:
+            with open(self._file(ref), "rb") as f:
+                url = "data:image/png;base64," + base64.b64encode(f.read()).decode()
+        except OSError:
+            return None
+        with self._lock:
+            self._data_urls[ref] = url
+        return url
+
+    def import_data_url(self, exe_path, data_url):
+        """Migration : range une icône inline (ancienne config) dans le cache, retourne sa ref"""
+        try:
+            png = base64.b64decode(data_url.split(",", 1)[1])
+            if exe_path and os.path.exists(exe_path):
+                ref = self.key(exe_path)
+            else:
+                ref = hashlib.sha1(png).hexdigest()[:20]
+            if not os.path.exists(self._file(ref)):
+                self._write(ref, png)
+            return ref
+        except Exception as e:
+            log.warning(f"Erreur migration icône : {e}")
+            return None
+
+    def prune(self, keep_refs):
+        """Supprime les icônes qui ne sont plus référencées (exe mis à jour, app supprimée)"""
+        keep = {f"{ref}.png" for ref in keep_refs if ref}
+        try:
+            for name in os.listdir(self.cache_dir):
+                if name.endswith(".png") and name not in keep:
+                    os.remove(os.path.join(self.cache_dir, name))
+        except OSError:
+            pass
+
+    def _file(self, ref):
+        return os.path.join(self.cache_dir, f"{ref}.png")
+
+    def _write(self, ref, png):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp = f"{self._file(ref)}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(png)
+        os.replace(tmp, self._file(ref))
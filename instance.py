@@ -0,0 +1,210 @@
+"""
+iRacing Launcher - Instance unique
+Verrou exclusif au niveau de l'OS sur un fichier du dossier utilisateur
+(libéré automatiquement si le launcher plante : plus de lock périmé) et canal
+IPC local : un second lancement transmet sa commande ("show", ...) à
+l'instance en cours puis quitte immédiatement.
+
+Protocole : une connexion TCP sur 127.0.0.1 par commande, une ligne JSON
+{"token", "command", "args"} en requête et une ligne JSON {"ok", "result"|"error"}
+en réponse. Le port et le jeton sont publiés dans instance.json, dans le
+dossier de l'utilisateur.
+"""
+import hmac
+import json
+import logging
+import os
+import secrets
+import socket
+import sys
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+APP_DIR_NAME = "iRacingLauncher"
+LOCK_FILE_NAME = "launcher.lock"
+INFO_FILE_NAME = "instance.json"
+DEFAULT_IPC_TIMEOUT = 2.0
+_MAX_MESSAGE = 64 * 1024
+
+
+def user_state_dir():
+    """Dossier par utilisateur, indépendant du dossier courant"""
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.join(os.path.expanduser("~"), "AppData", "Local")
+    else:
+        base = os.environ.get("XDG_STATE_HOME") or os.path.join(os.path.expanduser("~"), ".local", "state")
+    path = os.path.join(base, APP_DIR_NAME)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _lock_file(f):
+    """Verrou exclusif non bloquant ; OSError si déjà pris par un autre processus"""
+    if sys.platform == "win32":
+        import msvcrt
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+    else:
+        import fcntl
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+
+def _read_line(conn):
+    data = b""
+    while not data.endswith(b"\n"):
+        chunk = conn.recv(4096)
+        if not chunk:
+            break
+        data += chunk
+        if len(data) > _MAX_MESSAGE:
+            raise ValueError("Message IPC trop long")
+    return json.loads(data.decode("utf-8"))
+
+
+def _send_line(conn, message):
+    conn.sendall(json.dumps(message).encode("utf-8") + b"\n")
+
+
+class SingleInstance:
+    """
+    acquire() prend le verrou (False si une autre instance tourne) ;
+    serve(handlers) publie le canal IPC : handlers = {commande: fonction(args) -> résultat}.
+    """
+
+    def __init__(self, state_dir=None):
+        self.state_dir = state_dir
+        self._lock = None
+        self._server = None
+        self._token = None
+        self._handlers = {}
+
+    def _path(self, name):
+        if self.state_dir is None:
+            self.state_dir = user_state_dir()
+        return os.path.join(self.state_dir, name)
+
+    def acquire(self):
+        """True si cette instance est la seule (le verrou est gardé jusqu'à release())"""
+        path = self._path(LOCK_FILE_NAME)
+        os.makedirs(self.state_dir, exist_ok=True)
+        f = open(path, "a+")
+        try:
+            _lock_file(f)
+        except OSError:
+            f.close()
+            return False
+        f.seek(0)
+        f.truncate()
+        f.write(str(os.getpid()))
+        f.flush()
+        self._lock = f
+        return True
+
+    def serve(self, handlers):
+        """Démarre le serveur IPC et publie son port dans instance.json"""
+        self._handlers = dict(handlers)
+        self._token = secrets.token_hex(16)
+        self._server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._server.bind(("127.0.0.1", 0))
+        self._server.listen(8)
+
+        info = {"pid": os.getpid(), "port": self._server.getsockname()[1], "token": self._token}
+        path = self._path(INFO_FILE_NAME)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(info, f)
+        os.replace(tmp, path)
+
+        threading.Thread(target=self._accept_loop, name="InstanceIPC", daemon=True).start()
+
+    def add_handler(self, command, handler):
+        self._handlers[command] = handler
+
+    def release(self):
+        """Ferme le canal IPC et libère le verrou (à appeler en quittant)"""
+        if self._server is not None:
+            try:
+                self._server.shutdown(socket.SHUT_RDWR)  # débloque accept()
+            except OSError:
+                pass
+            try:
+                self._server.close()
+            except OSError:
+                pass
+            self._server = None
+            try:
+                os.remove(self._path(INFO_FILE_NAME))
+            except OSError:
+                pass
+        if self._lock is not None:
+            try:
+                self._lock.close()
+            except OSError:
+                pass
+            self._lock = None
+
+    def _accept_loop(self):
+        server = self._server
+        while True:
+            try:
+                conn, _ = server.accept()
+            except OSError:
+                return  # serveur fermé par release()
+            threading.Thread(target=self._handle, args=(conn,), name="InstanceIPC-conn",
+                             daemon=True).start()
+
+    def _handle(self, conn):
+        with conn:
+            try:
+                conn.settimeout(DEFAULT_IPC_TIMEOUT)
+                request = _read_line(conn)
+                if not hmac.compare_digest(str(request.get("token", "")), self._token):
+                    _send_line(conn, {"ok": False, "error": "jeton invalide"})
+                    return
+                command = request.get("command")
+                handler = self._handlers.get(command)
+                if handler is None:
+                    _send_line(conn, {"ok": False, "error": f"commande inconnue : {command}"})
+                    return
+                _send_line(conn, {"ok": True, "result": handler(request.get("args") or {})})
+            except Exception as e:
+                log.exception(f"Erreur IPC: {e}")
+                try:
+                    _send_line(conn, {"ok": False, "error": str(e)})
+                except OSError:
+                    pass
+
+
+def send_command(command, args=None, timeout=DEFAULT_IPC_TIMEOUT, state_dir=None,
+                 connect_timeout=DEFAULT_IPC_TIMEOUT):
+    """
+    Envoie une commande à l'instance en cours et attend sa réponse (au plus `timeout` s).
+    Retourne la réponse {"ok", "result"|"error"} ou None si l'instance reste
+    injoignable pendant `connect_timeout` secondes.
+    """
+    path = os.path.join(state_dir or user_state_dir(), INFO_FILE_NAME)
+    deadline = time.monotonic() + connect_timeout
+    while True:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                info = json.load(f)
+            conn = socket.create_connection(("127.0.0.1", info["port"]), timeout=connect_timeout)
+            break
+        except (OSError, ValueError, KeyError) as e:
+            # L'instance peut être en train de démarrer (instance.json pas encore écrit)
+            if time.monotonic() >= deadline:
+                log.warning(f"Instance en cours injoignable : {e}")
+                return None
+            time.sleep(0.05)
+
+    # Connecté : la commande n'est envoyée qu'une fois (pas de nouvel essai)
+    with conn:
+        try:
+            conn.settimeout(timeout)
+            _send_line(conn, {"token": info["token"], "command": command, "args": args or {}})
+            return _read_line(conn)
+        except (OSError, ValueError) as e:
+            log.warning(f"Pas de réponse de l'instance en cours : {e}")
+            return None
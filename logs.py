@@ -0,0 +1,253 @@
+"""
+iRacing Launcher - Journal structuré et spans
+Une ligne JSON par événement dans un fichier à rotation par taille
+(launcher_log.jsonl, .1, .2...). Les appels de log ne font que déposer
+l'enregistrement dans une file : l'écriture disque se fait dans le thread du
+QueueListener, jamais dans le thread du bridge ni dans celui d'un lancement.
+
+span(nom) chronomètre un bloc (méthodes de l'Api, mises à jour, étapes de
+l'updater) : les derniers spans restent en mémoire (recent_spans) et ceux qui
+sont lents ou en erreur sont écrits dans le journal. add_span_listener()
+branche d'autres consommateurs sur la fin des spans (métriques de l'Api).
+"""
+import atexit
+import itertools
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+
+LOG_FILE = "launcher_log.jsonl"
+DEFAULT_LOG_LEVEL = "INFO"
+DEFAULT_LOG_MAX_BYTES = 1024 * 1024   # rotation à 1 Mo
+DEFAULT_LOG_BACKUPS = 3               # launcher_log.jsonl.1 à .3
+DEFAULT_SLOW_SPAN_MS = 100            # spans plus lents écrits en INFO (les autres en DEBUG)
+SPAN_HISTORY = 500                    # derniers spans gardés en mémoire
+
+log = logging.getLogger("span")
+
+# Attributs standard d'un LogRecord : tout le reste vient de extra={...}
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """{ts, level, logger, msg, thread, pid, ...champs extra, exc?} sur une ligne"""
+
+    def format(self, record):
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(record.created))
+                  + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "thread": record.threadName,
+            "pid": record.process,
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """
+    Le QueueHandler standard remplace msg par le texte formaté : ici le message
+    et la trace sont figés en texte mais les champs extra restent séparés.
+    """
+
+    def prepare(self, record):
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+_listener = None
+_setup_lock = threading.Lock()
+log_path = None
+
+
+def setup_logging(path=LOG_FILE, level=DEFAULT_LOG_LEVEL, max_bytes=DEFAULT_LOG_MAX_BYTES,
+                  backups=DEFAULT_LOG_BACKUPS, console=True, slow_ms=DEFAULT_SLOW_SPAN_MS):
+    """
+    Configure le logger racine : fichier JSON-lines à rotation (path=None : pas de
+    fichier) et, si console, messages en clair sur stderr. Sans effet au second appel.
+    """
+    global _listener, log_path, slow_span_ms
+    with _setup_lock:
+        if _listener is not None:
+            return
+        slow_span_ms = slow_ms
+        handlers = []
+        if path:
+            try:
+                file_handler = logging.handlers.RotatingFileHandler(
+                    path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8", delay=True)
+                file_handler.setFormatter(JsonLinesFormatter())
+                handlers.append(file_handler)
+                log_path = os.path.abspath(path)
+            except (OSError, ValueError) as e:
+                print(f"Journal {path} indisponible : {e}", file=sys.stderr)
+        if console and sys.stderr is not None:  # exe sans console : stderr vaut None
+            stream = logging.StreamHandler(sys.stderr)
+            stream.setFormatter(logging.Formatter("%(message)s"))
+            handlers.append(stream)
+
+        records = queue.SimpleQueue()
+        _listener = logging.handlers.QueueListener(records, *handlers)
+        _listener.start()
+        atexit.register(shutdown_logging)
+        root = logging.getLogger()
+        root.addHandler(_QueueHandler(records))
+        if isinstance(level, str):
+            level = logging.getLevelName(level.upper())
+        root.setLevel(level if isinstance(level, int) else logging.INFO)  # niveau inconnu : INFO
+
+        # Exceptions non interceptées (threads compris) : dans le journal plutôt que perdues
+        def thread_excepthook(args):
+            if args.exc_type is not SystemExit:
+                logging.getLogger("thread").error(
+                    f"Exception non gérée dans {args.thread.name if args.thread else '?'}",
+                    exc_info=(args.exc_type, args.exc_value, args.exc_traceback))
+
+        threading.excepthook = thread_excepthook
+
+
+def current_log_file():
+    """Chemin absolu du journal (None si pas de fichier)"""
+    return log_path
+
+
+def shutdown_logging():
+    """Vide la file et ferme le fichier (avant de quitter)"""
+    global _listener
+    with _setup_lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+# ===== SPANS =====
+_spans = deque(maxlen=SPAN_HISTORY)
+_span_ids = itertools.count(1)
+_local = threading.local()
+_span_listeners = []
+slow_span_ms = DEFAULT_SLOW_SPAN_MS
+
+
+def add_span_listener(callback):
+    """callback(entry) appelé à la fin de chaque span, dans le thread du span"""
+    _span_listeners.append(callback)
+
+
+@contextmanager
+def span(name, **fields):
+    """
+    Chronomètre un bloc. `fields` (et ceux ajoutés au dict renvoyé) sont
+    gardés avec le span : with span("update.download", url=url) as s: s["bytes"] = n
+    """
+    span_id = next(_span_ids)
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    parent = stack[-1] if stack else None
+    stack.append(span_id)
+    start = time.time()
+    t0 = time.perf_counter()
+    error = None
+    try:
+        yield fields
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        duration_ms = round((time.perf_counter() - t0) * 1000, 2)
+        stack.pop()
+        entry = dict(fields, span=name, id=span_id, parent=parent, start=round(start, 3),
+                     duration_ms=duration_ms, thread=threading.current_thread().name,
+                     ok=error is None)
+        if error is not None:
+            entry["error"] = f"{type(error).__name__}: {error}"
+        _spans.append(entry)
+        _log_span(entry, error)
+        for callback in _span_listeners:
+            try:
+                callback(entry)
+            except Exception:
+                log.exception(f"Erreur d'écouteur de span {entry['span']}")
+
+
+def _log_span(entry, error):
+    if error is not None:
+        level = logging.ERROR
+    elif entry["duration_ms"] >= slow_span_ms:
+        level = logging.INFO
+    else:
+        level = logging.DEBUG
+    if not log.isEnabledFor(level):
+        return
+    exc_info = None
+    if error is not None and not getattr(error, "_span_logged", False):
+        # Trace complète une seule fois, dans le span le plus interne
+        exc_info = error
+        try:
+            error._span_logged = True
+        except AttributeError:
+            pass
+    extra = {k: v for k, v in entry.items() if k not in _RECORD_ATTRS}
+    log.log(level, f"{entry['span']} {entry['duration_ms']} ms", extra=extra, exc_info=exc_info)
+
+
+def traced(name):
+    """Décorateur : la fonction entière dans un span `name`"""
+    def decorate(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def traced_methods(prefix):
+    """
+    Décorateur de classe : chaque méthode publique dans un span "<prefix>.<méthode>".
+    Les méthodes _privées (non exposées par pywebview) ne sont pas chronométrées.
+    """
+    def decorate(cls):
+        for attr, value in list(vars(cls).items()):
+            if callable(value) and not attr.startswith("_"):
+                setattr(cls, attr, traced(f"{prefix}.{attr}")(value))
+        return cls
+    return decorate
+
+
+def recent_spans(limit=100, min_ms=0, name=None):
+    """Derniers spans, du plus récent au plus ancien (filtrés par durée / préfixe de nom)"""
+    result = []
+    for entry in reversed(list(_spans)):
+        if entry["duration_ms"] < min_ms:
+            continue
+        if name and not entry["span"].startswith(name):
+            continue
+        result.append(entry)
+        if len(result) >= limit:
+            break
+    return result
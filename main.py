@@ -1,738 +1,942 @@
-import webview
+import time
+STARTUP_T0 = time.perf_counter()  # référence du time-to-first-paint et du profil de démarrage
+
+# Imports légers uniquement : webview, tkinter, pystray, PIL, urllib, webbrowser...
+# sont importés à la première utilisation pour accélérer le démarrage de l'exe onefile
 import os
 import sys
 import json
-import subprocess
-import tkinter as tk
-from tkinter import filedialog, messagebox
-from pystray import Icon, MenuItem, Menu
-from PIL import Image, ImageDraw
+import logging
 import threading
-import psutil
-import time
 import traceback
+from processes import ProcessSnapshot, ProcessRegistry, ProcessWatcher, DEFAULT_SNAPSHOT_TTL
+from engine import LaunchScheduler, StopEngine, RestartPipeline, DEFAULT_LAUNCH_WORKERS
+from icons import IconCache
+from store import JsonStore, flush_all
+from updates import check_for_updates, download_update, ProgressRelay, DEFAULT_UPDATE_CHECK_TTL
+from startup import StartupProfiler
+from instance import SingleInstance, send_command
+from telemetry import TelemetrySampler, DEFAULT_TELEMETRY_INTERVAL, DEFAULT_TELEMETRY_HISTORY
+from supervisor import Supervisor
+from policies import PolicyEngine, DEFAULT_SIM_EXE, DEFAULT_SIM_MODE_PRIORITY
+from uistate import VersionedState
+from appconfig import AppRegistry
+from logs import (setup_logging, shutdown_logging, traced_methods, recent_spans, current_log_file,
+                  LOG_FILE, DEFAULT_LOG_LEVEL, DEFAULT_LOG_MAX_BYTES, DEFAULT_LOG_BACKUPS,
+                  DEFAULT_SLOW_SPAN_MS)
+from metrics import registry as metrics, start_http_server, DEFAULT_METRICS_HOST
+
+log = logging.getLogger("main")
 
 # ===== VERSION =====
 CURRENT_VERSION = "1.2"
 UPDATE_CHECK_URL = "https://raw.githubusercontent.com/CoolBreeze06/iracing-launcher/main/version.json"
 
+# Profil de démarrage (--profile-startup) : timings des phases en JSON
+profiler = StartupProfiler(STARTUP_T0)
+
+# ===== BOÎTES DE DIALOGUE TK (import à la demande) =====
+def show_message(kind, title, message):
+    """Affiche une boîte de message Tk : kind = "info", "warning", "error" ou "yesno" """
+    import tkinter as tk
+    from tkinter import messagebox
+
+    root = tk.Tk()
+    root.withdraw()
+    if kind == "yesno":
+        result = messagebox.askyesno(title, message, parent=root)
+    else:
+        result = getattr(messagebox, f"show{kind}")(title, message, parent=root)
+    root.destroy()
+    return result
+
 # ===== VÉRIFICATION INSTANCE UNIQUE =====
-LOCK_FILE = "launcher.lock"
+# Verrou OS dans le dossier utilisateur + canal IPC local (voir instance.py)
+instance = SingleInstance()
 
-def check_single_instance():
+def check_single_instance(profile=None):
     """
-    Vérifie qu'une seule instance du launcher tourne.
-    Si une autre instance existe, affiche un message et quitte.
+    Prend le verrou d'instance unique.
+    Si une autre instance tourne, lui demande d'afficher sa fenêtre
+    (ou de démarrer `profile`).
     Retourne True si on peut continuer, False sinon.
     """
-    if os.path.exists(LOCK_FILE):
+    if instance.acquire():
+        return True
+
+    if profile:
+        # Le lancement attend la disponibilité des apps : réponse potentiellement longue
+        reply = send_command("launch_profile", {"name": profile}, timeout=120)
+        if reply is not None:
+            errors = (reply.get("result") or {}).get("errors") or [reply.get("error")]
+            for error in filter(None, errors):
+                print(error)
+    else:
+        reply = send_command("show")
+    if reply is None:
+        # Instance bloquée ou injoignable : prévenir l'utilisateur
+        show_message(
+            "warning",
+            "Application déjà lancée",
+            "L'iRacing Launcher est déjà en cours d'exécution.\n\n"
+            "Regardez dans la barre des tâches (system tray) pour l'icône 'L'."
+        )
+    return False  # Ne pas continuer
+
+# Chemin correct même en .exe onefile
+if getattr(sys, 'frozen', False):
+    BASE_DIR = sys._MEIPASS
+else:
+    BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+HTML_PATH = os.path.join(BASE_DIR, "ui", "index.html")
+APPS_FILE = "launcher_apps.json"
+SETTINGS_FILE = "launcher_settings.json"
+
+# Config en mémoire, écritures atomiques et regroupées (voir store.py)
+apps_store = JsonStore(APPS_FILE, default=list)
+settings_store = JsonStore(SETTINGS_FILE, default=dict)
+# Apps en mémoire adressées par ID stable (voir appconfig.py)
+app_registry = AppRegistry(apps_store)
+
+def load_apps():
+    return app_registry.all()
+
+def save_apps(apps):
+    app_registry.replace(apps)
+
+def load_settings():
+    """Charge les paramètres de l'application"""
+    return settings_store.load()
+
+def save_settings(settings):
+    """Sauvegarde les paramètres de l'application"""
+    settings_store.save(settings)
+
+# ===== SYSTÈME DE MISE À JOUR =====
+# Mise à jour trouvée par la vérification asynchrone (affichée dans le bandeau de l'UI)
+pending_update = None
+
+def run_update_check():
+    """Vérifie les mises à jour en arrière-plan, après l'affichage de la fenêtre"""
+    global pending_update
+    ttl = load_settings().get("update_check_ttl", DEFAULT_UPDATE_CHECK_TTL)
+    update_info = check_for_updates(CURRENT_VERSION, UPDATE_CHECK_URL, ttl=ttl)
+    if update_info:
+        pending_update = update_info
+        push_to_ui("showUpdateBanner", update_info, CURRENT_VERSION)
+
+# Fichier de santé demandé par l'updater (--health-file) après une mise à jour,
+# avec le jeton (--health-token) à renvoyer pour prouver que c'est bien ce lancement
+health_file = None
+health_token = None
+
+def report_update_health():
+    """Signale à l'updater que la nouvelle version est opérationnelle (sinon il restaure l'ancienne)"""
+    if not health_file:
+        return
+    try:
+        tmp = health_file + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"token": health_token, "pid": os.getpid(), "version": CURRENT_VERSION}, f)
+        os.replace(tmp, health_file)
+        log.info(f"Démarrage signalé à l'updater : {health_file}")
+    except OSError as e:
+        log.error(f"Erreur écriture {health_file}: {e}")
+
+def open_release_page(update_info):
+    """Ouvre la page GitHub Release dans le navigateur"""
+    import webbrowser
+    release_url = update_info["download_url"].rsplit("/download/", 1)[0] if "/download/" in update_info["download_url"] else update_info["download_url"]
+    webbrowser.open(release_url)
+
+def download_and_install(update_info):
+    """Télécharge la mise à jour (progression dans le bandeau) puis lance l'updater"""
+    # La progression passe par une file : le téléchargement n'attend jamais le bridge JS
+    progress = ProgressRelay(lambda downloaded, total: push_to_ui("onUpdateProgress", downloaded, total))
+    progress.start()
+    try:
+        # En exe compilé, l'exe actuel sert de base à un éventuel delta
+        base_file = sys.executable if getattr(sys, 'frozen', False) else None
+        downloaded_file = download_update(update_info, progress, base_file=base_file)
+    finally:
+        progress.close()
+    if not downloaded_file:
+        push_to_ui("onUpdateError",
+                   "Impossible de télécharger la mise à jour. "
+                   "Veuillez réessayer plus tard ou télécharger manuellement depuis GitHub.")
+        return
+    launch_updater(downloaded_file)
+
+def launch_updater(downloaded_file):
+    """Lance l'updater sur le fichier téléchargé puis quitte le launcher"""
+    # Déterminer le chemin correct de l'exe actuel
+    if getattr(sys, 'frozen', False):
+        # En mode exe compilé
+        current_exe = sys.executable
+    else:
+        # En mode dev Python, construire le chemin vers le futur exe
+        script_dir = os.path.dirname(os.path.abspath(__file__))
+        current_exe = os.path.join(script_dir, "dist", "iRacing_Launcher.exe")
+    
+    log.info(f"Current exe: {current_exe}")
+    log.info(f"Downloaded file: {downloaded_file}")
+    
+    # Chercher l'updater.exe
+    if getattr(sys, 'frozen', False):
+        # En mode exe, l'updater devrait être dans le même dossier
+        updater_path = os.path.join(os.path.dirname(sys.executable), "updater.exe")
+    else:
+        # En mode dev, chercher dans dist/ ou utiliser le script Python
+        updater_exe = os.path.join(os.path.dirname(__file__), "dist", "updater.exe")
+        if os.path.exists(updater_exe):
+            updater_path = updater_exe
+        else:
+            updater_path = os.path.join(os.path.dirname(__file__), "updater.py")
+    
+    log.info(f"Updater path: {updater_path}")
+    
+    import subprocess
+
+    if not os.path.exists(updater_path):
+        # Pas d'updater, mode manuel
+        push_to_ui("onUpdateError",
+                   f"La nouvelle version a été téléchargée dans : {downloaded_file}. "
+                   f"Fermez l'application, remplacez l'ancien fichier par le nouveau et relancez.")
+        return
+    
+    try:
+        # Lancer l'updater
+        # L'updater attend la fin de CE processus (--pid) avant de remplacer l'exe
+        pid_args = ["--pid", str(os.getpid())]
+        if updater_path.endswith('.py'):
+            # Mode dev
+            subprocess.Popen([sys.executable, updater_path, downloaded_file, current_exe] + pid_args)
+        else:
+            # Mode exe
+            subprocess.Popen([updater_path, downloaded_file, current_exe] + pid_args)
+    except Exception as e:
+        log.exception(f"Erreur lancement updater: {e}")
+        push_to_ui("onUpdateError",
+                   f"Impossible de lancer le programme de mise à jour ({e}). "
+                   f"Le fichier a été téléchargé dans : {downloaded_file}")
+        return
+    
+    # Quitter l'application pour permettre la mise à jour
+    quit_app()
+
+# Variable globale pour la fenêtre, l'icône et l'API
+window = None
+tray_icon = None
+api = None
+
+def create_tray_image():
+    """Crée une icône simple pour le system tray"""
+    from PIL import Image, ImageDraw
+
+    width = 64
+    height = 64
+    image = Image.new('RGB', (width, height), 'white')
+    dc = ImageDraw.Draw(image)
+    
+    dc.ellipse([8, 8, 56, 56], fill='#7bafbb', outline='#3aa0ff')
+    dc.text((22, 16), "L", fill='white')
+    
+    return image
+
+def push_to_ui(function_name, *args):
+    """Appelle une fonction JS de la page (si elle est définie) depuis un thread Python"""
+    if window:
+        try:
+            js_args = ", ".join(json.dumps(arg) for arg in args)
+            window.evaluate_js(f"window.{function_name} && {function_name}({js_args})")
+        except Exception as e:
+            log.warning(f"Erreur push {function_name}: {e}")
+
+def push_process_changes(changes):
+    """Pousse dans l'UI uniquement les apps dont l'état a changé {id: running}"""
+    push_to_ui("onProcessStatusChanged", changes)
+
+def push_restart_result(app, report):
+    """Notifie l'UI de la fin d'un redémarrage lancé par restart_app"""
+    push_to_ui("onRestartFinished", app.get('id', ''), report)
+
+def push_supervisor_event(event):
+    """Plantage / relance / abandon détecté par le superviseur"""
+    if api is not None:
+        api._watcher.poke()
+    push_to_ui("onSupervisorEvent", event)
+
+def show_window(icon=None, item=None):
+    """Affiche la fenêtre"""
+    if window:
+        window.show()
+
+def hide_window():
+    """Cache la fenêtre dans le tray"""
+    if window:
+        window.hide()
+
+def quit_app(icon=None, item=None):
+    """Quitte complètement l'application"""
+    log.info("Fermeture complète de l'application...")
+    # Écrire la config et le journal encore en attente avant de tuer le processus
+    flush_all()
+    shutdown_logging()
+    instance.release()
+    
+    # Arrêter le tray icon en premier
+    if tray_icon:
+        try:
+            tray_icon.stop()
+        except:
+            pass
+    
+    # Détruire la fenêtre webview
+    if window:
         try:
-            with open(LOCK_FILE, "r") as f:
-                pid = int(f.read().strip())
-            
-            # Vérifier si le processus existe encore
-            if psutil.pid_exists(pid):
-                try:
-                    proc = psutil.Process(pid)
-                    # Vérifier que c'est bien notre launcher
-                    if "iRacing_Launcher" in proc.name() or "python" in proc.name().lower():
-                        root = tk.Tk()
-                        root.withdraw()
-                        messagebox.showwarning(
-                            "Application déjà lancée",
-                            "L'iRacing Launcher est déjà en cours d'exécution.\n\n"
-                            "Regardez dans la barre des tâches (system tray) pour l'icône 'L'."
-                        )
-                        root.destroy()
-                        return False  # Ne pas continuer
-                except (psutil.NoSuchProcess, psutil.AccessDenied):
-                    pass
+            window.destroy()
         except:
             pass
     
-    # Créer le fichier lock avec notre PID
-    with open(LOCK_FILE, "w") as f:
-        f.write(str(os.getpid()))
+    # Attendre un peu que tout se termine
+    time.sleep(0.5)
     
-    return True  # OK pour continuer
-
-def remove_lock():
-    """Supprime le fichier lock à la fermeture"""
+    # Forcer la fermeture du processus
     try:
-        if os.path.exists(LOCK_FILE):
-            os.remove(LOCK_FILE)
+        import signal
+        os.kill(os.getpid(), signal.SIGTERM)
     except:
         pass
+    
+    # En dernier recours
+    try:
+        sys.exit(0)
+    except:
+        os._exit(0)
 
-# Vérifier l'instance unique au démarrage
-if not check_single_instance():
-    # Une autre instance existe déjà, on quitte
-    sys.exit(0)
+def run_profile_in_background(name, stop=False):
+    """Démarre (ou arrête) un profil sans bloquer l'appelant (menu du tray, IPC)"""
+    def run():
+        if api is None:
+            return
+        report = api.stop_selected(profile=name) if stop else api.start_selected(profile=name)
+        if report.get("errors"):
+            log.warning(f"Profil {name} : " + "; ".join(report["errors"]))
 
-# ===== TOUT LE CODE PRINCIPAL DANS UN TRY/EXCEPT =====
-try:
-    # Chemin correct même en .exe onefile
-    if getattr(sys, 'frozen', False):
-        BASE_DIR = sys._MEIPASS
-    else:
-        BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+    threading.Thread(target=run, name="profile", daemon=True).start()
 
-    HTML_PATH = os.path.join(BASE_DIR, "ui", "index.html")
-    APPS_FILE = "launcher_apps.json"
-    SETTINGS_FILE = "launcher_settings.json"
+def run_cli_command(args):
+    """Commande reçue de cli.py par IPC : exécutée par l'API de cette instance"""
+    from cli import execute
+    return execute(api, **args)
 
-    # Debug : ouvre une console pour voir les erreurs
-    if getattr(sys, 'frozen', False):
-        import ctypes
-        ctypes.windll.user32.ShowWindow(ctypes.windll.kernel32.GetConsoleWindow(), 6)  # cache la console
-
-    print(f"HTML_PATH = {HTML_PATH}")
-    print(f"Fichier existe ? {os.path.exists(HTML_PATH)}")
-
-    if not os.path.exists(HTML_PATH):
-        raise FileNotFoundError(f"index.html introuvable ! Chemin : {HTML_PATH}")
-
-    def load_apps():
-        if os.path.exists(APPS_FILE):
-            try:
-                with open(APPS_FILE, "r", encoding="utf-8") as f:
-                    return json.load(f)
-            except:
-                return []
-        return []
-
-    def save_apps(apps):
-        with open(APPS_FILE, "w", encoding="utf-8") as f:
-            json.dump(apps, f, indent=4, ensure_ascii=False)
-
-    def load_settings():
-        """Charge les paramètres de l'application"""
-        if os.path.exists(SETTINGS_FILE):
-            try:
-                with open(SETTINGS_FILE, "r", encoding="utf-8") as f:
-                    return json.load(f)
-            except:
-                return {}
-        return {}
-
-    def save_settings(settings):
-        """Sauvegarde les paramètres de l'application"""
-        with open(SETTINGS_FILE, "w", encoding="utf-8") as f:
-            json.dump(settings, f, indent=4, ensure_ascii=False)
-
-    # ===== SYSTÈME DE MISE À JOUR =====
-    def check_for_updates():
-        """
-        Vérifie s'il y a une nouvelle version disponible.
-        Retourne un dict avec les infos ou None si pas de mise à jour.
-        """
+def refresh_tray_menu():
+    """Reconstruit le menu du tray (après ajout / suppression d'un profil)"""
+    if tray_icon:
         try:
-            import urllib.request
-            
-            print("Vérification des mises à jour...")
-            # Télécharger le fichier version.json depuis GitHub
-            with urllib.request.urlopen(UPDATE_CHECK_URL, timeout=5) as response:
-                data = json.loads(response.read().decode())
-            
-            latest_version = data.get("version", "")
-            download_url = data.get("download_url", "")
-            changelog = data.get("changelog", "")
-            
-            print(f"Version actuelle: {CURRENT_VERSION}, Dernière version: {latest_version}")
-            
-            # Comparer les versions (simple comparaison de string)
-            if latest_version and latest_version != CURRENT_VERSION:
-                print("Mise à jour disponible!")
-                return {
-                    "version": latest_version,
-                    "download_url": download_url,
-                    "changelog": changelog
-                }
-            
-            print("Aucune mise à jour disponible")
-            return None
-            
+            tray_icon.update_menu()
         except Exception as e:
-            print(f"Erreur vérification mise à jour: {e}")
-            return None
+            log.warning(f"Erreur menu tray: {e}")
 
-    def download_update(download_url, progress_callback=None):
-        """
-        Télécharge la mise à jour dans le dossier Downloads.
-        progress_callback: fonction appelée avec (bytes_downloaded, total_bytes)
-        Retourne le chemin du fichier téléchargé ou None si erreur.
-        """
-        try:
-            import urllib.request
-            
-            # Récupérer le dossier Downloads de l'utilisateur
-            downloads_folder = os.path.join(os.path.expanduser("~"), "Downloads")
-            
-            # Nom du fichier
-            filename = os.path.basename(download_url)
-            if not filename.endswith(".exe"):
-                filename = "iRacing_Launcher_update.exe"
-            
-            filepath = os.path.join(downloads_folder, filename)
-            
-            # Télécharger avec progression
-            def report_progress(block_num, block_size, total_size):
-                if progress_callback:
-                    downloaded = block_num * block_size
-                    progress_callback(downloaded, total_size)
-            
-            urllib.request.urlretrieve(download_url, filepath, reporthook=report_progress)
-            
-            return filepath
-            
-        except Exception as e:
-            print(f"Erreur téléchargement: {e}")
-            return None
+def setup_tray():
+    """Configure l'icône dans la barre des tâches"""
+    global tray_icon
+    from pystray import Icon, MenuItem, Menu
+    
+    image = create_tray_image()
+
+    def profile_items(stop):
+        # Menu dynamique : relu à chaque update_menu()
+        for name in load_settings().get("profiles", {}):
+            yield MenuItem(name, lambda icon, item: run_profile_in_background(item.text, stop))
+
+    menu = Menu(
+        MenuItem('Ouvrir', show_window, default=True),
+        MenuItem('Démarrer un profil', Menu(lambda: profile_items(False))),
+        MenuItem('Arrêter un profil', Menu(lambda: profile_items(True))),
+        MenuItem('Quitter', quit_app)
+    )
+    
+    tray_icon = Icon(
+        "iRacing Launcher",
+        image,
+        "iRacing Personal Launcher",
+        menu
+    )
+
+def start_tray():
+    """Tray en arrière-plan : pystray + PIL ne sont plus sur le chemin critique du démarrage"""
+    def run():
+        with profiler.phase("tray_setup"):
+            setup_tray()
+        tray_icon.run()
+
+    threading.Thread(target=run, name="tray", daemon=True).start()
 
-    def show_update_dialog_blocking(update_info):
+@traced_methods("api")
+class Api:
+    def __init__(self, watch=True):
+        settings = load_settings()
+        # Snapshot partagé des processus (préfixe _ : non exposé au JS par pywebview)
+        ttl = settings.get("process_snapshot_ttl", DEFAULT_SNAPSHOT_TTL)
+        self._snapshot = ProcessSnapshot(ttl=ttl)
+        # PIDs des apps lancées / découvertes : évite de rescanner par nom d'exe
+        self._registry = ProcessRegistry(self._snapshot)
+        # Priorité CPU / affinité par app, mode sim (autres apps abaissées pendant la course)
+        self._policies = PolicyEngine(
+            self._registry,
+            sim_mode=settings.get("sim_mode", False),
+            sim_exe=settings.get("sim_exe", DEFAULT_SIM_EXE),
+            sim_priority=settings.get("sim_mode_priority", DEFAULT_SIM_MODE_PRIORITY),
+        )
+        # Lancement parallèle (dépendances, délais, disponibilité)
+        self._launcher = LaunchScheduler(
+            self._registry,
+            max_workers=settings.get("launch_workers", DEFAULT_LAUNCH_WORKERS),
+            on_spawn=self._policies.apply,
+        )
+        self._stopper = StopEngine(self._registry)
+        self._restarter = RestartPipeline(self._stopper, self._launcher)
+        # Icônes en cache disque, la config ne garde que icon_ref
+        self._icons = IconCache()
+        # Watcher en arrière-plan : remplace le polling JS toutes les 2 s
+        # (non démarré en ligne de commande : pas d'UI à notifier)
+        self._watcher = ProcessWatcher(self._registry, push_process_changes,
+                                       on_start=self._policies.on_started)
+        # CPU / mémoire / threads / handles par app, historique en buffers circulaires
+        self._telemetry = TelemetrySampler(
+            self._registry,
+            interval=settings.get("telemetry_interval", DEFAULT_TELEMETRY_INTERVAL),
+            history=settings.get("telemetry_history", DEFAULT_TELEMETRY_HISTORY),
+        )
+        self._migrate_profiles()
+        # État de l'UI versionné : get_state ne renvoie que ce qui a changé
+        self._state = VersionedState()
+        # Relance automatique des apps "supervise" qui plantent (pas en ligne de commande)
+        self._supervisor = Supervisor(self._registry, self._launcher, push_supervisor_event, enabled=watch)
+        if watch:
+            self._watcher.start()
+            self._telemetry.start()
+            self._policies.start()
+
+    def _track(self, apps):
+        """Nouvelle liste d'apps pour le watcher, la télémétrie, le superviseur et les priorités"""
+        self._policies.set_apps(apps)
+        self._watcher.set_apps(apps)
+        self._telemetry.set_apps(apps)
+        self._supervisor.set_apps(apps)
+
+    def _apps_changed(self):
+        """Après une modification de la liste : watcher, télémétrie, superviseur, priorités"""
+        self._track(app_registry.all())
+
+    def get_apps(self):
+        apps = load_apps()
+        self._refresh_icons(apps)
+        self._track(apps)
+        if profiler.mark_once("first_get_apps"):
+            profiler.write()
+        return apps
+
+    def save_apps(self, apps):
+        """Remplace toute la liste (les ids fournis sont conservés)"""
+        save_apps(apps)
+        self._apps_changed()
+
+    # ===== APPS PAR ID (registre en mémoire, pas de relecture de la liste) =====
+    def add_app(self, app):
+        """Ajoute une app ; retourne l'app enregistrée avec son id"""
+        app = app_registry.add(app)
+        self._apps_changed()
+        return app
+
+    def update_app(self, app_id, changes):
+        """Modifie des champs d'une app (checked, path, icon_ref...). None si id inconnu."""
+        app = app_registry.update(app_id, changes)
+        if app is not None and set(changes) - {"checked"}:
+            self._apps_changed()  # cocher / décocher ne change pas le suivi
+        return app
+
+    def remove_app(self, app_id):
+        if not app_registry.remove(app_id):
+            return False
+        # Retirée aussi des profils qui la contenaient
+        settings = load_settings()
+        profiles = settings.get("profiles", {})
+        if any(app_id in members for members in profiles.values()):
+            settings["profiles"] = {name: [m for m in members if m != app_id]
+                                    for name, members in profiles.items()}
+            save_settings(settings)
+        self._apps_changed()
+        return True
+
+    def reorder(self, ids):
+        """Nouvel ordre d'affichage : liste complète des ids"""
+        if app_registry.reorder(ids):
+            self._apps_changed()
+        return app_registry.ids()
+
+    def _migrate_profiles(self):
+        """Profils enregistrés par noms d'apps (ancienne config) -> ids"""
+        settings = load_settings()
+        profiles = settings.get("profiles")
+        if not profiles:
+            return
+        migrated = {name: [app_registry.resolve(m) or m for m in members]
+                    for name, members in profiles.items()}
+        if migrated != profiles:
+            settings["profiles"] = migrated
+            save_settings(settings)
+
+    def get_state(self, since_version=None):
         """
-        Affiche le dialog de mise à jour avec 2 options (VERSION BLOCKING).
-        Retourne : "auto" (téléchargement auto), "github" (ouvrir GitHub), ou None (annuler)
+        Tout l'état de l'UI en un aller-retour : apps, statuts, profils, icônes, métadonnées.
+        `since_version` = version déjà reçue : seules les sections modifiées depuis sont
+        renvoyées. {"version", "full", "apps"?, "profiles"?, "meta"?,
+        "statuses": {id: running}, "icons": {icon_ref: data URL}}
         """
+        apps = load_apps()
+        if apps != self._state.get("apps"):
+            # Config modifiée (ou premier appel) : icônes et suivi comme get_apps
+            self._refresh_icons(apps)
+            self._track(apps)
+            self._state.set("apps", apps)
+        self._state.set("profiles", load_settings().get("profiles", {}))
+        self._state.set("meta", {"version": CURRENT_VERSION, "sim_running": self._policies.sim_running})
+        statuses = self._statuses(apps)
+        for app_id, running in statuses.items():
+            self._state.set(("status", app_id), running)
+        refs = {app.get("icon_ref") for app in apps if app.get("icon_ref")}
+        for ref in refs:
+            self._state.set(("icon", ref), True)
+        self._state.retain(lambda key: not isinstance(key, tuple)
+                           or (key[0] == "status" and key[1] in statuses)
+                           or (key[0] == "icon" and key[1] in refs))
+
+        version, changed, full = self._state.since(since_version)
+        result = {"version": version, "full": full, "statuses": {}, "icons": {}}
+        for key, value in changed.items():
+            if isinstance(key, tuple):
+                kind, ident = key
+                if kind == "status":
+                    result["statuses"][ident] = value
+                else:
+                    result["icons"][ident] = self._icons.data_url(ident)
+            else:
+                result[key] = value
+        if "apps" in result and not full:
+            # Liste modifiée : l'UI refait son rendu, tous les statuts sont renvoyés
+            result["statuses"] = statuses
+        if profiler.mark_once("first_get_state"):
+            profiler.write()
+        return result
+
+    def get_version(self): return CURRENT_VERSION
+
+    def browse_exe(self):
+        import tkinter as tk
+        from tkinter import filedialog
+
         root = tk.Tk()
         root.withdraw()
-        
-        message = (
-            f"📢 Mise à jour disponible !\n\n"
-            f"Version actuelle : {CURRENT_VERSION}\n"
-            f"Nouvelle version : {update_info['version']}\n\n"
-            f"Nouveautés :\n{update_info.get('changelog', 'Améliorations et corrections de bugs')}\n\n"
-            f"Comment voulez-vous procéder ?"
-        )
-        
-        # Créer une fenêtre personnalisée avec 3 boutons
-        dialog = tk.Toplevel(root)
-        dialog.title("Mise à jour disponible")
-        dialog.geometry("500x350")
-        dialog.resizable(False, False)
-        
-        # Centrer la fenêtre
-        dialog.update_idletasks()
-        x = (dialog.winfo_screenwidth() // 2) - (500 // 2)
-        y = (dialog.winfo_screenheight() // 2) - (350 // 2)
-        dialog.geometry(f"500x350+{x}+{y}")
-        
-        # Forcer la fenêtre au premier plan
-        dialog.lift()
-        dialog.attributes('-topmost', True)
-        dialog.after_idle(dialog.attributes, '-topmost', False)
-        
-        result = {"choice": None}
-        
-        # Message
-        label = tk.Label(dialog, text=message, justify=tk.LEFT, padx=20, pady=20, wraplength=460)
-        label.pack(expand=True, fill=tk.BOTH)
-        
-        # Frame pour les boutons
-        button_frame = tk.Frame(dialog)
-        button_frame.pack(pady=10)
-        
-        def on_auto():
-            result["choice"] = "auto"
-            dialog.destroy()
-            root.quit()
-        
-        def on_github():
-            result["choice"] = "github"
-            dialog.destroy()
-            root.quit()
-        
-        def on_later():
-            result["choice"] = None
-            dialog.destroy()
-            root.quit()
-        
-        # Boutons
-        btn_auto = tk.Button(button_frame, text="📥 Télécharger automatiquement", 
-                             command=on_auto, width=25, height=2, bg="#4CAF50", fg="white")
-        btn_auto.pack(pady=5)
-        
-        btn_github = tk.Button(button_frame, text="🔗 Ouvrir GitHub Release", 
-                               command=on_github, width=25, height=2, bg="#2196F3", fg="white")
-        btn_github.pack(pady=5)
-        
-        btn_later = tk.Button(button_frame, text="⏰ Plus tard", 
-                              command=on_later, width=25, height=1)
-        btn_later.pack(pady=5)
-        
-        dialog.protocol("WM_DELETE_WINDOW", on_later)
-        
-        # IMPORTANT : mainloop pour garder la fenêtre ouverte
-        root.mainloop()
-        
-        choice = result["choice"]
-        
-        try:
-            root.destroy()
-        except:
-            pass
-        
-        return choice
+        file = filedialog.askopenfilename(filetypes=[("Executable", "*.exe")])
+        root.destroy()
+        return file or ""
+
+    def ask_yes_no(self, title, message):
+        return show_message("yesno", title, message)
+
+    def get_icon(self, exe_path):
+        """Data URL de l'icône d'un exe (via le cache disque)"""
+        return self._icons.data_url(self._icons.ref(exe_path))
 
-    def handle_update_check_blocking(update_info):
+    def cache_icons(self, exe_paths):
+        """Extrait en lot (pool de workers) les icônes manquantes. Retourne {chemin: icon_ref}"""
+        return self._icons.refs(exe_paths)
+
+    def get_icons(self, refs):
+        """Icônes servies à la demande par l'UI : {icon_ref: data URL}"""
+        return {ref: self._icons.data_url(ref) for ref in refs if ref}
+
+    def _refresh_icons(self, apps):
         """
-        Gère tout le processus de vérification et mise à jour (VERSION BLOCKING).
+        Migre les icônes inline (base64 dans launcher_apps.json) vers le cache
+        et met à jour les références des exe modifiés : `apps` (copie locale) et le
+        registre, app par app (un update_app concurrent n'est pas écrasé).
+        Retourne True si la config a changé.
         """
-        print("handle_update_check() appelé")
-        
-        if not update_info:
-            print("Pas de mise à jour")
-            return
-        
-        print("Affichage du dialog...")
-        choice = show_update_dialog_blocking(update_info)
-        
-        if choice == "github":
-            # Ouvrir GitHub dans le navigateur
-            import webbrowser
-            release_url = update_info["download_url"].rsplit("/download/", 1)[0] if "/download/" in update_info["download_url"] else update_info["download_url"]
-            webbrowser.open(release_url)
-            
-            root = tk.Tk()
-            root.withdraw()
-            messagebox.showinfo(
-                "GitHub ouvert",
-                f"La page GitHub Release s'est ouverte dans votre navigateur.\n\n"
-                f"Téléchargez le fichier .exe et remplacez l'ancien launcher."
-            )
-            root.destroy()
-        
-        elif choice == "auto":
-            # Téléchargement automatique avec updater
-            root = tk.Tk()
-            root.withdraw()
-            
-            progress_window = tk.Toplevel(root)
-            progress_window.title("Téléchargement en cours...")
-            progress_window.geometry("400x150")
-            progress_window.resizable(False, False)
-            
-            # Centrer
-            progress_window.update_idletasks()
-            x = (progress_window.winfo_screenwidth() // 2) - (400 // 2)
-            y = (progress_window.winfo_screenheight() // 2) - (150 // 2)
-            progress_window.geometry(f"400x150+{x}+{y}")
-            
-            status_label = tk.Label(progress_window, text="Téléchargement de la mise à jour...", pady=20)
-            status_label.pack()
-            
-            progress_bar = tk.Canvas(progress_window, width=360, height=30, bg="white", highlightthickness=1)
-            progress_bar.pack(pady=10)
-            
-            progress_text = tk.Label(progress_window, text="0%")
-            progress_text.pack()
-            
-            download_result = {"filepath": None}
-            
-            def update_progress(downloaded, total):
-                if total > 0:
-                    percent = int((downloaded / total) * 100)
-                    progress_text.config(text=f"{percent}% ({downloaded // 1024} KB / {total // 1024} KB)")
-                    
-                    progress_bar.delete("all")
-                    bar_width = int((downloaded / total) * 360)
-                    progress_bar.create_rectangle(0, 0, bar_width, 30, fill="#4CAF50", outline="")
-            
-            def do_download():
-                filepath = download_update(update_info["download_url"], update_progress)
-                download_result["filepath"] = filepath
-                progress_window.quit()
-            
-            download_thread = threading.Thread(target=do_download, daemon=True)
-            download_thread.start()
-            
-            progress_window.mainloop()
-            progress_window.destroy()
-            
-            if download_result["filepath"]:
-                # Téléchargement réussi, lancer l'updater
-                downloaded_file = download_result["filepath"]
-                
-                # Déterminer le chemin correct de l'exe actuel
-                if getattr(sys, 'frozen', False):
-                    # En mode exe compilé
-                    current_exe = sys.executable
-                else:
-                    # En mode dev Python, construire le chemin vers le futur exe
-                    script_dir = os.path.dirname(os.path.abspath(__file__))
-                    current_exe = os.path.join(script_dir, "dist", "iRacing_Launcher.exe")
-                
-                print(f"Current exe: {current_exe}")
-                print(f"Downloaded file: {downloaded_file}")
-                
-                # Chercher l'updater.exe
-                if getattr(sys, 'frozen', False):
-                    # En mode exe, l'updater devrait être dans le même dossier
-                    updater_path = os.path.join(os.path.dirname(sys.executable), "updater.exe")
-                else:
-                    # En mode dev, chercher dans dist/ ou utiliser le script Python
-                    updater_exe = os.path.join(os.path.dirname(__file__), "dist", "updater.exe")
-                    if os.path.exists(updater_exe):
-                        updater_path = updater_exe
-                    else:
-                        updater_path = os.path.join(os.path.dirname(__file__), "updater.py")
-                
-                print(f"Updater path: {updater_path}")
-                
-                if os.path.exists(updater_path):
-                    try:
-                        # Lancer l'updater
-                        if updater_path.endswith('.py'):
-                            # Mode dev
-                            subprocess.Popen([sys.executable, updater_path, downloaded_file, current_exe])
-                        else:
-                            # Mode exe
-                            subprocess.Popen([updater_path, downloaded_file, current_exe])
-                        
-                        # Quitter l'application pour permettre la mise à jour (sans popup supplémentaire)
-                        root.destroy()
-                        quit_app()
-                        sys.exit(0)
-                        
-                    except Exception as e:
-                        messagebox.showerror(
-                            "Erreur de mise à jour",
-                            f"Impossible de lancer le programme de mise à jour.\n\n"
-                            f"Erreur : {e}\n\n"
-                            f"Le fichier a été téléchargé dans :\n{downloaded_file}\n\n"
-                            f"Vous pouvez remplacer manuellement l'ancien fichier."
-                        )
-                else:
-                    # Pas d'updater, mode manuel
-                    messagebox.showinfo(
-                        "Téléchargement terminé",
-                        f"La nouvelle version a été téléchargée dans :\n\n"
-                        f"{downloaded_file}\n\n"
-                        f"Pour installer la mise à jour :\n"
-                        f"1. Fermez complètement cette application\n"
-                        f"2. Remplacez l'ancien fichier par le nouveau\n"
-                        f"3. Relancez l'application"
-                    )
-            else:
-                messagebox.showerror(
-                    "Erreur de téléchargement",
-                    "Impossible de télécharger la mise à jour.\n\n"
-                    "Veuillez réessayer plus tard ou télécharger manuellement depuis GitHub."
-                )
-            
-            root.destroy()
-
-    # Variable globale pour la fenêtre et l'icône
-    window = None
-    tray_icon = None
-
-    def create_tray_image():
-        """Crée une icône simple pour le system tray"""
-        width = 64
-        height = 64
-        image = Image.new('RGB', (width, height), 'white')
-        dc = ImageDraw.Draw(image)
-        
-        dc.ellipse([8, 8, 56, 56], fill='#7bafbb', outline='#3aa0ff')
-        dc.text((22, 16), "L", fill='white')
-        
-        return image
-
-    def show_window(icon=None, item=None):
-        """Affiche la fenêtre"""
-        if window:
-            window.show()
-
-    def hide_window():
-        """Cache la fenêtre dans le tray"""
-        if window:
-            window.hide()
-
-    def quit_app(icon=None, item=None):
-        """Quitte complètement l'application"""
-        print("Fermeture complète de l'application...")
-        remove_lock()
-        
-        # Arrêter le tray icon en premier
-        if tray_icon:
-            try:
-                tray_icon.stop()
-            except:
-                pass
-        
-        # Détruire la fenêtre webview
-        if window:
-            try:
-                window.destroy()
-            except:
-                pass
-        
-        # Attendre un peu que tout se termine
-        time.sleep(0.5)
-        
-        # Forcer la fermeture du processus
-        try:
-            import signal
-            os.kill(os.getpid(), signal.SIGTERM)
-        except:
-            pass
+        changed = set()
+        migrated = set()
+        for app in apps:
+            icon = app.pop("icon", None)
+            if icon is not None:
+                changed.add(app["id"])
+                migrated.add(app["id"])
+                if isinstance(icon, str) and icon.startswith("data:") and not app.get("icon_ref"):
+                    app["icon_ref"] = self._icons.import_data_url(app.get("path"), icon)
+
+        refs = self._icons.refs([app.get("path") for app in apps])
+        for app in apps:
+            ref = refs.get(app.get("path"))
+            if ref and ref != app.get("icon_ref"):
+                app["icon_ref"] = ref
+                changed.add(app["id"])
+
+        for app in apps:
+            if app["id"] in changed:
+                fields = {"icon_ref": app["icon_ref"]} if app.get("icon_ref") else {}
+                app_registry.update(app["id"], fields, remove=("icon",) if app["id"] in migrated else ())
+        if changed:
+            # Références relues dans le registre : un add_app/update_app arrivé pendant
+            # l'extraction a pu écrire une icon_ref absente de la copie locale
+            self._icons.prune(app.get("icon_ref") for app in app_registry.all())
+        return bool(changed)
+
+    def check_process_running(self, exe_path):
+        if not exe_path or not os.path.exists(exe_path):
+            return False
         
-        # En dernier recours
-        try:
-            sys.exit(0)
-        except:
-            os._exit(0)
+        return bool(self._registry.find(exe_path))
+
+    def get_statuses(self, ids=None):
+        """{id: running} pour les apps désignées par leur id (toutes par défaut)"""
+        return self._statuses(load_apps() if ids is None else app_registry.select(ids))
+
+    def _statuses(self, apps):
+        # Registre d'abord, au plus un scan pour les apps non suivies
+        paths = {app["id"]: app.get('path', '') for app in apps}
+        found = self._registry.find_all([p for p in paths.values() if p and os.path.exists(p)])
+        return {app_id: path in found for app_id, path in paths.items()}
+
+    def get_status(self, ids=None, profile=None):
+        """État détaillé des apps (toutes par défaut, ou ids / profil) : id, nom, chemin, running, PIDs"""
+        if profile is not None:
+            apps = self._selection(None, profile) or []
+        else:
+            apps = load_apps() if ids is None else app_registry.select(ids)
+        paths = [app.get('path', '') for app in apps]
+        found = self._registry.find_all([p for p in paths if p and os.path.exists(p)])
+        return [
+            {
+                "id": app["id"],
+                "name": app.get("name", ""),
+                "path": path,
+                "running": path in found,
+                "pids": [tracked.pid for tracked in found.get(path, ())],
+            }
+            for app, path in zip(apps, paths)
+        ]
+
+    def get_telemetry(self, points=60, seconds=None):
+        """
+        Séries sous-échantillonnées pour les sparklines :
+        {"interval", "sampler_ms", "apps": {id: {name, last, t, cpu, rss, threads, handles}}}
+        cpu en % de la machine entière, rss en octets.
+        """
+        return {
+            "interval": self._telemetry.interval,
+            "sampler_ms": self._telemetry.last_tick_ms,
+            "apps": self._telemetry.snapshot(points, seconds),
+        }
 
-    def setup_tray():
-        """Configure l'icône dans la barre des tâches"""
-        global tray_icon
-        
-        image = create_tray_image()
-        
-        menu = Menu(
-            MenuItem('Ouvrir', show_window, default=True),
-            MenuItem('Quitter', quit_app)
-        )
-        
-        tray_icon = Icon(
-            "iRacing Launcher",
-            image,
-            "iRacing Personal Launcher",
-            menu
-        )
-        
-        threading.Thread(target=tray_icon.run, daemon=True).start()
-
-    class Api:
-        def get_apps(self): return load_apps()
-        def save_apps(self, apps): save_apps(apps)
-        def get_version(self): return CURRENT_VERSION
-
-        def browse_exe(self):
-            root = tk.Tk()
-            root.withdraw()
-            file = filedialog.askopenfilename(filetypes=[("Executable", "*.exe")])
-            root.destroy()
-            return file or ""
-
-        def ask_yes_no(self, title, message):
-            root = tk.Tk()
-            root.withdraw()
-            res = messagebox.askyesno(title, message)
-            root.destroy()
-            return res
-
-        def get_icon(self, exe_path):
-            if not exe_path or not os.path.exists(exe_path):
-                return None
-            try:
-                import win32gui, win32ui, win32con
-                from PIL import Image
-                import base64
-                from io import BytesIO
-
-                large, _ = win32gui.ExtractIconEx(exe_path, 0)
-                if not large: return None
-
-                hdc = win32ui.CreateDCFromHandle(win32gui.GetDC(0))
-                hbmp = win32ui.CreateBitmap()
-                hbmp.CreateCompatibleBitmap(hdc, 32, 32)
-                hdc2 = hdc.CreateCompatibleDC()
-                hdc2.SelectObject(hbmp)
-                hdc2.DrawIcon((0,0), large[0])
-                win32gui.DestroyIcon(large[0])
-
-                bmpstr = hbmp.GetBitmapBits(True)
-                img = Image.frombuffer('RGBA', (32,32), bmpstr, 'raw', 'BGRA', 0, 1)
-
-                buffered = BytesIO()
-                img.save(buffered, format="PNG")
-                return "data:image/png;base64," + base64.b64encode(buffered.getvalue()).decode()
-            except Exception as e:
-                print("Erreur icône :", e)
-                return None
+    def get_supervisor_state(self):
+        """Apps supervisées : {chemin: {name, supervise, state, crashes, history}}"""
+        return self._supervisor.state()
 
-        def check_process_running(self, exe_path):
-            if not exe_path or not os.path.exists(exe_path):
-                return False
-            
-            exe_name = os.path.basename(exe_path).lower()
-            
-            try:
-                for proc in psutil.process_iter(['name', 'exe']):
-                    try:
-                        if proc.info['name'] and proc.info['name'].lower() == exe_name:
-                            return True
-                    except (psutil.NoSuchProcess, psutil.AccessDenied):
-                        continue
-            except Exception as e:
-                print(f"Erreur check_process_running: {e}")
-            
-            return False
+    def get_spans(self, limit=100, min_ms=0, name=None):
+        """
+        Derniers spans (appels de l'Api, mises à jour...), du plus récent au plus ancien :
+        {"log_file", "spans": [{span, duration_ms, ok, error?, start, thread, id, parent...}]}
+        `name` filtre par préfixe ("api.", "update.").
+        """
+        return {"log_file": current_log_file(), "spans": recent_spans(limit, min_ms, name)}
 
-        def get_all_process_statuses(self, apps):
-            statuses = []
-            for app in apps:
-                is_running = self.check_process_running(app.get('path', ''))
-                statuses.append(is_running)
-            return statuses
-
-        def restart_app(self, app_data):
-            try:
-                exe_path = app_data.get('path', '')
-                if not exe_path or not os.path.exists(exe_path):
-                    return {"ok": False, "error": "Chemin invalide"}
-                
-                exe_name = os.path.basename(exe_path).lower()
-                killed = False
-                
-                for proc in psutil.process_iter(['name', 'exe']):
-                    try:
-                        if proc.info['name'] and proc.info['name'].lower() == exe_name:
-                            proc.terminate()
-                            killed = True
-                    except (psutil.NoSuchProcess, psutil.AccessDenied):
-                        continue
-                
-                if killed:
-                    time.sleep(0.5)
-                    
-                    timeout = 3
-                    start_time = time.time()
-                    while time.time() - start_time < timeout:
-                        if not self.check_process_running(exe_path):
-                            break
-                        time.sleep(0.1)
-                
-                if app_data.get("admin_required"):
-                    subprocess.Popen(f'powershell -Command "Start-Process \'{exe_path}\' -Verb RunAs"', shell=True)
-                else:
-                    subprocess.Popen(exe_path)
-                
-                return {"ok": True, "was_running": killed}
-                
-            except Exception as e:
-                return {"ok": False, "error": str(e)}
-
-        def start_selected(self, apps):
-            errors = []
-            for app in [a for a in apps if a.get("checked")]:
-                try:
-                    if app.get("admin_required"):
-                        subprocess.Popen(f'powershell -Command "Start-Process \'{app["path"]}\' -Verb RunAs"', shell=True)
-                    else:
-                        subprocess.Popen(app["path"])
-                except Exception as e:
-                    errors.append(str(e))
-            return {"ok": not errors, "errors": errors}
-
-        def stop_selected(self, apps):
-            killed = 0
-            errors = []
-            
-            for app in [a for a in apps if a.get("checked")]:
-                try:
-                    exe_name = os.path.basename(app["path"])
-                    
-                    for proc in psutil.process_iter(['name', 'exe']):
-                        try:
-                            if proc.info['name'] and proc.info['name'].lower() == exe_name.lower():
-                                proc.terminate()
-                                killed += 1
-                        except (psutil.NoSuchProcess, psutil.AccessDenied):
-                            continue
-                            
-                except Exception as e:
-                    errors.append(f"{app.get('name', 'Unknown')}: {str(e)}")
-            
-            psutil.wait_procs(psutil.process_iter(), timeout=3)
-            
-            return {"killed": killed, "errors": errors}
-
-        def move_app_up(self, index):
-            apps = load_apps()
-            if index > 0:
-                apps[index], apps[index - 1] = apps[index - 1], apps[index]
-                save_apps(apps)
-            return True
-        
-        def move_app_down(self, index):
-            apps = load_apps()
-            if index < len(apps) - 1:
-                apps[index], apps[index + 1] = apps[index + 1], apps[index]
-                save_apps(apps)
-            return True
-
-        def resize_window(self, w, h):
-            window.resize(w, h)
-        
-        def minimize_to_tray(self):
-            hide_window()
+    def get_metrics(self):
+        """
+        Compteurs et histogrammes (durées en secondes) : appels de l'Api, scans psutil,
+        réutilisation du snapshot des processus, télémétrie.
+        {nom: {"type", "help", "series": [{"labels", "value"} | {"labels", "count", "sum",
+        "mean", "max", "p50", "p90", "p99"}]}}
+        """
+        return metrics.snapshot()
 
-    # Configuration du system tray
-    setup_tray()
+    def restart_app(self, app_id):
+        """
+        Redémarre l'app en arrière-plan et rend la main tout de suite.
+        Le résultat (latences arrêt / relance / prêt) est poussé à l'UI via onRestartFinished.
+        """
+        app_data = app_registry.get(app_id)
+        if app_data is None:
+            return {"ok": False, "error": "App inconnue"}
+        exe_path = app_data.get('path', '')
+        if not exe_path or not os.path.exists(exe_path):
+            return {"ok": False, "error": "Chemin invalide"}
+        
+        self._supervisor.expect_stop([app_data])
+        if not self._restarter.start(app_data, self._on_restart_done):
+            return {"ok": False, "error": "Redémarrage déjà en cours"}
+        return {"ok": True, "pending": True}
+
+    def restart_selected(self, ids=None, profile=None):
+        """Redémarre les apps cochées (ou du profil) et attend la fin : [{name, ok, ...}]"""
+        selection = self._selection(ids, profile)
+        if selection is None:
+            return [{"name": profile, "ok": False, "error": f"Profil inconnu : {profile}"}]
+        self._supervisor.expect_stop(selection)
+        reports = [dict(self._restarter.run(app), name=app.get("name", "")) for app in selection]
+        self._supervisor.adopt(selection)
+        self._watcher.poke()
+        return reports
+
+    def _on_restart_done(self, app, report):
+        self._supervisor.adopt([app])
+        self._watcher.poke()
+        push_restart_result(app, report)
+
+    def _selection(self, ids, profile):
+        """
+        Apps désignées par `ids`, sinon celles du profil (quel que soit `checked`),
+        sinon les apps cochées. None si profil inconnu.
+        """
+        if profile is not None:
+            members = load_settings().get("profiles", {}).get(profile)
+            if members is None:
+                return None
+            # Ids, ou noms pour un profil écrit à la main
+            return app_registry.select(app_registry.resolve(m) for m in members)
+        if ids is not None:
+            return app_registry.select(ids)
+        return [a for a in load_apps() if a.get("checked")]
+
+    def start_selected(self, ids=None, profile=None):
+        """Démarre les apps cochées, ou celles du profil `profile`"""
+        selection = self._selection(ids, profile)
+        if selection is None:
+            return {"ok": False, "errors": [f"Profil inconnu : {profile}"], "timings": []}
+        # Lancement parallèle + attente de disponibilité, avec timings par app
+        report = self._launcher.launch(selection)
+        self._supervisor.adopt(selection)
+        self._watcher.poke()
+        return report
+
+    def stop_selected(self, ids=None, profile=None):
+        """Arrête les apps cochées, ou celles du profil `profile`"""
+        selection = self._selection(ids, profile)
+        if selection is None:
+            return {"killed": 0, "errors": [f"Profil inconnu : {profile}"], "results": []}
+        # Un scan, terminate groupé, attente sur ces seuls PIDs, kill après délai de grâce
+        self._supervisor.expect_stop(selection)
+        report = self._stopper.stop(selection)
+        self._watcher.poke()
+        return report
+
+    # ===== PROFILS (launcher_settings.json -> "profiles": {nom: [ids des apps]}) =====
+    def get_profiles(self):
+        return load_settings().get("profiles", {})
+
+    def save_profile(self, name, app_ids=None):
+        """Enregistre un profil : les apps données (ids ou noms), ou par défaut les apps cochées"""
+        name = (name or "").strip()
+        if not name:
+            return False
+        if app_ids is None:
+            app_ids = [a["id"] for a in load_apps() if a.get("checked")]
+        else:
+            app_ids = [app_registry.resolve(ref) or ref for ref in app_ids]
+        settings = load_settings()
+        settings.setdefault("profiles", {})[name] = list(app_ids)
+        save_settings(settings)
+        refresh_tray_menu()
+        return True
 
-    # ===== VÉRIFICATION DES MISES À JOUR AU DÉMARRAGE =====
-    # Vérifier AVANT de créer la fenêtre webview
-    print("Vérification des mises à jour...")
-    update_info = check_for_updates()
+    def delete_profile(self, name):
+        settings = load_settings()
+        if settings.get("profiles", {}).pop(name, None) is None:
+            return False
+        save_settings(settings)
+        refresh_tray_menu()
+        return True
+
+    def apply_profile(self, name):
+        """Coche exactement les apps du profil"""
+        members = self.get_profiles().get(name)
+        if members is None:
+            return False
+        wanted = {app_registry.resolve(m) for m in members}
+        for app in load_apps():
+            checked = app["id"] in wanted
+            if app.get("checked") != checked:
+                app_registry.update(app["id"], {"checked": checked})
+        return True
+
+    def resize_window(self, w, h):
+        window.resize(w, h)
     
-    if update_info:
-        print("Mise à jour trouvée, affichage du dialog...")
-        handle_update_check_blocking(update_info)
+    def minimize_to_tray(self):
+        hide_window()
 
-    # Fonction appelée quand on clique sur la croix
-    def on_closing():
-        settings = load_settings()
+    def update_action(self, choice):
+        """Choix dans le bandeau de mise à jour : "auto", "github" ou "later" """
+        if not pending_update:
+            return False
+        if choice == "github":
+            open_release_page(pending_update)
+        elif choice == "auto":
+            threading.Thread(target=download_and_install, args=(pending_update,),
+                             name="update-download", daemon=True).start()
+        return True
+
+    def report_first_paint(self):
+        """Appelé par l'UI au premier rendu : mesure le time-to-first-paint"""
+        elapsed_ms = round((time.perf_counter() - STARTUP_T0) * 1000, 1)
+        log.info(f"Time-to-first-paint : {elapsed_ms} ms")
+        if profiler.mark_once("first_paint"):
+            # Interface affichée : la mise à jour éventuelle est validée
+            report_update_health()
+            if profiler.enabled:
+                # Mode mesure : rapport complet écrit, on quitte
+                profiler.write()
+                threading.Thread(target=quit_app, daemon=True).start()
+        return elapsed_ms
+
+# ===== VÉRIFICATION DES MISES À JOUR =====
+# Lancée en arrière-plan une fois la page chargée : ne retarde plus l'ouverture
+update_check_started = threading.Event()
+
+def on_loaded():
+    if not update_check_started.is_set():
+        update_check_started.set()
+        threading.Thread(target=run_update_check, name="update-check", daemon=True).start()
+
+# Fonction appelée quand on clique sur la croix
+def on_closing():
+    settings = load_settings()
+    
+    if not settings.get("hide_close_notification", False):
+        show_message(
+            "info",
+            "Application en veille",
+            "L'application reste active dans la barre des tâches (system tray).\n\n"
+            "Pour la rouvrir : double-clic sur l'icône 'L' dans la barre des tâches.\n"
+            "Pour quitter complètement : clic droit sur l'icône → Quitter."
+        )
         
-        if not settings.get("hide_close_notification", False):
-            root = tk.Tk()
-            root.withdraw()
-            result = messagebox.showinfo(
-                "Application en veille",
-                "L'application reste active dans la barre des tâches (system tray).\n\n"
-                "Pour la rouvrir : double-clic sur l'icône 'L' dans la barre des tâches.\n"
-                "Pour quitter complètement : clic droit sur l'icône → Quitter.",
-                parent=root
+        settings["hide_close_notification"] = True
+        save_settings(settings)
+    
+    hide_window()
+    return False
+
+# ===== DÉMARRAGE =====
+def main():
+    global window, api, health_file, health_token
+
+    # iRacing_Launcher.exe start|stop|status|restart ... : mode ligne de commande, sans GUI
+    from cli import COMMANDS
+    if len(sys.argv) > 1 and sys.argv[1] in COMMANDS:
+        from cli import main as cli_main
+        sys.exit(cli_main(sys.argv[1:]))
+
+    if "--profile-startup" in sys.argv:
+        profiler.enable()
+    if "--health-file" in sys.argv:
+        i = sys.argv.index("--health-file")
+        health_file = sys.argv[i + 1] if i + 1 < len(sys.argv) else None
+    if "--health-token" in sys.argv:
+        i = sys.argv.index("--health-token")
+        health_token = sys.argv[i + 1] if i + 1 < len(sys.argv) else None
+    # --profile <nom> : démarre ce profil (dans l'instance déjà ouverte s'il y en a une)
+    profile_arg = None
+    if "--profile" in sys.argv:
+        i = sys.argv.index("--profile")
+        profile_arg = sys.argv[i + 1] if i + 1 < len(sys.argv) else None
+
+    # Vérifier l'instance unique au démarrage
+    with profiler.phase("single_instance"):
+        can_continue = check_single_instance(profile_arg)
+    if not can_continue:
+        # Une autre instance existe déjà, on quitte
+        sys.exit(0)
+
+    # Journal JSON-lines (instance unique : un seul processus écrit le fichier)
+    settings = load_settings()
+    setup_logging(
+        LOG_FILE,
+        level=settings.get("log_level", DEFAULT_LOG_LEVEL),
+        max_bytes=settings.get("log_max_bytes", DEFAULT_LOG_MAX_BYTES),
+        backups=settings.get("log_backups", DEFAULT_LOG_BACKUPS),
+        slow_ms=settings.get("slow_span_ms", DEFAULT_SLOW_SPAN_MS),
+    )
+    # Endpoint Prometheus local (désactivé par défaut)
+    if settings.get("metrics_port"):
+        start_http_server(settings["metrics_port"], settings.get("metrics_host", DEFAULT_METRICS_HOST))
+
+    # ===== TOUT LE CODE PRINCIPAL DANS UN TRY/EXCEPT =====
+    try:
+        # Debug : ouvre une console pour voir les erreurs
+        if getattr(sys, 'frozen', False):
+            import ctypes
+            ctypes.windll.user32.ShowWindow(ctypes.windll.kernel32.GetConsoleWindow(), 6)  # cache la console
+
+        log.info(f"HTML_PATH = {HTML_PATH}")
+        log.info(f"Fichier existe ? {os.path.exists(HTML_PATH)}")
+
+        if not os.path.exists(HTML_PATH):
+            raise FileNotFoundError(f"index.html introuvable ! Chemin : {HTML_PATH}")
+
+        # Configuration du system tray (en arrière-plan)
+        start_tray()
+
+        # Lancement
+        log.info("Création de la fenêtre...")
+        with profiler.phase("window_creation"):
+            import webview
+
+            api = Api()
+            window = webview.create_window(
+                "iRacing Personal Launcher",
+                HTML_PATH,
+                js_api=api,
+                width=1040,
+                height=840,
+                resizable=True,
+                min_size=(900, 700),
+                on_top=False
             )
-            root.destroy()
-            
-            settings["hide_close_notification"] = True
-            save_settings(settings)
-        
-        hide_window()
-        return False
 
-    # Lancement
-    print("Création de la fenêtre...")
-    window = webview.create_window(
-        "iRacing Personal Launcher",
-        HTML_PATH,
-        js_api=Api(),
-        width=1040,
-        height=840,
-        resizable=True,
-        min_size=(900, 700),
-        on_top=False
-    )
+            window.events.closing += on_closing
+            window.events.loaded += on_loaded
 
-    window.events.closing += on_closing
+        # Commandes des lancements suivants (ex: double-clic sur l'exe -> afficher la fenêtre)
+        instance.serve({
+            "show": lambda args: show_window(),
+            "launch_profile": lambda args: api.start_selected(profile=args.get("name")),
+            "cli": run_cli_command,
+        })
+        if profile_arg:
+            run_profile_in_background(profile_arg)
 
-    print("Démarrage de webview...")
-    webview.start(debug=False, gui='edgehtml')
+        log.info("Démarrage de webview...")
+        webview.start(debug=False, gui='edgehtml')
 
-    # Nettoyer le lock file à la sortie
-    remove_lock()
+        # Libérer le verrou d'instance à la sortie
+        flush_all()
+        instance.release()
+        shutdown_logging()
 
-except Exception as e:
-    error_msg = f"Erreur au démarrage:\n\n{str(e)}\n\n{traceback.format_exc()}"
-    print(error_msg)
-    
-    root = tk.Tk()
-    root.withdraw()
-    messagebox.showerror("Erreur fatale", error_msg)
-    root.destroy()
-    
-    remove_lock()
-    input("Appuyez sur Entrée pour quitter...")
-    sys.exit(1)
+    except Exception as e:
+        error_msg = f"Erreur au démarrage:\n\n{str(e)}\n\n{traceback.format_exc()}"
+        log.error(error_msg)
+        
+        show_message("error", "Erreur fatale", error_msg)
+        
+        instance.release()
+        input("Appuyez sur Entrée pour quitter...")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    # cli.py importe "main" : réutiliser ce module (mêmes stores en mémoire) au lieu de le recharger
+    sys.modules.setdefault("main", sys.modules[__name__])
+    main()
@@ -0,0 +1,252 @@
+"""
+iRacing Launcher - Métriques (compteurs et histogrammes de latence)
+Registre en mémoire alimenté par les chemins chauds : méthodes de l'Api
+(spans "api.*" de logs.traced_methods), scans psutil et réutilisation du
+snapshot des processus, ticks de la télémétrie.
+Lecture par Api.get_metrics() (JSON) ou, si "metrics_port" est défini dans
+launcher_settings.json, par un endpoint HTTP local au format texte Prometheus.
+"""
+import bisect
+import logging
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+from logs import add_span_listener
+
+log = logging.getLogger(__name__)
+
+# Bornes (secondes) des histogrammes de latence : de 0,5 ms à 30 s
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+# Bornes des histogrammes de comptage (processus lus par scan...)
+COUNT_BUCKETS = (10, 25, 50, 100, 200, 300, 500, 750, 1000, 2000, 5000)
+
+DEFAULT_METRICS_HOST = "127.0.0.1"
+API_SPAN_PREFIX = "api."
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._series = {}  # tuple des valeurs de labels -> état
+
+    def _key(self, labels):
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} : labels attendus {self.labelnames}, reçus {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key):
+        return dict(zip(self.labelnames, key))
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._series.get(self._key(labels), 0)
+
+    def snapshot(self):
+        with self._lock:
+            return [{"labels": self._labels(k), "value": v} for k, v in self._series.items()]
+
+    def exposition(self):
+        with self._lock:
+            return [(self.name, self._labels(k), v) for k, v in self._series.items()]
+
+
+class Histogram(_Metric):
+    """Histogramme à bornes fixes : comptes par tranche, somme, nombre, maximum"""
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # [comptes par tranche (+Inf en dernier), somme, nombre, max]
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0, 0.0]
+            series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+            if value > series[3]:
+                series[3] = value
+
+    @contextmanager
+    def time(self, **labels):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0, **labels)
+
+    def _quantile(self, counts, total, maximum, q):
+        """Estimation par la borne haute de la tranche (le max observé pour +Inf)"""
+        rank = math.ceil(q * total)
+        seen = 0
+        for bound, count in zip(self.buckets, counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, maximum)
+        return maximum
+
+    def snapshot(self):
+        with self._lock:
+            series = [(k, list(s[0]), s[1], s[2], s[3]) for k, s in self._series.items()]
+        result = []
+        for key, counts, total_sum, count, maximum in series:
+            result.append({
+                "labels": self._labels(key),
+                "count": count,
+                "sum": round(total_sum, 6),
+                "mean": round(total_sum / count, 6) if count else 0,
+                "max": round(maximum, 6),
+                "p50": round(self._quantile(counts, count, maximum, 0.5), 6),
+                "p90": round(self._quantile(counts, count, maximum, 0.9), 6),
+                "p99": round(self._quantile(counts, count, maximum, 0.99), 6),
+            })
+        return result
+
+    def exposition(self):
+        with self._lock:
+            series = [(k, list(s[0]), s[1], s[2]) for k, s in self._series.items()]
+        samples = []
+        for key, counts, total_sum, count in series:
+            labels = self._labels(key)
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                samples.append((f"{self.name}_bucket", dict(labels, le=_format_value(bound)), cumulative))
+            samples.append((f"{self.name}_bucket", dict(labels, le="+Inf"), count))
+            samples.append((f"{self.name}_sum", labels, total_sum))
+            samples.append((f"{self.name}_count", labels, count))
+        return samples
+
+
+def _format_value(value):
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value)) if abs(value) < 1e15 else repr(value)
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class MetricsRegistry:
+    """Métriques par nom ; counter() / histogram() renvoient la métrique existante si elle est déjà déclarée"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def _get(self, cls, name, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Métrique {name} déjà déclarée comme {metric.kind}")
+            return metric
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._get(Counter, name, help_text, labelnames)
+
+    def histogram(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._get(Histogram, name, help_text, labelnames, buckets)
+
+    def snapshot(self):
+        """{nom: {type, help, series: [...]}} (histogrammes : count, sum, mean, max, p50, p90, p99)"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {m.name: {"type": m.kind, "help": m.help, "series": m.snapshot()} for m in metrics}
+
+    def prometheus_text(self):
+        """Format texte d'exposition Prometheus (version 0.0.4)"""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {_escape(metric.help)}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.exposition():
+                if labels:
+                    text = ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+                    name = f"{name}{{{text}}}"
+                lines.append(f"{name} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+# Registre du processus : les modules y déclarent leurs métriques à l'import
+registry = MetricsRegistry()
+
+api_calls = registry.histogram("launcher_api_call_seconds", "Durée des appels de l'Api", ("method",))
+api_errors = registry.counter("launcher_api_errors_total", "Appels de l'Api terminés par une exception",
+                              ("method",))
+
+
+def _observe_api_span(entry):
+    """
+    Fin d'un span "api.<méthode>" (traced_methods("api") sur l'Api) : la durée
+    déjà mesurée par le span alimente launcher_api_call_seconds, sans second chronomètre.
+    """
+    name = entry["span"]
+    if not name.startswith(API_SPAN_PREFIX):
+        return
+    method = name[len(API_SPAN_PREFIX):]
+    api_calls.observe(entry["duration_ms"] / 1000, method=method)
+    if not entry["ok"]:
+        api_errors.inc(method=method)
+
+
+add_span_listener(_observe_api_span)
+
+
+def start_http_server(port, host=DEFAULT_METRICS_HOST, metrics=registry):
+    """
+    Sert GET /metrics (texte Prometheus) dans un thread en arrière-plan.
+    Retourne le serveur, ou None si le port n'est pas disponible.
+    """
+    # Import à la demande : l'endpoint est optionnel et désactivé par défaut
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            body = metrics.prometheus_text().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            log.debug(f"metrics {self.address_string()} {format % args}")
+
+    try:
+        server = ThreadingHTTPServer((host, port), Handler)
+    except OSError as e:
+        log.warning(f"Endpoint de métriques indisponible sur {host}:{port} : {e}")
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    log.info(f"Métriques Prometheus : http://{host}:{server.server_address[1]}/metrics")
+    return server
@@ -0,0 +1,190 @@
+"""
+iRacing Launcher - Priorité CPU et affinité des apps
+Champs optionnels par app (launcher_apps.json) :
+  priority : "idle", "below_normal", "normal", "above_normal" ou "high"
+  affinity : cœurs autorisés, liste d'index ([0, 1] ; négatif = depuis la fin,
+             [-2, -1] = deux derniers cœurs) ou texte ("0-3,6", "last:2")
+  sim      : true pour l'app de la sim, jamais abaissée par le mode sim
+Appliqués juste après le lancement et à chaque nouveau processus vu par le watcher.
+
+Mode sim (launcher_settings.json "sim_mode": true) : tant que l'exe de la sim
+tourne, les autres apps passent au plus en priorité "sim_mode_priority".
+"""
+import logging
+import sys
+import threading
+
+import psutil
+
+from processes import path_key
+
+log = logging.getLogger(__name__)
+
+DEFAULT_SIM_EXE = "iRacingSim64DX11.exe"
+DEFAULT_SIM_MODE_PRIORITY = "below_normal"
+SIM_CHECK_INTERVAL = 5.0   # recherche de la sim (réutilise le scan du watcher), puis attente bloquante
+
+PRIORITY_LEVELS = ("idle", "below_normal", "normal", "above_normal", "high")
+
+if sys.platform == "win32":
+    _PRIORITY_VALUES = {
+        "idle": psutil.IDLE_PRIORITY_CLASS,
+        "below_normal": psutil.BELOW_NORMAL_PRIORITY_CLASS,
+        "normal": psutil.NORMAL_PRIORITY_CLASS,
+        "above_normal": psutil.ABOVE_NORMAL_PRIORITY_CLASS,
+        "high": psutil.HIGH_PRIORITY_CLASS,
+    }
+else:
+    # Valeurs nice équivalentes (monter au-dessus de normal demande les droits root)
+    _PRIORITY_VALUES = {"idle": 19, "below_normal": 10, "normal": 0, "above_normal": -5, "high": -10}
+
+
+def parse_affinity(spec, cpu_count):
+    """Liste triée des cœurs désignés par `spec` (None si vide ou invalide)"""
+    if spec is None or spec == "" or spec == []:
+        return None
+    cores = set()
+    try:
+        if isinstance(spec, str):
+            for part in spec.replace(" ", "").split(","):
+                if part.startswith("last:"):
+                    n = int(part[5:])
+                    cores.update(range(max(0, cpu_count - n), cpu_count))
+                elif part.startswith("first:"):
+                    cores.update(range(min(cpu_count, int(part[6:]))))
+                elif "-" in part:
+                    a, b = part.split("-", 1)
+                    cores.update(range(int(a), int(b) + 1))
+                elif part:
+                    cores.add(int(part))
+        else:
+            for core in spec:
+                core = int(core)
+                cores.add(core + cpu_count if core < 0 else core)
+    except (TypeError, ValueError):
+        log.warning(f"Affinité invalide : {spec!r}")
+        return None
+    cores = sorted(c for c in cores if 0 <= c < cpu_count)
+    return cores or None
+
+
+def lower_priority(a, b):
+    """Le plus bas des deux niveaux (None = non défini)"""
+    if a not in PRIORITY_LEVELS:
+        return b
+    if b not in PRIORITY_LEVELS:
+        return a
+    return min(a, b, key=PRIORITY_LEVELS.index)
+
+
+class PolicyEngine:
+    """
+    apply(app, procs)       : après un lancement (hook du LaunchScheduler)
+    on_started(path, procs) : nouveaux processus vus par le watcher (relance, lancement externe)
+    Le mode sim tourne dans un thread : recherche de la sim toutes les
+    SIM_CHECK_INTERVAL secondes puis attente bloquante de sa fin.
+    """
+
+    def __init__(self, registry, sim_mode=False, sim_exe=DEFAULT_SIM_EXE,
+                 sim_priority=DEFAULT_SIM_MODE_PRIORITY):
+        self.registry = registry
+        self.sim_mode = sim_mode
+        self.sim_exe = sim_exe
+        self.sim_priority = sim_priority
+        self.sim_running = False
+        self._cpu_count = psutil.cpu_count() or 1
+        self._lock = threading.Lock()
+        self._apps = {}   # path_key -> app
+        self._stopped = threading.Event()
+
+    def set_apps(self, apps):
+        entries = {path_key(app["path"]): app for app in apps if app.get("path")}
+        with self._lock:
+            self._apps = entries
+
+    def start(self):
+        if self.sim_mode:
+            threading.Thread(target=self._watch_sim, name="SimMode", daemon=True).start()
+
+    def stop(self):
+        self._stopped.set()
+
+    def priority_for(self, app):
+        """Priorité effective : celle de l'app, abaissée pendant que la sim tourne"""
+        priority = app.get("priority")
+        if self.sim_mode and not app.get("sim"):
+            # Priorité de base explicite : c'est elle qui est rétablie à la sortie de la sim
+            priority = priority or "normal"
+            if self.sim_running:
+                priority = lower_priority(priority, self.sim_priority)
+        return priority
+
+    def apply(self, app, procs):
+        """Applique priorité et affinité aux processus d'une app"""
+        priority = self.priority_for(app)
+        cores = parse_affinity(app.get("affinity"), self._cpu_count)
+        if priority is None and cores is None:
+            return
+        value = _PRIORITY_VALUES.get(priority)
+        if priority is not None and value is None:
+            log.warning(f"Priorité inconnue pour {app.get('name', '?')} : {priority}")
+        for tracked in procs:
+            proc = tracked.proc
+            try:
+                if value is not None and proc.nice() != value:
+                    proc.nice(value)
+                if cores is not None and hasattr(proc, "cpu_affinity") and proc.cpu_affinity() != cores:
+                    proc.cpu_affinity(cores)
+            except psutil.NoSuchProcess:
+                continue
+            except psutil.AccessDenied:
+                # App administrateur ou droits insuffisants (priorité haute sous Linux)
+                log.warning(f"Priorité / affinité refusée pour {app.get('name', '?')} (PID {proc.pid})")
+            except (OSError, ValueError) as e:
+                log.warning(f"Priorité / affinité impossible pour {app.get('name', '?')} : {e}")
+
+    def on_started(self, path, procs):
+        with self._lock:
+            app = self._apps.get(path_key(path))
+        if app is not None:
+            self.apply(app, procs)
+
+    def apply_all(self):
+        """Réapplique les politiques de toutes les apps en cours (entrée / sortie du mode sim)"""
+        with self._lock:
+            apps = list(self._apps.values())
+        found = self.registry.find_all([app["path"] for app in apps])
+        for app in apps:
+            procs = found.get(app["path"])
+            if procs:
+                self.apply(app, procs)
+
+    def _watch_sim(self):
+        snapshot = self.registry.snapshot
+        while not self._stopped.is_set():
+            try:
+                # Index partagé avec le watcher : en général pas de scan supplémentaire
+                pids = snapshot.pids(self.sim_exe, max_age=SIM_CHECK_INTERVAL)
+                if not pids:
+                    self._stopped.wait(SIM_CHECK_INTERVAL)
+                    continue
+                sim = psutil.Process(pids[0])
+                log.info(f"[sim] {self.sim_exe} démarrée : priorité des autres apps -> {self.sim_priority}")
+                self.sim_running = True
+                self.apply_all()
+                while not self._stopped.is_set():
+                    try:
+                        sim.wait(timeout=1)
+                        break
+                    except psutil.TimeoutExpired:
+                        continue
+            except psutil.NoSuchProcess:
+                snapshot.invalidate()  # PID d'un index périmé : nouveau scan au prochain tour
+            except Exception as e:
+                log.exception(f"Erreur mode sim: {e}")
+                self._stopped.wait(SIM_CHECK_INTERVAL)
+            if self.sim_running:
+                log.info(f"[sim] {self.sim_exe} fermée : priorités rétablies")
+                self.sim_running = False
+                snapshot.invalidate()
+                self.apply_all()
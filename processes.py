@@ -0,0 +1,413 @@
+"""
+iRacing Launcher - Gestion des processus
+Index partagé des processus en cours, registre des processus lancés
+et watcher qui signale les changements d'état à l'UI
+"""
+import base64
+import logging
+import os
+import subprocess
+import tempfile
+import threading
+import time
+
+import psutil
+
+from metrics import registry as metrics, COUNT_BUCKETS
+
+log = logging.getLogger(__name__)
+
+_snapshot_requests = metrics.counter(
+    "launcher_snapshot_requests_total",
+    "Demandes de l'index des processus : reused = snapshot réutilisé, scanned = nouveau scan",
+    ("result",))
+_scan_seconds = metrics.histogram("launcher_process_scan_seconds", "Durée d'un scan psutil.process_iter")
+_scan_processes = metrics.histogram("launcher_process_scan_processes", "Processus lus par scan",
+                                    buckets=COUNT_BUCKETS)
+_registry_lookups = metrics.counter(
+    "launcher_registry_lookups_total",
+    "Recherches d'apps : hit = PIDs du registre, miss = recherche dans l'index des processus",
+    ("result",))
+
+# Durée (secondes) pendant laquelle un snapshot est réutilisé
+DEFAULT_SNAPSHOT_TTL = 0.5
+
+
+def exe_key(exe_path):
+    """Nom d'exécutable normalisé utilisé comme clé dans l'index"""
+    return os.path.basename(exe_path).lower()
+
+
+def path_key(exe_path):
+    """Chemin complet normalisé : distingue deux outils qui partagent un nom d'exe"""
+    return os.path.normcase(os.path.abspath(exe_path))
+
+
+def _ps_quote(value):
+    """Chaîne PowerShell entre apostrophes (les ' sont doublées)"""
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def wait_exit(procs, timeout, callback=None, interval=0.05):
+    """
+    Attend la sortie d'un lot précis de psutil.Process (comme psutil.wait_procs,
+    mais avec une résolution fixe de `interval` quel que soit le nombre de processus).
+    Retourne (gone, alive).
+    """
+    deadline = time.monotonic() + timeout
+    gone = []
+    alive = list(procs)
+    while True:
+        for proc in list(alive):
+            try:
+                proc.wait(timeout=0)
+            except psutil.TimeoutExpired:
+                continue
+            except psutil.NoSuchProcess:
+                pass
+            alive.remove(proc)
+            gone.append(proc)
+            if callback:
+                callback(proc)
+        remaining = deadline - time.monotonic()
+        if not alive or remaining <= 0:
+            return gone, alive
+        time.sleep(min(interval, remaining))
+
+
+class ProcessSnapshot:
+    """
+    Index nom d'exécutable -> PIDs construit par un seul psutil.process_iter.
+    Les appels qui arrivent à moins de `ttl` secondes d'intervalle réutilisent
+    le même index au lieu de relire toute la table des processus.
+    """
+
+    def __init__(self, ttl=DEFAULT_SNAPSHOT_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._index = {}
+        self._taken_at = None
+
+    def index(self, max_age=None):
+        """
+        Retourne l'index {nom_exe: [pids]}.
+        Il est reconstruit s'il est plus vieux que max_age (par défaut le TTL).
+        """
+        if max_age is None:
+            max_age = self.ttl
+
+        with self._lock:
+            if self._taken_at is None or time.monotonic() - self._taken_at > max_age:
+                self._index = self._scan()
+                self._taken_at = time.monotonic()
+                _snapshot_requests.inc(result="scanned")
+            else:
+                _snapshot_requests.inc(result="reused")
+            return self._index
+
+    def invalidate(self):
+        """Force la reconstruction au prochain appel (après un start/stop)"""
+        with self._lock:
+            self._taken_at = None
+
+    def pids(self, exe_path, max_age=None):
+        """PIDs des processus dont le nom correspond à l'exécutable"""
+        if not exe_path:
+            return []
+        return list(self.index(max_age).get(exe_key(exe_path), ()))
+
+    def is_running(self, exe_path, max_age=None):
+        return bool(self.pids(exe_path, max_age))
+
+    @staticmethod
+    def _scan():
+        index = {}
+        count = 0
+        t0 = time.perf_counter()
+        try:
+            # process_iter gère NoSuchProcess/AccessDenied : info['name'] vaut alors None
+            for proc in psutil.process_iter(['name']):
+                count += 1
+                name = proc.info['name']
+                if name:
+                    index.setdefault(name.lower(), []).append(proc.pid)
+        except Exception as e:
+            log.error(f"Erreur scan processus: {e}")
+        _scan_seconds.observe(time.perf_counter() - t0)
+        _scan_processes.observe(count)
+        return index
+
+
+class TrackedProcess:
+    """Processus suivi par le registre : PID + create_time (anti-réutilisation) + exe"""
+    __slots__ = ("proc", "exe", "popen")
+
+    def __init__(self, proc, exe, popen=None):
+        self.proc = proc
+        self.exe = exe
+        self.popen = popen
+
+    @property
+    def pid(self):
+        return self.proc.pid
+
+    @property
+    def create_time(self):
+        return self.proc.create_time()
+
+    def is_alive(self):
+        if self.popen is not None:
+            # poll() récupère aussi le code de sortie (pas de zombie sous Linux)
+            return self.popen.poll() is None
+        try:
+            return self.proc.is_running() and self.proc.status() != psutil.STATUS_ZOMBIE
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            return False
+
+
+class ProcessRegistry:
+    """
+    Registre chemin d'exe -> processus lancés ou découverts.
+    Les recherches sont en O(1) sur le registre ; un scan complet (via le snapshot)
+    n'a lieu que pour les apps sans entrée, par ex. lancées hors du launcher.
+    """
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+        self._lock = threading.Lock()
+        self._entries = {}  # path_key -> [TrackedProcess]
+
+    def spawn(self, exe_path, admin=False):
+        """Lance l'app et enregistre son PID. Retourne le TrackedProcess (None si échec élévation)."""
+        if admin:
+            return self.spawn_elevated([(exe_path, 0)])[0]
+
+        popen = subprocess.Popen(exe_path)
+        tracked = self._add(exe_path, psutil.Process(popen.pid), popen)
+        self.snapshot.invalidate()
+        return tracked
+
+    def spawn_elevated(self, entries):
+        """
+        Lance plusieurs apps administrateur en UNE seule élévation (un seul UAC,
+        un seul powershell élevé). entries : [(exe_path, attente_s)] dans l'ordre de
+        lancement, attente_s = délai depuis le lancement précédent du script.
+        Retourne la liste des TrackedProcess (None pour une app non lancée).
+        """
+        fd, pid_file = tempfile.mkstemp(prefix="launcher_elevated_", suffix=".txt")
+        os.close(fd)
+        try:
+            lines = []
+            for i, (exe_path, delay) in enumerate(entries):
+                if delay:
+                    lines.append(f"Start-Sleep -Milliseconds {int(delay * 1000)}")
+                lines.append(
+                    f"$p = Start-Process -FilePath {_ps_quote(exe_path)} -PassThru; "
+                    f"Add-Content -Path {_ps_quote(pid_file)} -Value \"{i}:$($p.Id)\""
+                )
+            script = base64.b64encode("\n".join(lines).encode("utf-16-le")).decode()
+
+            # powershell non élevé -> UN powershell élevé qui lance toutes les apps
+            subprocess.run(
+                ["powershell", "-NoProfile", "-Command",
+                 "Start-Process powershell -Verb RunAs -WindowStyle Hidden -Wait "
+                 f"-ArgumentList '-NoProfile','-EncodedCommand','{script}'"],
+                creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0),
+            )
+
+            results = [None] * len(entries)
+            with open(pid_file, "r", encoding="utf-8", errors="ignore") as f:
+                for line in f:
+                    idx, _, pid = line.strip().lstrip("\ufeff").partition(":")
+                    try:
+                        exe_path = entries[int(idx)][0]
+                        results[int(idx)] = self._add(exe_path, psutil.Process(int(pid)))
+                    except (ValueError, IndexError, psutil.NoSuchProcess, psutil.AccessDenied):
+                        continue
+            return results
+        finally:
+            self.snapshot.invalidate()
+            try:
+                os.remove(pid_file)
+            except OSError:
+                pass
+
+    def _add(self, exe_path, proc, popen=None):
+        tracked = TrackedProcess(proc, exe_path, popen)
+        with self._lock:
+            self._entries.setdefault(path_key(exe_path), []).append(tracked)
+        return tracked
+
+    def lookup(self, exe_path):
+        """Processus vivants enregistrés pour cet exe (sans scan)"""
+        key = path_key(exe_path)
+        with self._lock:
+            entries = [t for t in self._entries.get(key, ()) if t.is_alive()]
+            if entries:
+                self._entries[key] = entries
+            else:
+                self._entries.pop(key, None)
+        return entries
+
+    def find(self, exe_path):
+        return self.find_all([exe_path]).get(exe_path, [])
+
+    def find_all(self, exe_paths):
+        """
+        {exe_path: [TrackedProcess]} pour plusieurs apps.
+        Au plus un scan pour toutes les apps absentes du registre.
+        """
+        result = {}
+        missing = []
+        for exe_path in exe_paths:
+            if not exe_path:
+                continue
+            entries = self.lookup(exe_path)
+            if entries:
+                result[exe_path] = entries
+            else:
+                missing.append(exe_path)
+
+        _registry_lookups.inc(len(result), result="hit")
+        if missing:
+            _registry_lookups.inc(len(missing), result="miss")
+            index = self.snapshot.index()
+            for exe_path in missing:
+                entries = self._discover(exe_path, index.get(exe_key(exe_path), ()))
+                if entries:
+                    result[exe_path] = entries
+        return result
+
+    def forget(self, exe_path):
+        with self._lock:
+            self._entries.pop(path_key(exe_path), None)
+
+    def _discover(self, exe_path, pids):
+        """Vérifie le chemin complet des candidats trouvés par nom et les adopte"""
+        key = path_key(exe_path)
+        entries = []
+        for pid in pids:
+            try:
+                proc = psutil.Process(pid)
+                try:
+                    exe = proc.exe()
+                    if exe and path_key(exe) != key:
+                        continue  # même nom d'exe, autre outil
+                except psutil.AccessDenied:
+                    pass  # chemin illisible (processus protégé) : on garde la correspondance par nom
+                entries.append(TrackedProcess(proc, exe_path))
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+        if entries:
+            with self._lock:
+                self._entries[key] = entries
+        return entries
+
+
+class ProcessWatcher(threading.Thread):
+    """
+    Surveille les apps en arrière-plan et ne signale que les changements d'état.
+    - PIDs connus (registre) : simple test de vie, sans relire la table des processus
+    - Nouvelle recherche seulement si un PID disparaît, après poke() (start/stop/restart)
+      ou toutes les `discovery_interval` secondes pour les apps lancées hors launcher
+    on_change reçoit un dict {id_app: True/False} des états modifiés (index si l'app n'a pas d'id).
+    on_start(chemin, [TrackedProcess]) reçoit les processus apparus depuis le tour
+    précédent (app démarrée ou relancée, y compris hors du launcher).
+    """
+
+    def __init__(self, registry, on_change, interval=0.25, discovery_interval=5.0, on_start=None):
+        super().__init__(name="ProcessWatcher", daemon=True)
+        self.registry = registry
+        self.on_change = on_change
+        self.on_start = on_start
+        self.interval = interval
+        self.discovery_interval = discovery_interval
+
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._paths = []
+        self._ids = []
+        self._known = {}      # index app -> [TrackedProcess]
+        self._states = {}     # index app -> dernier état signalé
+        self._rescan_until = 0.0
+        self._last_scan = 0.0
+
+    def set_apps(self, apps):
+        """Nouvelle liste d'apps : tout l'état est renvoyé au prochain tour"""
+        paths = [app.get('path', '') for app in apps]
+        ids = [app.get('id', idx) for idx, app in enumerate(apps)]
+        with self._lock:
+            if paths == self._paths and ids == self._ids:
+                return
+            self._paths = paths
+            self._ids = ids
+            self._known = {}
+            self._states = {}
+        self.poke()
+
+    def poke(self, burst=3.0):
+        """Force des rescans complets pendant `burst` secondes (le temps que l'app démarre)"""
+        with self._lock:
+            self._rescan_until = max(self._rescan_until, time.monotonic() + burst)
+        self._wake.set()
+
+    def stop(self):
+        self._stopped.set()
+        self._wake.set()
+
+    def run(self):
+        while not self._stopped.is_set():
+            try:
+                self._tick()
+            except Exception as e:
+                log.exception(f"Erreur ProcessWatcher: {e}")
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def _tick(self):
+        with self._lock:
+            paths = list(self._paths)
+            ids = list(self._ids)
+            known = self._known
+            now = time.monotonic()
+            rescan = now < self._rescan_until or now - self._last_scan > self.discovery_interval
+
+        if not rescan:
+            # Test de vie des PIDs connus (vérifie aussi la réutilisation de PID)
+            for procs in known.values():
+                if any(not tracked.is_alive() for tracked in procs):
+                    rescan = True
+                    break
+
+        if rescan:
+            known = self._rebuild(paths)
+            self._last_scan = time.monotonic()
+
+        changes = {}
+        started = []
+        with self._lock:
+            if self._paths != paths or self._ids != ids:
+                return  # set_apps() entre-temps : le prochain tour repartira de zéro
+            if rescan and self.on_start is not None:
+                for idx, procs in known.items():
+                    before = {t.pid for t in self._known.get(idx, ())}
+                    new = [t for t in procs if t.pid not in before]
+                    if new:
+                        started.append((paths[idx], new))
+            self._known = known
+            for idx in range(len(paths)):
+                running = bool(known.get(idx))
+                if self._states.get(idx) != running:
+                    self._states[idx] = running
+                    changes[ids[idx]] = running
+
+        if changes:
+            self.on_change(changes)
+        for path, procs in started:
+            self.on_start(path, procs)
+
+    def _rebuild(self, paths):
+        valid = [path for path in paths if path and os.path.exists(path)]
+        found = self.registry.find_all(valid)
+        return {idx: found[path] for idx, path in enumerate(paths) if path in found}
@@ -0,0 +1,87 @@
+"""
+iRacing Launcher - Profil de démarrage
+Mesure des phases du démarrage (instance unique, tray, fenêtre, premier
+get_apps, premier rendu) activée par l'option --profile-startup.
+Le rapport est écrit en JSON pour comparer les builds entre eux.
+"""
+import json
+import logging
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+log = logging.getLogger(__name__)
+
+STARTUP_PROFILE_FILE = "startup_profile.json"
+
+
+class StartupProfiler:
+    """
+    Temps relatifs à t0 (time.perf_counter() en tout début de main.py).
+    Désactivé par défaut : phase() et mark_once() coûtent alors quasiment rien.
+    """
+
+    def __init__(self, t0, path=STARTUP_PROFILE_FILE):
+        self.t0 = t0
+        self.path = path
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._phases = []
+        self._marks = {}
+
+    def enable(self):
+        self.enabled = True
+
+    def _now_ms(self):
+        return round((time.perf_counter() - self.t0) * 1000, 1)
+
+    @contextmanager
+    def phase(self, name):
+        """Chronomètre un bloc : {name, start_ms, end_ms, duration_ms}"""
+        if not self.enabled:
+            yield
+            return
+        start = self._now_ms()
+        try:
+            yield
+        finally:
+            end = self._now_ms()
+            with self._lock:
+                self._phases.append({
+                    "name": name,
+                    "start_ms": start,
+                    "end_ms": end,
+                    "duration_ms": round(end - start, 1),
+                })
+
+    def mark_once(self, name):
+        """Note l'instant d'un événement. Retourne True la première fois seulement."""
+        with self._lock:
+            if name in self._marks:
+                return False
+            self._marks[name] = self._now_ms()
+            return True
+
+    def report(self):
+        with self._lock:
+            return {
+                "frozen": bool(getattr(sys, "frozen", False)),
+                "imported_modules": len(sys.modules),
+                "phases": list(self._phases),
+                "marks": dict(self._marks),
+                "total_ms": self._now_ms(),
+            }
+
+    def write(self):
+        """Écrit le rapport JSON (sans effet si le profil n'est pas activé)"""
+        if not self.enabled:
+            return None
+        report = self.report()
+        try:
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=4)
+            log.info(f"Profil de démarrage écrit : {self.path}")
+        except OSError as e:
+            log.error(f"Erreur écriture {self.path}: {e}")
+        return report
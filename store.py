@@ -0,0 +1,177 @@
+"""
+iRacing Launcher - Persistance JSON
+État en mémoire, écritures regroupées (debounce) par un thread unique,
+écriture atomique (fichier temporaire puis rename) et relecture seulement
+si le fichier a changé sur le disque.
+"""
+import copy
+import json
+import logging
+import os
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+DEFAULT_DEBOUNCE = 0.5
+
+
+class _Flusher(threading.Thread):
+    """Thread unique qui écrit les stores modifiés une fois leur délai écoulé"""
+
+    def __init__(self):
+        super().__init__(name="StoreFlusher", daemon=True)
+        self._cond = threading.Condition()
+        self._due = {}  # store -> échéance (monotonic)
+
+    def schedule(self, store, delay):
+        with self._cond:
+            # Coalescence : la première échéance est conservée, les saves suivants s'y ajoutent
+            self._due.setdefault(store, time.monotonic() + delay)
+            self._cond.notify()
+
+    def cancel(self, store):
+        with self._cond:
+            self._due.pop(store, None)
+
+    def run(self):
+        while True:
+            with self._cond:
+                while not self._due:
+                    self._cond.wait()
+                store, due = min(self._due.items(), key=lambda item: item[1])
+                wait = due - time.monotonic()
+                if wait > 0:
+                    self._cond.wait(wait)
+                    continue
+                del self._due[store]
+            store.flush()
+
+
+_flusher = None
+_flusher_lock = threading.Lock()
+_stores = []
+
+
+def _get_flusher():
+    global _flusher
+    with _flusher_lock:
+        if _flusher is None:
+            _flusher = _Flusher()
+            _flusher.start()
+        return _flusher
+
+
+def flush_all():
+    """Écrit immédiatement tous les stores en attente (à appeler avant de quitter)"""
+    for store in list(_stores):
+        store.flush()
+
+
+class JsonStore:
+    """
+    Fichier JSON gardé en mémoire.
+    load() ne relit le disque que si le fichier a changé (mtime/taille) ;
+    save() met à jour la mémoire et programme une écriture atomique différée.
+    """
+
+    def __init__(self, path, default=dict, debounce=DEFAULT_DEBOUNCE):
+        self.path = path
+        self.default = default
+        self.debounce = debounce
+        self._lock = threading.RLock()
+        self._data = None
+        self._stat = None     # (mtime_ns, taille) du fichier lors de la dernière synchro
+        self._dirty = False
+        _stores.append(self)
+
+    def load(self):
+        """Copie des données (relues seulement si le fichier a changé sur le disque)"""
+        with self._lock:
+            if not self._dirty:
+                stat = self._file_stat()
+                if self._data is None or stat != self._stat:
+                    self._data = self._read()
+                    self._stat = stat
+            return copy.deepcopy(self._data)
+
+    def load_if_changed(self):
+        """Copie des données si le fichier a changé sur le disque depuis la dernière synchro, sinon None"""
+        with self._lock:
+            if self._dirty:
+                return None
+            stat = self._file_stat()
+            if self._data is not None and stat == self._stat:
+                return None
+            self._data = self._read()
+            self._stat = stat
+            return copy.deepcopy(self._data)
+
+    def save(self, data):
+        """Met à jour la mémoire ; l'écriture disque est regroupée avec les suivantes"""
+        with self._lock:
+            self._data = copy.deepcopy(data)
+            self._dirty = True
+        if self.debounce > 0:
+            _get_flusher().schedule(self, self.debounce)
+        else:
+            self.flush()
+
+    def flush(self):
+        """Écrit tout de suite si des modifications sont en attente"""
+        with self._lock:
+            if not self._dirty:
+                return
+            # Échéance retirée avant l'écriture : un save() bloqué sur le verrou pendant
+            # l'écriture reprogramme la sienne, elle n'est plus annulée après coup
+            if _flusher is not None:
+                _flusher.cancel(self)
+            try:
+                self._write(self._data)
+                self._stat = self._file_stat()
+                self._dirty = False
+            except Exception as e:
+                log.error(f"Erreur écriture {self.path}: {e}")
+                if self.debounce > 0:
+                    _get_flusher().schedule(self, self.debounce)  # nouvel essai plus tard
+
+    def _file_stat(self):
+        try:
+            st = os.stat(self.path)
+            return (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+
+    def _read(self):
+        if not os.path.exists(self.path):
+            return self.default()
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            # Fichier illisible : on le met de côté au lieu de l'écraser silencieusement
+            corrupt = f"{self.path}.corrupt-{int(time.time())}"
+            log.error(f"Erreur lecture {self.path}: {e} (copie conservée : {corrupt})")
+            try:
+                os.replace(self.path, corrupt)
+            except OSError:
+                pass
+            return self.default()
+
+    def _write(self, data):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        tmp = os.path.join(directory, f".{os.path.basename(self.path)}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=4, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+
+        # Sous Windows, le rename peut échouer brièvement (antivirus, indexeur)
+        for attempt in range(5):
+            try:
+                os.replace(tmp, self.path)
+                return
+            except PermissionError:
+                if attempt == 4:
+                    raise
+                time.sleep(0.05 * (attempt + 1))
@@ -0,0 +1,308 @@
+"""
+iRacing Launcher - Superviseur (redémarrage automatique)
+Pour les apps avec "supervise" : un thread par app attend la sortie de ses
+processus suivis par le registre (attente bloquante sur le processus, sans
+scan ; sondage de is_alive() pour les apps élevées non attendables), puis relance l'app par le même chemin que le lancement
+normal, avec un délai exponentiel et une limite de redémarrages.
+
+Un arrêt demandé par l'utilisateur (stop / restart) est annoncé par
+expect_stop() avant l'arrêt : la sortie qui suit n'est pas un plantage.
+"""
+import logging
+import threading
+import time
+from collections import deque
+
+import psutil
+
+from processes import path_key
+
+log = logging.getLogger(__name__)
+
+BACKOFF_FIRST_DELAY = 1.0
+BACKOFF_MAX_DELAY = 60.0
+STABLE_UPTIME = 60.0           # au-delà, le plantage suivant repart du premier délai
+DEFAULT_MAX_RESTARTS = 5       # redémarrages autorisés par fenêtre...
+RESTART_WINDOW = 300.0         # ... de 5 minutes, sinon abandon (boucle de plantages)
+HISTORY_SIZE = 20
+EXIT_POLL_INTERVAL = 0.5       # sondage des processus élevés (wait() refusé par l'OS)
+
+
+def should_restart(mode, exit_code):
+    """
+    supervise = "always" : toute sortie est relancée ;
+    supervise = true : seulement un code de sortie non nul ou inconnu.
+    """
+    if not mode:
+        return False
+    if mode == "always":
+        return True
+    return exit_code != 0
+
+
+class _AppState:
+    __slots__ = ("app", "epoch", "thread", "thread_epoch", "state", "consecutive",
+                 "crashes", "history", "wake")
+
+    def __init__(self, app):
+        self.app = app
+        self.epoch = 0               # incrémenté à chaque arrêt utilisateur
+        self.thread = None
+        self.thread_epoch = -1
+        self.state = "idle"          # idle | watching | backoff | gave_up
+        self.consecutive = 0
+        self.crashes = deque()       # instants (monotonic) des plantages récents
+        self.history = deque(maxlen=HISTORY_SIZE)
+        self.wake = threading.Event()
+
+
+class Supervisor:
+    """
+    set_apps(apps)     : configuration (champs supervise / max_restarts par app)
+    adopt(apps)        : après un lancement utilisateur, surveille les apps lancées
+    expect_stop(apps)  : avant un arrêt utilisateur
+    on_event reçoit {type, name, path, exit_code, uptime_s, ...} avec
+    type = crashed | restarted | restart_failed | gave_up.
+    """
+
+    def __init__(self, registry, launcher, on_event=None, enabled=True):
+        self.registry = registry
+        self.launcher = launcher
+        self.on_event = on_event
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._states = {}   # path_key -> _AppState (apps supervisées uniquement)
+        self._stopped = False
+
+    def set_apps(self, apps):
+        """Nouvelle configuration ; les apps supervisées déjà lancées sont prises en charge"""
+        supervised = {}
+        for app in apps:
+            if app.get("supervise") and app.get("path"):
+                supervised[path_key(app["path"])] = app
+        with self._lock:
+            for key in list(self._states):
+                if key not in supervised:
+                    # Plus supervisée : le thread en cours s'arrêtera à la prochaine sortie
+                    state = self._states.pop(key)
+                    state.epoch += 1
+                    state.wake.set()
+            for key, app in supervised.items():
+                state = self._states.get(key)
+                if state is None:
+                    self._states[key] = _AppState(app)
+                else:
+                    state.app = app
+        self._watch_running(supervised.values())
+
+    def adopt(self, apps):
+        """Apps (re)lancées par l'utilisateur : compteurs remis à zéro et surveillance"""
+        with self._lock:
+            for app in apps:
+                state = self._states.get(path_key(app.get("path", "")))
+                if state is not None:
+                    state.consecutive = 0
+                    state.crashes.clear()
+                    if state.state == "gave_up":
+                        state.state = "idle"
+                    state.wake.set()
+        self._watch_running(apps)
+
+    def expect_stop(self, apps):
+        """Les prochaines sorties de ces apps sont voulues : pas de relance"""
+        with self._lock:
+            for app in apps:
+                state = self._states.get(path_key(app.get("path", "")))
+                if state is not None:
+                    state.epoch += 1
+                    state.wake.set()
+
+    def stop(self):
+        with self._lock:
+            self._stopped = True
+            for state in self._states.values():
+                state.epoch += 1
+                state.wake.set()
+
+    def state(self):
+        """{chemin: {name, supervise, state, crashes, history}}"""
+        with self._lock:
+            return {
+                state.app.get("path", ""): {
+                    "name": state.app.get("name", ""),
+                    "supervise": state.app.get("supervise"),
+                    "state": state.state,
+                    "crashes": len(state.crashes),
+                    "history": list(state.history),
+                }
+                for state in self._states.values()
+            }
+
+    def _watch_running(self, apps):
+        """Démarre un thread d'attente pour chaque app supervisée en cours sans thread à jour"""
+        if not self.enabled:
+            return
+        with self._lock:
+            if self._stopped:
+                return
+            todo = []
+            for app in apps:
+                key = path_key(app.get("path", ""))
+                state = self._states.get(key)
+                if state is None:
+                    continue
+                current = state.thread is not None and state.thread.is_alive() \
+                    and state.thread_epoch == state.epoch
+                if not current:
+                    todo.append((key, state.app["path"]))
+        if not todo:
+            return
+
+        # Registre d'abord, au plus un scan pour les apps lancées hors du launcher
+        found = self.registry.find_all([path for _, path in todo])
+        with self._lock:
+            for key, path in todo:
+                state = self._states.get(key)
+                procs = found.get(path)
+                if state is None or not procs:
+                    continue
+                if state.thread is not None and state.thread.is_alive() \
+                        and state.thread_epoch == state.epoch:
+                    continue
+                state.thread_epoch = state.epoch
+                state.state = "watching"
+                state.thread = threading.Thread(
+                    target=self._run, args=(state, state.epoch, procs),
+                    name="Supervisor", daemon=True,
+                )
+                state.thread.start()
+
+    @staticmethod
+    def _wait(procs):
+        """Attend la sortie de tous les processus de l'app. Retourne (code de sortie, uptime s)."""
+        try:
+            started = min(tracked.create_time for tracked in procs)
+        except (psutil.NoSuchProcess, psutil.AccessDenied, ValueError):
+            started = time.time()
+        code = None
+        for tracked in procs:
+            # Popen.wait / Process.wait : attente bloquante de l'OS, réveil dès la sortie
+            try:
+                if tracked.popen is not None:
+                    code = tracked.popen.wait()
+                else:
+                    code = tracked.proc.wait()
+            except psutil.NoSuchProcess:
+                code = None
+            except psutil.AccessDenied:
+                # App élevée (spawn_elevated) : pas de handle Popen, attente refusée
+                while tracked.is_alive():
+                    time.sleep(EXIT_POLL_INTERVAL)
+                code = None
+        return code, round(time.time() - started, 1)
+
+    def _run(self, state, epoch, procs):
+        try:
+            self._supervise(state, epoch, procs)
+        except Exception as e:
+            log.exception(f"Erreur superviseur: {e}")
+            with self._lock:
+                if state.epoch == epoch:
+                    state.state = "idle"
+
+    def _supervise(self, state, epoch, procs):
+        error = None
+        while True:
+            if procs:
+                exit_code, uptime = self._wait(procs)
+            else:
+                exit_code, uptime = None, 0.0  # relance échouée
+
+            with self._lock:
+                app = state.app
+                entry = {"time": round(time.time(), 1), "exit_code": exit_code, "uptime_s": uptime}
+                if state.epoch != epoch:
+                    # Arrêt utilisateur (ou app retirée de la supervision)
+                    entry["action"] = "stopped"
+                    state.history.append(entry)
+                    self._set_idle(state, epoch)
+                    return
+                if not should_restart(app.get("supervise"), exit_code):
+                    entry["action"] = "exited"
+                    state.history.append(entry)
+                    state.state = "idle"
+                    return
+
+                now = time.monotonic()
+                if uptime >= STABLE_UPTIME:
+                    state.consecutive = 0
+                state.consecutive += 1
+                state.crashes.append(now)
+                while state.crashes and now - state.crashes[0] > RESTART_WINDOW:
+                    state.crashes.popleft()
+                max_restarts = int(app.get("max_restarts", DEFAULT_MAX_RESTARTS))
+                if len(state.crashes) > max_restarts:
+                    entry["action"] = "gave_up"
+                    state.history.append(entry)
+                    state.state = "gave_up"
+                    delay = None
+                else:
+                    delay = min(BACKOFF_FIRST_DELAY * 2 ** (state.consecutive - 1), BACKOFF_MAX_DELAY)
+                    entry["action"] = "restart"
+                    entry["delay_s"] = delay
+                    state.history.append(entry)
+                    state.state = "backoff"
+                state.wake.clear()
+
+            event = {"name": app.get("name", ""), "path": app["path"], "exit_code": exit_code,
+                     "uptime_s": uptime, "crashes": len(state.crashes), "error": error}
+            if delay is None:
+                log.warning(f"[supervisor] {event['name']}: {max_restarts} redémarrages en "
+                            f"{RESTART_WINDOW:.0f} s, abandon")
+                self._emit("gave_up", event)
+                return
+            log.warning(f"[supervisor] {event['name']}: sortie inattendue (code {exit_code}, "
+                        f"après {uptime} s), relance dans {delay:g} s")
+            self._emit("crashed", dict(event, delay_s=delay))
+
+            # Attente interruptible : un stop utilisateur ou un lancement manuel réveille le thread
+            state.wake.wait(delay)
+            with self._lock:
+                if state.epoch != epoch:
+                    self._set_idle(state, epoch)
+                    return
+
+            procs, error = self._relaunch(app)
+            with self._lock:
+                if state.epoch != epoch:
+                    self._set_idle(state, epoch)
+                    return
+                state.state = "watching" if procs else "backoff"
+            event = {"name": app.get("name", ""), "path": app["path"], "error": error}
+            self._emit("restarted" if procs else "restart_failed", event)
+
+    def _set_idle(self, state, epoch):
+        """
+        Fin d'un thread après un arrêt voulu (sous self._lock) : repasse l'app en idle,
+        sauf si elle n'est plus supervisée ou si un thread plus récent la surveille déjà.
+        """
+        if self._states.get(path_key(state.app.get("path", ""))) is state \
+                and state.thread_epoch == epoch:
+            state.state = "idle"
+
+    def _relaunch(self, app):
+        """Relance par le LaunchScheduler (sans délai ni dépendances). Retourne (procs, erreur)."""
+        procs = self.registry.find(app["path"])
+        if procs:
+            return procs, None  # relancée entre-temps (utilisateur ou lanceur externe)
+        report = self.launcher.launch([dict(app, start_delay=0, depends_on=[])])
+        timing = report["timings"][0]
+        procs = self.registry.find(app["path"]) if timing["ok"] else []
+        return procs, timing["error"] or (None if procs else "Processus introuvable après relance")
+
+    def _emit(self, kind, event):
+        if self.on_event:
+            try:
+                self.on_event(dict(event, type=kind))
+            except Exception as e:
+                log.exception(f"Erreur événement superviseur: {e}")
@@ -0,0 +1,226 @@
+"""
+iRacing Launcher - Télémétrie des apps
+Un thread échantillonne CPU %, mémoire (RSS), threads et handles (FD hors
+Windows) des apps suivies. L'historique est gardé dans des buffers circulaires
+de taille fixe (array.array préalloués : pas d'objet par échantillon) et
+renvoyé sous-échantillonné pour les sparklines de l'UI.
+"""
+import logging
+import os
+import threading
+import time
+from array import array
+
+import psutil
+
+from metrics import registry as metrics
+from processes import path_key
+
+log = logging.getLogger(__name__)
+
+_tick_seconds = metrics.histogram("launcher_telemetry_tick_seconds",
+                                  "Durée d'un échantillonnage CPU / mémoire de toutes les apps")
+
+DEFAULT_TELEMETRY_INTERVAL = 1.0
+DEFAULT_TELEMETRY_HISTORY = 600      # échantillons gardés par app (10 min à 1 s)
+DEFAULT_DISCOVERY_INTERVAL = 5.0     # recherche des apps non suivies (scan complet) au plus toutes les 5 s
+FIELDS = ("cpu", "rss", "threads", "handles")
+
+
+class SampleRing:
+    """
+    Buffer circulaire d'échantillons : un array par champ + un array des
+    instants, écrits au même index.
+    """
+    __slots__ = ("capacity", "times", "columns", "_next", "_count")
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.times = array("d", bytes(8 * capacity))
+        self.columns = {field: array("d", bytes(8 * capacity)) for field in FIELDS}
+        self._next = 0
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def append(self, t, cpu, rss, threads, handles):
+        i = self._next
+        self.times[i] = t
+        columns = self.columns
+        columns["cpu"][i] = cpu
+        columns["rss"][i] = rss
+        columns["threads"][i] = threads
+        columns["handles"][i] = handles
+        self._next = (i + 1) % self.capacity
+        if self._count < self.capacity:
+            self._count += 1
+
+    def _ordered(self, data):
+        """Valeurs du plus ancien au plus récent"""
+        if self._count < self.capacity:
+            return data[:self._count]
+        return data[self._next:] + data[:self._next]
+
+    def last(self):
+        if not self._count:
+            return None
+        i = (self._next - 1) % self.capacity
+        sample = {field: self.columns[field][i] for field in FIELDS}
+        sample["t"] = self.times[i]
+        return sample
+
+    def series(self, points, since=None):
+        """
+        {t, cpu, rss, threads, handles} réduits à `points` valeurs au plus
+        (maximum de chaque tranche : les pics restent visibles).
+        """
+        times = self._ordered(self.times)
+        start = 0
+        if since is not None:
+            while start < len(times) and times[start] < since:
+                start += 1
+        times = times[start:]
+        columns = {field: self._ordered(self.columns[field])[start:] for field in FIELDS}
+
+        n = len(times)
+        if n <= points:
+            result = {field: list(values) for field, values in columns.items()}
+            result["t"] = list(times)
+            return result
+
+        step = n / points
+        bounds = [(int(k * step), int((k + 1) * step)) for k in range(points)]
+        result = {field: [max(values[a:b]) for a, b in bounds] for field, values in columns.items()}
+        result["t"] = [times[b - 1] for _, b in bounds]
+        return result
+
+
+class TelemetrySampler(threading.Thread):
+    """
+    Échantillonne les processus des apps toutes les `interval` secondes.
+    S'appuie sur le registre (PIDs connus, objets psutil.Process réutilisés pour
+    cpu_percent) ; un scan complet n'a lieu que pour retrouver les apps non
+    suivies, au plus toutes les `discovery_interval` secondes.
+    """
+
+    def __init__(self, registry, interval=DEFAULT_TELEMETRY_INTERVAL,
+                 history=DEFAULT_TELEMETRY_HISTORY, discovery_interval=DEFAULT_DISCOVERY_INTERVAL):
+        super().__init__(name="TelemetrySampler", daemon=True)
+        self.registry = registry
+        self.interval = interval
+        self.history = history
+        self.discovery_interval = discovery_interval
+        self.last_tick_ms = 0.0   # coût du dernier tour (pour vérifier le budget CPU)
+
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._apps = {}      # id de l'app -> (nom, chemin)
+        self._rings = {}     # id de l'app -> SampleRing
+        self._last_discovery = 0.0
+        self._cpu_count = psutil.cpu_count() or 1
+
+    def set_apps(self, apps):
+        """Apps à suivre ; l'historique des apps retirées est oublié"""
+        entries = {}
+        for app in apps:
+            path = app.get("path", "")
+            if path:
+                entries[app.get("id") or path_key(path)] = (app.get("name", ""), path)
+        with self._lock:
+            self._apps = entries
+            self._rings = {key: ring for key, ring in self._rings.items() if key in entries}
+
+    def stop(self):
+        self._stopped.set()
+
+    def run(self):
+        next_tick = time.monotonic()
+        while not self._stopped.is_set():
+            started = time.perf_counter()
+            try:
+                self._tick()
+            except Exception as e:
+                log.exception(f"Erreur télémétrie: {e}")
+            elapsed = time.perf_counter() - started
+            _tick_seconds.observe(elapsed)
+            self.last_tick_ms = round(elapsed * 1000, 2)
+            # Cadence fixe, sans dérive
+            next_tick += self.interval
+            self._stopped.wait(max(0.0, next_tick - time.monotonic()))
+
+    def _tick(self):
+        with self._lock:
+            apps = dict(self._apps)
+
+        now = time.monotonic()
+        discover = now - self._last_discovery >= self.discovery_interval
+        if discover:
+            self._last_discovery = now
+            valid = [path for _, path in apps.values() if os.path.exists(path)]
+            found = self.registry.find_all(valid)
+        else:
+            found = {path: self.registry.lookup(path) for _, path in apps.values()}
+
+        t = time.time()
+        for key, (_, path) in apps.items():
+            procs = found.get(path)
+            if not procs:
+                continue
+            cpu = rss = threads = handles = 0.0
+            alive = False
+            for tracked in procs:
+                sample = self._sample(tracked.proc)
+                if sample is None:
+                    continue
+                alive = True
+                cpu += sample[0]
+                rss += sample[1]
+                threads += sample[2]
+                handles += sample[3]
+            if not alive:
+                continue
+            with self._lock:
+                ring = self._rings.get(key)
+                if ring is None:
+                    if key not in self._apps:
+                        continue  # app retirée entre-temps
+                    ring = self._rings[key] = SampleRing(self.history)
+                ring.append(t, cpu / self._cpu_count, rss, threads, handles)
+
+    @staticmethod
+    def _sample(proc):
+        """(cpu %, rss, threads, handles) d'un processus, None s'il a disparu"""
+        try:
+            with proc.oneshot():
+                cpu = proc.cpu_percent(None)
+                rss = proc.memory_info().rss
+                threads = proc.num_threads()
+                if hasattr(proc, "num_handles"):
+                    handles = proc.num_handles()
+                else:
+                    handles = proc.num_fds()
+            return cpu, rss, threads, handles
+        except psutil.AccessDenied:
+            return 0.0, 0.0, 0.0, 0.0  # processus protégé : vivant, mais pas de métriques
+        except psutil.NoSuchProcess:
+            return None
+
+    def snapshot(self, points=60, seconds=None):
+        """
+        {id: {name, last, t, cpu, rss, threads, handles}} sous-échantillonné.
+        `seconds` limite l'historique renvoyé aux dernières secondes.
+        """
+        since = time.time() - seconds if seconds else None
+        result = {}
+        with self._lock:
+            for key, ring in self._rings.items():
+                if key not in self._apps or not len(ring):
+                    continue
+                name, _ = self._apps[key]
+                series = ring.series(points, since)
+                series["name"] = name
+                series["last"] = ring.last()
+                result[key] = series
+        return result
+
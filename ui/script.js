@@ -1,5 +1,9 @@
 let apps = [];
-let statusCheckInterval = null;
+// Cache des icônes côté UI : icon_ref -> data URL (hors config)
+const iconUrls = {};
+// Dernier état reçu de get_state (version) et statuts connus : id de l'app -> running
+let stateVersion = null;
+const statuses = {};
 
 function el(tag, className) {
   const e = document.createElement(tag);
@@ -8,10 +12,6 @@ function el(tag, className) {
 }
 function $(id) { return document.getElementById(id); }
 
-async function saveApps() {
-  await window.pywebview.api.save_apps(apps);
-}
-
 async function autoResizeWindow() {
   try {
     const frame = document.querySelector(".frame");
@@ -25,22 +25,79 @@ async function autoResizeWindow() {
   }
 }
 
-async function updateProcessStatuses() {
+function setStatusIndicator(id, isRunning) {
+  statuses[id] = isRunning;
+  const statusIndicator = document.querySelector(`[data-app-id="${id}"] .status-indicator`);
+  if (statusIndicator) {
+    statusIndicator.classList.toggle('running', isRunning);
+    statusIndicator.classList.toggle('stopped', !isRunning);
+  }
+}
+
+// Statuts des apps désignées par leur id (pas d'envoi des objets app au bridge)
+async function updateProcessStatuses(ids) {
   try {
-    const statuses = await window.pywebview.api.get_all_process_statuses(apps);
-    
-    statuses.forEach((isRunning, idx) => {
-      const statusIndicator = document.querySelector(`[data-app-index="${idx}"] .status-indicator`);
-      if (statusIndicator) {
-        statusIndicator.classList.toggle('running', isRunning);
-        statusIndicator.classList.toggle('stopped', !isRunning);
-      }
-    });
+    const result = await window.pywebview.api.get_statuses(ids);
+    Object.entries(result).forEach(([id, isRunning]) => setStatusIndicator(id, isRunning));
   } catch (e) {
     console.error("Erreur updateProcessStatuses:", e);
   }
 }
 
+// Un seul aller-retour pour tout l'état : seules les sections modifiées depuis stateVersion reviennent
+async function syncState() {
+  try {
+    const state = await window.pywebview.api.get_state(stateVersion);
+    stateVersion = state.version;
+    Object.assign(iconUrls, state.icons);
+    if (state.meta) showVersion(state.meta.version);
+    if (state.profiles) renderProfiles(state.profiles);
+    if (state.apps) {
+      apps = state.apps;
+      apps.forEach(a => {
+        if (typeof a.checked === "undefined") a.checked = true;
+        if (typeof a.admin_required === "undefined") a.admin_required = false;
+      });
+      // Nouvelle liste : les statuts reçus remplacent les précédents
+      Object.keys(statuses).forEach(id => delete statuses[id]);
+      Object.assign(statuses, state.statuses);
+      render();
+    } else {
+      Object.entries(state.statuses).forEach(([id, isRunning]) => setStatusIndicator(id, isRunning));
+    }
+  } catch (e) {
+    console.error("Erreur synchronisation:", e);
+  }
+}
+
+// Redémarrages en cours : id de l'app -> resolve de la promesse
+const pendingRestarts = new Map();
+
+function waitRestart(id) {
+  return new Promise(resolve => pendingRestarts.set(id, resolve));
+}
+
+// Appelé par Python (window.evaluate_js) à la fin d'un restart_app
+function onRestartFinished(id, report) {
+  const resolve = pendingRestarts.get(id);
+  pendingRestarts.delete(id);
+  if (resolve) resolve(report);
+}
+
+// Appelé par le watcher Python (window.evaluate_js) avec uniquement les changements
+function onProcessStatusChanged(changes) {
+  Object.entries(changes).forEach(([id, isRunning]) => setStatusIndicator(id, isRunning));
+}
+
+// Appelé par le superviseur Python : plantage, relance ou abandon d'une app "supervise"
+function onSupervisorEvent(event) {
+  const detail = `${event.name} (code ${event.exit_code ?? "?"}, ${event.uptime_s ?? 0} s)`;
+  if (event.type === "crashed") console.warn(`Plantage de ${detail}, relance dans ${event.delay_s} s`);
+  else if (event.type === "gave_up") console.error(`${detail} : trop de plantages, relance abandonnée`);
+  else if (event.type === "restart_failed") console.error(`Relance de ${event.name} impossible : ${event.error}`);
+  else console.log(`${event.name} relancée par le superviseur`);
+}
+
 function render() {
   const list = $("appsList");
   if (!list) return;
@@ -48,14 +105,14 @@ function render() {
 
   apps.forEach((a, idx) => {
     const row = el("div", "app-row");
-    row.setAttribute('data-app-index', idx);
+    row.setAttribute('data-app-id', a.id);
 
     const check = el("div", "case-coche");
     if (a.checked) check.classList.add("checked");
     check.onclick = async () => {
       a.checked = !a.checked;
       check.classList.toggle("checked", a.checked);
-      await saveApps();
+      await window.pywebview.api.update_app(a.id, { checked: a.checked });
     };
 
     const statusIndicator = el("div", "status-indicator");
@@ -63,7 +120,10 @@ function render() {
     statusIndicator.title = "Status du processus";
 
     const icon = el("div", "icone");
-    if (a.icon) icon.style.backgroundImage = `url(${a.icon})`;
+    if (a.icon_ref) {
+      icon.setAttribute("data-icon-ref", a.icon_ref);
+      if (iconUrls[a.icon_ref]) icon.style.backgroundImage = `url(${iconUrls[a.icon_ref]})`;
+    }
 
     const name = el("div", "name-apps");
     name.textContent = a.name || "App";
@@ -71,14 +131,16 @@ function render() {
     const path = el("div", "file-path");
     path.textContent = a.path || "";
 
+    const telemetry = el("div", "telemetry");
+    telemetry.title = "CPU (aucune donnée)";
+
     const browse = el("div", "search-apps");
     browse.onclick = async () => {
       const p = await window.pywebview.api.browse_exe();
       if (p) {
-        a.path = p;
-        a.icon = await window.pywebview.api.get_icon(p);
-        await saveApps();
-        render();
+        const icon_ref = (await window.pywebview.api.cache_icons([p]))[p];
+        await window.pywebview.api.update_app(a.id, { path: p, icon_ref: icon_ref });
+        await syncState();
       }
     };
 
@@ -91,19 +153,24 @@ function render() {
       restart.style.pointerEvents = "none";
       
       try {
-        const result = await window.pywebview.api.restart_app(a);
+        // Attente enregistrée AVANT l'appel : le rapport peut arriver avant la réponse du bridge
+        const finished = waitRestart(a.id);
+        let result = await window.pywebview.api.restart_app(a.id);
+        // Le redémarrage tourne côté Python : on attend son rapport
+        if (result.ok && result.pending) result = await finished;
+        else pendingRestarts.delete(a.id);
         
         if (result.ok) {
+          console.log(`Redémarrage ${a.name}: arrêt ${result.stop_ms} ms, relance ${result.relaunch_ms} ms, prêt ${result.ready_ms} ms`);
           restart.style.backgroundColor = "#6fb15e";
           setTimeout(() => {
             restart.style.backgroundColor = "";
           }, 1000);
-          
-          setTimeout(updateProcessStatuses, 500);
         } else {
           alert(`Erreur lors du redémarrage:\n${result.error || 'Erreur inconnue'}`);
         }
       } catch (e) {
+        pendingRestarts.delete(a.id);
         alert(`Erreur: ${e}`);
       } finally {
         restart.style.opacity = "1";
@@ -113,77 +180,162 @@ function render() {
 
     const moveUp = el("div", "move-up");
     moveUp.onclick = async () => {
-      if (idx > 0) {
-        await window.pywebview.api.move_app_up(idx);
-        await loadApps();
-      }
+      if (idx > 0) await moveApp(idx, idx - 1);
     };
     if (idx === 0) moveUp.style.opacity = "0.3";
 
     const moveDown = el("div", "move-down");
     moveDown.onclick = async () => {
-      if (idx < apps.length - 1) {
-        await window.pywebview.api.move_app_down(idx);
-        await loadApps();
-      }
+      if (idx < apps.length - 1) await moveApp(idx, idx + 1);
     };
     if (idx === apps.length - 1) moveDown.style.opacity = "0.3";
 
     const del = el("div", "delete-apps");
     del.onclick = async () => {
       if (confirm(`Supprimer ${a.name || "cette app"} ?`)) {
-        apps.splice(idx, 1);
-        await saveApps();
-        render();
-        autoResizeWindow();
+        await window.pywebview.api.remove_app(a.id);
+        await syncState();
       }
     };
 
-    row.append(check, statusIndicator, icon, name, path, browse, restart, moveUp, moveDown, del);
+    row.append(check, statusIndicator, icon, name, path, telemetry, browse, restart, moveUp, moveDown, del);
     list.appendChild(row);
   });
 
   autoResizeWindow();
-  setTimeout(updateProcessStatuses, 100);
+  // Statuts déjà connus ; les autres sont demandés par id
+  const unknown = apps.map(a => a.id).filter(id => !(id in statuses));
+  apps.forEach(a => { if (a.id in statuses) setStatusIndicator(a.id, statuses[a.id]); });
+  if (unknown.length) updateProcessStatuses(unknown);
 }
 
-async function loadApps() {
-  apps = await window.pywebview.api.get_apps();
-  apps.forEach(a => {
-    if (typeof a.checked === "undefined") a.checked = true;
-    if (typeof a.admin_required === "undefined") a.admin_required = false;
-  });
-  render();
+// Réordonnancement : la liste complète des ids en un seul appel
+async function moveApp(from, to) {
+  const ids = apps.map(a => a.id);
+  ids.splice(to, 0, ids.splice(from, 1)[0]);
+  await window.pywebview.api.reorder(ids);
+  await syncState();
+}
+
+// ===== TÉLÉMÉTRIE (sparklines CPU par app) =====
+const SVG_NS = "http://www.w3.org/2000/svg";
+
+function renderSparkline(container, series) {
+  container.innerHTML = "";
+  if (!series || !series.cpu.length) {
+    container.title = "CPU (aucune donnée)";
+    return;
+  }
+  const values = series.cpu;
+  const max = Math.max(5, ...values);  // échelle min. 5 % pour ne pas amplifier le bruit
+  const svg = document.createElementNS(SVG_NS, "svg");
+  svg.setAttribute("viewBox", "0 0 100 28");
+  svg.setAttribute("preserveAspectRatio", "none");
+  const line = document.createElementNS(SVG_NS, "polyline");
+  const step = values.length > 1 ? 100 / (values.length - 1) : 0;
+  line.setAttribute("points",
+    values.map((v, i) => `${(i * step).toFixed(1)},${(27 - v / max * 25).toFixed(1)}`).join(" "));
+  svg.appendChild(line);
+  container.appendChild(svg);
+
+  const last = series.last;
+  container.title =
+    `CPU ${last.cpu.toFixed(1)} % (max ${Math.max(...values).toFixed(1)} %)\n` +
+    `RAM ${(last.rss / 1048576).toFixed(0)} Mo\n` +
+    `${last.threads} threads · ${last.handles} handles`;
 }
 
-async function loadVersion() {
+async function refreshTelemetry() {
+  if (document.hidden) return;
   try {
-    const version = await window.pywebview.api.get_version();
-    const versionDisplay = $("versionDisplay");
-    if (versionDisplay) {
-      versionDisplay.textContent = `Version ${version}`;
-    }
+    const telemetry = await window.pywebview.api.get_telemetry(40, 120);
+    document.querySelectorAll("[data-app-id]").forEach(row => {
+      const id = row.getAttribute("data-app-id");
+      const container = row.querySelector(".telemetry");
+      if (container) renderSparkline(container, telemetry.apps[id]);
+    });
   } catch (e) {
-    console.error("Erreur chargement version:", e);
+    console.error("Erreur télémétrie:", e);
+  }
+}
+
+// ===== PROFILS =====
+function renderProfiles(profiles) {
+  const select = $("profileSelect");
+  if (!select) return;
+  const selected = select.value;
+  const names = Object.keys(profiles);
+  select.innerHTML = "";
+  if (!names.length) {
+    const empty = el("option");
+    empty.textContent = "Aucun profil";
+    empty.value = "";
+    select.appendChild(empty);
   }
+  names.forEach(name => {
+    const option = el("option");
+    option.value = name;
+    option.textContent = `${name} (${profiles[name].length})`;
+    select.appendChild(option);
+  });
+  if (selected && names.includes(selected)) select.value = selected;
+  ["btnProfileApply", "btnProfileStart", "btnProfileDelete"].forEach(id => {
+    if ($(id)) $(id).disabled = !names.length;
+  });
 }
 
-function startStatusMonitoring() {
-  if (statusCheckInterval) {
-    clearInterval(statusCheckInterval);
+function showVersion(version) {
+  const versionDisplay = $("versionDisplay");
+  if (versionDisplay) {
+    versionDisplay.textContent = `Version ${version}`;
   }
-  
-  statusCheckInterval = setInterval(updateProcessStatuses, 2000);
 }
 
-function stopStatusMonitoring() {
-  if (statusCheckInterval) {
-    clearInterval(statusCheckInterval);
-    statusCheckInterval = null;
+// ===== MISE À JOUR (bandeau non bloquant, piloté par Python) =====
+function showUpdateBanner(info, currentVersion) {
+  const banner = $("updateBanner");
+  if (!banner) return;
+  $("updateText").textContent =
+    `📢 Mise à jour disponible : version ${info.version} (actuelle : ${currentVersion})`;
+  banner.title = info.changelog || "Améliorations et corrections de bugs";
+  $("updateActions").hidden = false;
+  $("updateProgress").hidden = true;
+  banner.hidden = false;
+}
+
+function onUpdateProgress(downloaded, total) {
+  const percent = total > 0 ? Math.floor(downloaded * 100 / total) : 0;
+  $("updateProgress").hidden = false;
+  $("updateProgressBar").style.width = `${percent}%`;
+  $("updateText").textContent =
+    `Téléchargement de la mise à jour... ${percent}% (${Math.floor(downloaded / 1024)} KB / ${Math.floor(total / 1024)} KB)`;
+}
+
+function onUpdateError(message) {
+  $("updateText").textContent = `⚠️ ${message}`;
+  $("updateProgress").hidden = true;
+  $("updateActions").hidden = false;
+}
+
+async function onUpdateChoice(choice) {
+  if (choice === "later") {
+    $("updateBanner").hidden = true;
+  } else if (choice === "github") {
+    $("updateText").textContent = "La page GitHub Release s'est ouverte dans votre navigateur. Téléchargez le fichier .exe et remplacez l'ancien launcher.";
+    $("updateActions").hidden = true;
+  } else if (choice === "auto") {
+    $("updateText").textContent = "Téléchargement de la mise à jour...";
+    $("updateActions").hidden = true;
   }
+  await window.pywebview.api.update_action(choice);
 }
 
 document.addEventListener("DOMContentLoaded", () => {
+  document.querySelectorAll("#updateActions .update-btn").forEach(btn => {
+    btn.onclick = () => onUpdateChoice(btn.getAttribute("data-choice"));
+  });
+
+
   const btnAdd = $("btnAdd");
   const btnStart = $("btnStart");
   const btnStop = $("btnStop");
@@ -202,54 +354,79 @@ document.addEventListener("DOMContentLoaded", () => {
         "Lancer cette application en administrateur ?"
       );
 
-      const icon = await window.pywebview.api.get_icon(p);
+      const icon_ref = (await window.pywebview.api.cache_icons([p]))[p];
 
-      apps.push({
+      await window.pywebview.api.add_app({
         name: name,
         path: p,
-        icon: icon,
+        icon_ref: icon_ref,
         admin_required: admin_required,
         checked: true
       });
-
-      await saveApps();
-      await loadApps();
+      await syncState();
     };
   }
 
+  const profileSelect = $("profileSelect");
+
+  $("btnProfileApply")?.addEventListener("click", async () => {
+    if (await window.pywebview.api.apply_profile(profileSelect.value)) await syncState();
+  });
+
+  $("btnProfileStart")?.addEventListener("click", async () => {
+    const res = await window.pywebview.api.start_selected(null, profileSelect.value);
+    if (res.timings?.length) console.table(res.timings);
+    if (res.errors?.length) alert("Erreurs :\n" + res.errors.join("\n"));
+  });
+
+  $("btnProfileSave")?.addEventListener("click", async () => {
+    const name = prompt("Nom du profil (apps cochées) :", profileSelect.value || "");
+    if (!name) return;
+    await window.pywebview.api.save_profile(name);
+    await syncState();
+    profileSelect.value = name.trim();
+  });
+
+  $("btnProfileDelete")?.addEventListener("click", async () => {
+    const name = profileSelect.value;
+    if (!name || !confirm(`Supprimer le profil ${name} ?`)) return;
+    await window.pywebview.api.delete_profile(name);
+    await syncState();
+  });
+
   if (btnStart) {
     btnStart.onclick = async () => {
-      const res = await window.pywebview.api.start_selected(apps);
+      const res = await window.pywebview.api.start_selected();
+      if (res.timings?.length) console.table(res.timings);
       if (res.errors?.length) alert("Erreurs :\n" + res.errors.join("\n"));
-      
-      setTimeout(updateProcessStatuses, 1000);
     };
   }
 
   if (btnStop) {
     btnStop.onclick = async () => {
-      const res = await window.pywebview.api.stop_selected(apps);
+      const res = await window.pywebview.api.stop_selected();
       if (res.errors?.length) {
         alert(`${res.killed} processus fermés\n\nErreurs :\n` + res.errors.join("\n"));
       } else {
         alert(`${res.killed} processus fermés`);
       }
-      
-      setTimeout(updateProcessStatuses, 500);
     };
   }
 });
 
 window.addEventListener("pywebviewready", async () => {
-  await loadApps();
-  await loadVersion();
+  // Apps, statuts, icônes, profils et version en un seul appel
+  await syncState();
+  // Premier rendu affiché : mesure du time-to-first-paint côté Python
+  requestAnimationFrame(() => window.pywebview.api.report_first_paint());
   setTimeout(autoResizeWindow, 100);
-  
-  startStatusMonitoring();
+  // Historique échantillonné côté Python : l'UI ne fait que relire les séries
+  setInterval(refreshTelemetry, 2000);
 });
 
-window.addEventListener("resize", () => setTimeout(autoResizeWindow, 100));
-
-window.addEventListener("beforeunload", () => {
-  stopStatusMonitoring();
+// Fenêtre réaffichée depuis le tray : rattrape les changements faits entre-temps (CLI, tray)
+document.addEventListener("visibilitychange", () => {
+  if (!document.hidden && stateVersion !== null) syncState();
 });
+
+window.addEventListener("resize", () => setTimeout(autoResizeWindow, 100));
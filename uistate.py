@@ -0,0 +1,50 @@
+"""
+iRacing Launcher - État de l'UI versionné
+Chaque entrée (apps, profils, statut d'une app, icône...) garde le numéro de
+version auquel elle a changé pour la dernière fois : l'UI envoie la version
+qu'elle possède et ne reçoit que les entrées modifiées depuis (un seul aller-retour
+par le bridge au lieu d'un appel par information).
+"""
+import threading
+
+
+class VersionedState:
+    """Clé -> (version du dernier changement, valeur) ; version globale croissante"""
+
+    def __init__(self):
+        self.version = 0
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def set(self, key, value):
+        """Met à jour une entrée ; la version n'avance que si la valeur a changé"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] == value:
+                return False
+            self.version += 1
+            self._entries[key] = (self.version, value)
+            return True
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+        return default if entry is None else entry[1]
+
+    def retain(self, keep):
+        """Oublie les entrées dont la clé ne satisfait pas keep(key) (apps supprimées...)"""
+        with self._lock:
+            for key in [k for k in self._entries if not keep(k)]:
+                del self._entries[key]
+                self.version += 1
+
+    def since(self, version=None):
+        """
+        (version actuelle, {clé: valeur} modifiées après `version`, complet).
+        Version absente, inconnue ou d'une autre session : état complet.
+        """
+        with self._lock:
+            full = version is None or not isinstance(version, int) or version > self.version
+            changed = {key: value for key, (v, value) in self._entries.items()
+                       if full or v > version}
+            return self.version, changed, full
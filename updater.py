@@ -1,148 +1,275 @@
 """
 iRacing Launcher - Script de mise à jour automatique
-Ce script remplace l'ancien launcher par la nouvelle version
+Ce script remplace l'ancien launcher par la nouvelle version :
+le nouvel exe est placé à côté de l'ancien, puis tout se fait par renommages
+(ancien -> _backup, nouveau -> nom final). Si le launcher relancé ne signale
+pas qu'il est opérationnel (fichier de santé) à temps, l'ancienne version
+est remise en place.
 """
+import json
+import logging
 import os
+import secrets
 import sys
 import time
 import shutil
 import subprocess
 import psutil
 
-def wait_for_process_to_close(process_name, timeout=30):
-    """Attend que le processus se ferme (max timeout secondes)"""
-    print(f"Attente de la fermeture de {process_name}...")
-    start_time = time.time()
-    
-    # Extraire juste le nom du fichier sans extension
-    base_name = os.path.basename(process_name).replace('.exe', '').lower()
-    
-    while time.time() - start_time < timeout:
-        found = False
-        for proc in psutil.process_iter(['name']):
-            try:
-                if proc.info['name']:
-                    proc_name = proc.info['name'].replace('.exe', '').lower()
-                    # Vérifier si le nom du processus correspond
-                    if base_name in proc_name or proc_name in base_name:
-                        found = True
-                        break
-            except (psutil.NoSuchProcess, psutil.AccessDenied):
-                continue
-        
-        if not found:
-            print(f"{process_name} fermé !")
-            return True
-        
-        time.sleep(0.5)
-    
-    print(f"Timeout : {process_name} n'a pas fermé dans les {timeout} secondes")
+from logs import setup_logging, span, traced
+
+log = logging.getLogger("updater")
+UPDATER_LOG_FILE = "updater_log.jsonl"
+
+# Réessais des opérations fichier : l'exe peut rester verrouillé quelques
+# instants après la fin du processus (antivirus, indexeur, handle en cours de fermeture)
+RETRY_TIMEOUT = 15
+RETRY_FIRST_DELAY = 0.05
+RETRY_MAX_DELAY = 1.0
+
+# Le launcher relancé écrit ce fichier (--health-file) une fois son interface affichée
+HEALTH_FILE_NAME = "update_health.json"
+HEALTH_TIMEOUT = 60
+HEALTH_POLL_INTERVAL = 0.2
+
+def report(message, level=logging.INFO):
+    """Message de la console de l'updater, copié dans le journal (updater_log.jsonl)"""
+    print(message)
+    log.log(level, message.strip())
+
+def wait_for_pid(pid, timeout=30):
+    """Attend la fin du processus `pid` (attente bloquante sur le processus, pas de scan)"""
+    report(f"Attente de la fermeture du processus {pid}...")
+    try:
+        psutil.Process(pid).wait(timeout=timeout)
+    except psutil.NoSuchProcess:
+        pass
+    except psutil.TimeoutExpired:
+        report(f"Timeout : le processus {pid} n'a pas fermé dans les {timeout} secondes", logging.WARNING)
+        return False
+    report(f"Processus {pid} fermé !")
+    return True
+
+def wait_for_process_to_close(exe_path, timeout=30):
+    """
+    Sans PID (ancien launcher) : attend les processus dont le nom d'exe est
+    exactement celui de `exe_path`.
+    """
+    name = os.path.basename(exe_path).lower()
+    report(f"Attente de la fermeture de {name}...")
+    procs = []
+    for proc in psutil.process_iter(['name']):
+        if (proc.info['name'] or "").lower() == name and proc.pid != os.getpid():
+            procs.append(proc)
+
+    _, alive = psutil.wait_procs(procs, timeout=timeout)
+    if alive:
+        report(f"Timeout : {name} n'a pas fermé dans les {timeout} secondes", logging.WARNING)
+        return False
+    report(f"{name} fermé !")
+    return True
+
+def retry(action, description, timeout=RETRY_TIMEOUT):
+    """Exécute action() en réessayant avec un délai croissant tant que le fichier est verrouillé"""
+    deadline = time.monotonic() + timeout
+    delay = RETRY_FIRST_DELAY
+    while True:
+        try:
+            return action()
+        except OSError as e:
+            if time.monotonic() + delay > deadline:
+                raise
+            report(f"{description} : fichier verrouillé ({e}), nouvel essai dans {delay:.2f} s", logging.WARNING)
+            time.sleep(delay)
+            delay = min(delay * 2, RETRY_MAX_DELAY)
+
+def stage_new_file(new_file, old_file):
+    """
+    Place le nouvel exe à côté de la cible (même volume) pour que l'installation
+    soit un simple renommage. Déplacement si possible, sinon copie (autre disque).
+    """
+    staged = old_file + ".new"
+    if os.path.exists(staged):
+        retry(lambda: os.remove(staged), "Suppression d'un ancien fichier préparé")
+    try:
+        os.replace(new_file, staged)
+    except OSError:
+        shutil.copy2(new_file, staged)
+        try:
+            os.remove(new_file)
+        except OSError:
+            pass
+    return staged
+
+def wait_for_health(proc, health_file, token, timeout=HEALTH_TIMEOUT):
+    """
+    Attend que le launcher relancé écrive son fichier de santé avec le jeton `token`
+    (pas de comparaison de PID : un exe onefile tourne dans un processus enfant du bootloader).
+    Échec immédiat si le processus se termine avant.
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with open(health_file, "r", encoding="utf-8") as f:
+                if json.load(f).get("token") == token:
+                    return True
+        except (OSError, ValueError):
+            pass
+        try:
+            proc.wait(timeout=HEALTH_POLL_INTERVAL)
+            report(f"Le launcher s'est arrêté (code {proc.returncode}) avant d'être opérationnel", logging.ERROR)
+            return False
+        except subprocess.TimeoutExpired:
+            continue
+    report(f"Le launcher n'a pas signalé son démarrage dans les {timeout} secondes", logging.ERROR)
     return False
 
+@traced("updater.rollback")
+def rollback(old_file, backup_file, proc=None):
+    """Remet l'ancienne version en place et la relance"""
+    report("\n--- Restauration de l'ancienne version ---", logging.WARNING)
+    if proc is not None and proc.poll() is None:
+        proc.kill()
+        proc.wait()
+    failed_file = old_file.replace(".exe", "_failed.exe")
+    try:
+        if os.path.exists(old_file):
+            retry(lambda: os.replace(old_file, failed_file), "Mise à l'écart de la version défectueuse")
+        retry(lambda: os.replace(backup_file, old_file), "Restauration")
+        report(f"Ancienne version restaurée : {old_file}")
+    except Exception as e:
+        report(f"Impossible de restaurer le backup : {e}", logging.ERROR)
+        report(f"Ancienne version disponible ici : {backup_file}", logging.ERROR)
+        return False
+    try:
+        subprocess.Popen([old_file])
+        report(f"Launcher relancé : {old_file}")
+    except Exception as e:
+        report(f"Impossible de relancer le launcher : {e}", logging.ERROR)
+    return True
+
+def parse_args(argv):
+    """updater.exe <nouveau_fichier> <ancien_fichier> [--pid <pid du launcher>]"""
+    args = list(argv)
+    pid = None
+    if "--pid" in args:
+        i = args.index("--pid")
+        try:
+            pid = int(args[i + 1])
+        except (IndexError, ValueError):
+            pass
+        del args[i:i + 2]
+    return args, pid
+
 def main():
+    # Console visible pour l'utilisateur + journal JSON-lines à côté de celui du launcher
+    setup_logging(UPDATER_LOG_FILE, console=False)
     print("=" * 60)
     print("iRacing Launcher - Mise à jour automatique")
     print("=" * 60)
     
     # Récupérer les arguments
-    if len(sys.argv) < 3:
-        print("Erreur : Arguments manquants")
-        print("Usage: updater.exe <nouveau_fichier> <ancien_fichier>")
+    args, launcher_pid = parse_args(sys.argv[1:])
+    if len(args) < 2:
+        report("Erreur : Arguments manquants", logging.ERROR)
+        print("Usage: updater.exe <nouveau_fichier> <ancien_fichier> [--pid <pid>]")
         input("Appuyez sur Entrée pour quitter...")
         sys.exit(1)
     
-    new_file = sys.argv[1]  # Le fichier téléchargé
-    old_file = sys.argv[2]  # Le fichier à remplacer
+    new_file = args[0]  # Le fichier téléchargé
+    old_file = args[1]  # Le fichier à remplacer
     
-    print(f"\nNouveau fichier : {new_file}")
-    print(f"Ancien fichier : {old_file}")
+    report(f"\nNouveau fichier : {new_file}")
+    report(f"Ancien fichier : {old_file}")
     
     # Vérifier que les fichiers existent
     if not os.path.exists(new_file):
-        print(f"\nErreur : Le nouveau fichier n'existe pas : {new_file}")
+        report(f"\nErreur : Le nouveau fichier n'existe pas : {new_file}", logging.ERROR)
         input("Appuyez sur Entrée pour quitter...")
         sys.exit(1)
     
     if not os.path.exists(old_file):
-        print(f"\nAvertissement : L'ancien fichier n'existe pas : {old_file}")
+        report(f"\nAvertissement : L'ancien fichier n'existe pas : {old_file}", logging.WARNING)
         print("Installation directe du nouveau fichier...")
     
+    # Préparer le nouveau fichier à côté de l'ancien (pendant que le launcher se ferme)
+    report("\n--- Étape 1/4 : Préparation de la nouvelle version ---")
+    try:
+        with span("updater.stage"):
+            staged_file = stage_new_file(new_file, old_file)
+        report(f"Nouvelle version prête : {staged_file}")
+    except Exception as e:
+        report(f"\nErreur lors de la préparation : {e}", logging.ERROR)
+        input("Appuyez sur Entrée pour quitter...")
+        sys.exit(1)
+    
     # Attendre que le launcher se ferme
-    print("\n--- Étape 1/4 : Fermeture de l'ancien launcher ---")
-    if not wait_for_process_to_close("iRacing_Launcher.exe", timeout=30):
-        print("\nLe launcher ne s'est pas fermé automatiquement.")
+    report("\n--- Étape 2/4 : Fermeture de l'ancien launcher ---")
+    with span("updater.wait_exit", pid=launcher_pid) as s:
+        if launcher_pid is not None:
+            closed = wait_for_pid(launcher_pid, timeout=30)
+        else:
+            closed = wait_for_process_to_close(old_file, timeout=30)
+        s["closed"] = closed
+    if not closed:
+        report("\nLe launcher ne s'est pas fermé automatiquement.", logging.WARNING)
         print("Veuillez fermer manuellement le launcher et appuyer sur Entrée...")
         input()
     
-    # Petit délai de sécurité
-    print("\nAttente de 2 secondes...")
-    time.sleep(2)
-    
-    # Sauvegarder l'ancien fichier (backup)
-    print("\n--- Étape 2/4 : Sauvegarde de l'ancienne version ---")
-    if os.path.exists(old_file):
-        backup_file = old_file.replace(".exe", "_backup.exe")
-        try:
-            if os.path.exists(backup_file):
-                os.remove(backup_file)
-            shutil.copy2(old_file, backup_file)
-            print(f"Backup créé : {backup_file}")
-        except Exception as e:
-            print(f"Impossible de créer le backup : {e}")
-            print("Continue quand même...")
-    
-    # Remplacer l'ancien fichier par le nouveau
-    print("\n--- Étape 3/4 : Installation de la nouvelle version ---")
+    # Installation par renommages : l'ancien exe est mis de côté, pas copié
+    report("\n--- Étape 3/4 : Installation de la nouvelle version ---")
+    backup_file = old_file.replace(".exe", "_backup.exe")
+    has_backup = False
     try:
-        if os.path.exists(old_file):
-            os.remove(old_file)
-            print(f"Ancien fichier supprimé")
-        
-        shutil.copy2(new_file, old_file)
-        print(f"Nouveau fichier installé : {old_file}")
-        
-        # Supprimer le fichier téléchargé
-        os.remove(new_file)
-        print(f"Fichier temporaire supprimé : {new_file}")
-        
+        with span("updater.install"):
+            if os.path.exists(old_file):
+                retry(lambda: os.replace(old_file, backup_file), "Mise de côté de l'ancienne version")
+                has_backup = True
+                report(f"Backup créé : {backup_file}")
+            retry(lambda: os.replace(staged_file, old_file), "Installation")
+        report(f"Nouveau fichier installé : {old_file}")
     except Exception as e:
-        print(f"\nErreur lors de l'installation : {e}")
-        print("\nRestauration du backup...")
-        if os.path.exists(backup_file):
-            try:
-                shutil.copy2(backup_file, old_file)
-                print("Backup restauré avec succès")
-            except Exception as e2:
-                print(f"Impossible de restaurer le backup : {e2}")
+        report(f"\nErreur lors de l'installation : {e}", logging.ERROR)
+        if has_backup and not os.path.exists(old_file):
+            rollback(old_file, backup_file)
         input("Appuyez sur Entrée pour quitter...")
         sys.exit(1)
     
-    # Relancer le launcher
-    print("\n--- Étape 4/4 : Redémarrage du launcher ---")
-    
-    # Supprimer le fichier lock s'il existe
-    lock_file = os.path.join(os.path.dirname(old_file), "launcher.lock")
-    if os.path.exists(lock_file):
-        try:
-            os.remove(lock_file)
-            print(f"Fichier lock supprimé : {lock_file}")
-        except Exception as e:
-            print(f"Impossible de supprimer le lock : {e}")
+    # Relancer le launcher et attendre qu'il se déclare opérationnel
+    report("\n--- Étape 4/4 : Redémarrage du launcher ---")
     
+    health_file = os.path.join(os.path.dirname(os.path.abspath(old_file)), HEALTH_FILE_NAME)
+    token = secrets.token_hex(16)
     try:
-        subprocess.Popen([old_file])
-        print(f"Launcher redémarré : {old_file}")
+        if os.path.exists(health_file):
+            os.remove(health_file)
+        with span("updater.restart"):
+            proc = subprocess.Popen([old_file, "--health-file", health_file, "--health-token", token])
+        report(f"Launcher redémarré : {old_file}")
     except Exception as e:
-        print(f"Impossible de redémarrer le launcher : {e}")
-        print(f"Veuillez lancer manuellement : {old_file}")
+        report(f"Impossible de redémarrer le launcher : {e}", logging.ERROR)
+        if has_backup:
+            rollback(old_file, backup_file)
+        input("Appuyez sur Entrée pour quitter...")
+        sys.exit(1)
+    
+    report("Attente du démarrage de la nouvelle version...")
+    with span("updater.health") as s:
+        healthy = wait_for_health(proc, health_file, token)
+        s["healthy"] = healthy
+    try:
+        os.remove(health_file)
+    except OSError:
+        pass
+    if not healthy:
+        if has_backup:
+            rollback(old_file, backup_file, proc)
         input("Appuyez sur Entrée pour quitter...")
         sys.exit(1)
     
     print("\n" + "=" * 60)
-    print("✅ Mise à jour terminée avec succès !")
+    report("✅ Mise à jour terminée avec succès !")
     print("=" * 60)
-    print("\nFermeture automatique dans 3 secondes...")
-    time.sleep(3)
     
     # Supprimer le script updater lui-même (optionnel)
     # Note: Ceci ne fonctionnera que si le script est un .exe standalone
@@ -169,6 +296,7 @@ if __name__ == "__main__":
         main()
     except Exception as e:
         print(f"\nErreur fatale : {e}")
+        log.exception(f"Erreur fatale : {e}")
         import traceback
         traceback.print_exc()
         input("\nAppuyez sur Entrée pour quitter...")
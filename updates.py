@@ -0,0 +1,291 @@
+"""
+iRacing Launcher - Mises à jour
+Vérification de version.json, avec résultat mis en cache sur disque (TTL)
+pour ne pas interroger GitHub à chaque lancement, et téléchargement
+reprenable (fichier .part + HTTP Range) vérifié par SHA-256.
+Si version.json publie un delta depuis la version installée (voir delta.py),
+seul le delta est téléchargé ; en cas d'échec on retombe sur l'exe complet.
+"""
+import hashlib
+import json
+import logging
+import os
+import queue
+import threading
+import time
+
+from delta import apply_delta
+from logs import span, traced
+from store import JsonStore
+
+log = logging.getLogger(__name__)
+
+UPDATE_CACHE_FILE = "update_cache.json"
+# Durée de validité (secondes) du dernier version.json téléchargé
+DEFAULT_UPDATE_CHECK_TTL = 6 * 3600
+
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024   # lectures réseau / disque par blocs de 1 Mo
+DOWNLOAD_TIMEOUT = 15               # secondes sans données avant de considérer la connexion perdue
+DOWNLOAD_RETRIES = 5                # reprises (Range) après une coupure
+PROGRESS_INTERVAL = 0.1             # au plus un événement de progression toutes les 100 ms
+
+
+# Un seul store pour le cache : chaque JsonStore reste inscrit dans store._stores
+update_cache = JsonStore(UPDATE_CACHE_FILE, default=dict, debounce=0)
+
+
+class DownloadError(Exception):
+    """Téléchargement impossible ou fichier corrompu (hash différent)"""
+
+
+def fetch_version_info(url, timeout=5):
+    """Télécharge et décode version.json"""
+    import urllib.request
+
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        return json.loads(response.read().decode())
+
+
+@traced("update.check")
+def check_for_updates(current_version, url, cache=update_cache,
+                      ttl=DEFAULT_UPDATE_CHECK_TTL):
+    """
+    Vérifie s'il y a une nouvelle version disponible.
+    Utilise version.json en cache (`cache`, un JsonStore) s'il a moins de `ttl` secondes.
+    Retourne un dict avec les infos ou None si pas de mise à jour.
+    """
+    cached = cache.load()
+
+    data = cached.get("data")
+    if data is None or time.time() - cached.get("checked_at", 0) > ttl:
+        try:
+            log.info("Vérification des mises à jour...")
+            with span("update.fetch", url=url):
+                data = fetch_version_info(url)
+            cache.save({"checked_at": time.time(), "data": data})
+        except Exception as e:
+            log.warning(f"Erreur vérification mise à jour: {e}")
+            return None
+    else:
+        log.info("Vérification des mises à jour (cache)")
+
+    latest_version = data.get("version", "")
+    log.info(f"Version actuelle: {current_version}, Dernière version: {latest_version}")
+
+    # Comparer les versions (simple comparaison de string)
+    if latest_version and latest_version != current_version:
+        log.info("Mise à jour disponible!")
+        return {
+            "version": latest_version,
+            "download_url": data.get("download_url", ""),
+            "sha256": data.get("sha256", ""),
+            # Delta publié depuis la version installée : {"url", "sha256", "size"}
+            "delta": (data.get("deltas") or {}).get(current_version),
+            "changelog": data.get("changelog", "")
+        }
+
+    log.info("Aucune mise à jour disponible")
+    return None
+
+
+def sha256_file(path, chunk_size=DOWNLOAD_CHUNK_SIZE):
+    """Hash SHA-256 (hex) d'un fichier, lu par blocs"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ProgressRelay(threading.Thread):
+    """
+    Progression du téléchargement transmise via une file à un thread dédié qui
+    appelle `sink(downloaded, total)` : le thread réseau ne bloque jamais sur l'UI.
+    Les événements sont limités à un par `interval` et regroupés (seul le
+    dernier état en attente est transmis).
+    """
+
+    def __init__(self, sink, interval=PROGRESS_INTERVAL):
+        super().__init__(name="update-progress", daemon=True)
+        self.sink = sink
+        self.interval = interval
+        self._queue = queue.Queue()
+        self._last = 0.0
+
+    def __call__(self, downloaded, total):
+        now = time.monotonic()
+        if downloaded < total and now - self._last < self.interval:
+            return
+        self._last = now
+        self._queue.put((downloaded, total))
+
+    def close(self):
+        """Transmet les derniers événements puis arrête le thread"""
+        self._queue.put(None)
+        if self.is_alive():
+            self.join()
+
+    def run(self):
+        while True:
+            event = self._queue.get()
+            # Regrouper ce qui s'est accumulé pendant le dernier appel à sink
+            done = event is None
+            while not done:
+                try:
+                    newer = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if newer is None:
+                    done = True
+                else:
+                    event = newer
+            if event is not None:
+                try:
+                    self.sink(*event)
+                except Exception as e:
+                    log.warning(f"Erreur progression: {e}")
+            if done:
+                return
+
+
+def download_file(url, dest, expected_sha256=None, progress=None,
+                  chunk_size=DOWNLOAD_CHUNK_SIZE, timeout=DOWNLOAD_TIMEOUT,
+                  retries=DOWNLOAD_RETRIES):
+    """
+    Télécharge `url` vers `dest` en passant par `dest + ".part"`.
+    - Un .part existant (téléchargement interrompu) est repris via HTTP Range ;
+      si le serveur ignore Range (réponse 200), on repart de zéro.
+    - Après une coupure réseau, jusqu'à `retries` reprises automatiques.
+    - Le fichier n'est renommé en `dest` qu'une fois le SHA-256 vérifié ; si le
+      hash d'un téléchargement repris est faux (.part d'une autre version du
+      même nom), on recommence une fois depuis zéro.
+    progress(downloaded, total) est appelé depuis ce thread (voir ProgressRelay).
+    Lève DownloadError en cas d'échec.
+    """
+    part = dest + ".part"
+    os.makedirs(os.path.dirname(os.path.abspath(dest)), exist_ok=True)
+
+    restarted = False
+    while True:
+        resumed = _fetch_part(url, part, progress, chunk_size, timeout, retries)
+        if not expected_sha256:
+            log.warning("Aucun sha256 dans version.json : intégrité non vérifiée")
+            break
+        with span("update.verify", bytes=os.path.getsize(part), resumed=resumed):
+            actual = sha256_file(part, chunk_size)
+        if actual.lower() == expected_sha256.lower():
+            break
+        # .part corrompu : le supprimer pour que le prochain essai reparte de zéro
+        os.remove(part)
+        if resumed and not restarted:
+            log.warning(f"SHA-256 invalide après reprise ({actual}), téléchargement complet")
+            restarted = True
+            continue
+        raise DownloadError(f"SHA-256 invalide ({actual} au lieu de {expected_sha256})")
+
+    os.replace(part, dest)
+    return dest
+
+
+def _fetch_part(url, part, progress, chunk_size, timeout, retries):
+    """
+    Complète `part` (boucle de reprises de download_file).
+    Retourne True si des octets d'un .part existant ont été conservés (reprise).
+    """
+    import http.client
+    import urllib.error
+    import urllib.request
+
+    resumed = False
+    attempt = 0
+    while True:
+        offset = os.path.getsize(part) if os.path.exists(part) else 0
+        request = urllib.request.Request(url)
+        if offset:
+            request.add_header("Range", f"bytes={offset}-")
+        try:
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                if offset and response.status != 206:
+                    log.info("Reprise refusée par le serveur, téléchargement complet")
+                    offset = 0
+                resumed = resumed or bool(offset)
+                length = response.headers.get("Content-Length")
+                total = offset + int(length) if length is not None else 0
+
+                with open(part, "ab" if offset else "wb") as f:
+                    downloaded = offset
+                    if progress:
+                        progress(downloaded, total)
+                    while True:
+                        chunk = response.read(chunk_size)
+                        if not chunk:
+                            break
+                        f.write(chunk)
+                        downloaded += len(chunk)
+                        if progress:
+                            progress(downloaded, max(total, downloaded))
+                if total and downloaded < total:
+                    raise http.client.IncompleteRead(b"", total - downloaded)
+            return resumed
+        except urllib.error.HTTPError as e:
+            if e.code == 416 and offset:
+                return True  # .part déjà complet : le hash tranchera
+            raise DownloadError(f"HTTP {e.code} pour {url}") from e
+        except (OSError, http.client.HTTPException) as e:
+            # URLError, timeout, connexion coupée, réponse tronquée : on reprend où on en était
+            attempt += 1
+            if attempt > retries:
+                raise DownloadError(f"Téléchargement interrompu : {e}") from e
+            log.warning(f"Téléchargement interrompu ({e}), reprise {attempt}/{retries}...")
+            time.sleep(min(0.5 * attempt, 3))
+
+
+def download_update(update_info, progress_callback=None, dest_dir=None, base_file=None):
+    """
+    Télécharge la mise à jour décrite par check_for_updates() dans le dossier
+    Downloads (par défaut). Si un delta est publié pour la version installée
+    et que `base_file` (l'exe actuel) est fourni, reconstruit le nouvel exe à
+    partir du delta ; sinon, ou en cas d'échec, télécharge l'exe complet.
+    Retourne le chemin du fichier ou None si erreur.
+    """
+    download_url = update_info["download_url"]
+    if dest_dir is None:
+        dest_dir = os.path.join(os.path.expanduser("~"), "Downloads")
+
+    filename = os.path.basename(download_url)
+    if not filename.endswith(".exe"):
+        filename = "iRacing_Launcher_update.exe"
+    dest = os.path.join(dest_dir, filename)
+
+    delta = update_info.get("delta")
+    # Sans sha256 publié, le résultat d'un delta ne serait pas vérifiable : exe complet
+    if delta and delta.get("url") and update_info.get("sha256") and base_file and os.path.exists(base_file):
+        delta_file = dest + ".delta"
+        try:
+            log.info(f"Téléchargement du delta ({delta.get('size', '?')} octets)...")
+            with span("update.download", url=delta["url"], delta=True):
+                download_file(delta["url"], delta_file, expected_sha256=delta.get("sha256"),
+                              progress=progress_callback)
+            with span("update.apply_delta"):
+                apply_delta(base_file, delta_file, dest)
+            if sha256_file(dest) != update_info["sha256"].lower():
+                os.remove(dest)
+                raise DownloadError("SHA-256 du fichier reconstruit invalide")
+            log.info("Mise à jour reconstruite à partir du delta")
+            return dest
+        except Exception as e:
+            log.warning(f"Delta inutilisable ({e}), téléchargement complet")
+        finally:
+            try:
+                os.remove(delta_file)
+            except OSError:
+                pass
+
+    try:
+        with span("update.download", url=download_url, delta=False):
+            return download_file(download_url, dest,
+                                 expected_sha256=update_info.get("sha256"),
+                                 progress=progress_callback)
+    except Exception as e:
+        log.error(f"Erreur téléchargement: {e}")
+        return None